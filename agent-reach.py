@@ -5,6 +5,7 @@ Agent-Reach - 东哥的午夜码魂网络工具
 支持多账号 + Stealth 模式 + AI 内容生成
 """
 
+import importlib
 import json
 import os
 import sys
@@ -18,16 +19,86 @@ from rich.panel import Panel
 # 添加 modules 到路径
 sys.path.insert(0, str(Path(__file__).parent / "modules"))
 
-from twitter import TwitterClient
-from xiaohongshu import XiaoHongShuClient
-from github import GitHubClient
-
 console = Console()
 
+# 平台客户端按需导入：只加载当前子命令用到的模块，--help、ai 等命令不必付出
+# httpx / Playwright 封装 / 内容生成模块的导入开销
+CLIENTS = {
+    "github": ("github", "GitHubClient"),
+    "twitter": ("twitter", "TwitterClient"),
+    "xiaohongshu": ("xiaohongshu", "XiaoHongShuClient"),
+}
+
+
+def load_client(platform: str):
+    """导入并返回平台客户端类"""
+    module_name, class_name = CLIENTS[platform]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
 COOKIES_DIR = Path(__file__).parent / "cookies"
 COOKIES_DIR.mkdir(exist_ok=True)
 
 
+def render_stream(chunks) -> str:
+    """逐段输出流式生成的内容，返回完整文本"""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        console.out(chunk, end="", highlight=False)
+    console.out("")
+    return "".join(parts)
+
+
+def emit_watch(items, watcher):
+    """把 watch 产出的新条目逐行输出为 JSONL，Ctrl+C 结束"""
+    try:
+        for item in items:
+            click.echo(json.dumps(item, ensure_ascii=False))
+    except KeyboardInterrupt:
+        watcher.stop()
+    finally:
+        watcher.close()
+
+
+def make_watcher(name: str, min_interval: Optional[float], max_interval: Optional[float],
+                 skip_existing: bool, persist: bool, dedup: bool = False):
+    """按命令行参数创建 Watcher；persist 时已见 ID 存到磁盘上的 Bloom filter，dedup 时过滤近似重复"""
+    from watch import Watcher
+
+    seen_set = None
+    if persist:
+        from seen_set import SeenSet, default_path
+
+        seen_set = SeenSet(default_path(name))
+    near_dup = None
+    if dedup:
+        from dedup import NearDuplicateIndex
+
+        near_dup = NearDuplicateIndex()
+    return Watcher(min_interval=min_interval, max_interval=max_interval,
+                   skip_existing=skip_existing, seen_set=seen_set, near_dup=near_dup)
+
+
+def watch_options(func):
+    """twitter / xiaohongshu watch 共用的轮询参数"""
+    options = [
+        click.option("--limit", "-l", default=20, help="每轮提取的条目数"),
+        click.option("--min-interval", type=float, default=None,
+                     help="最短轮询间隔秒数 (默认: AGENT_REACH_WATCH_MIN_INTERVAL 或 30)"),
+        click.option("--max-interval", type=float, default=None,
+                     help="没有新条目时逐步拉长到的最长间隔秒数 (默认: AGENT_REACH_WATCH_MAX_INTERVAL 或 600)"),
+        click.option("--skip-existing", is_flag=True, help="不输出第一次轮询时已有的条目"),
+        click.option("--max-polls", type=int, default=None, help="轮询次数上限，默认一直运行"),
+        click.option("--persist", is_flag=True,
+                     help="已见 ID 存到磁盘（~/.cache/agent-reach/seen），重启后不重复输出"),
+        click.option("--dedup", is_flag=True, help="不输出与已输出内容近似重复的条目（转发、复制粘贴）"),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
 def print_banner():
     console.print(Panel.fit(
         "[bold cyan]🦞 Agent-Reach[/bold cyan] - 东哥的午夜码魂网络工具\n"
@@ -37,13 +108,56 @@ def print_banner():
     ))
 
 
-@click.group()
+def machine_output(command: click.Command) -> click.Command:
+    """标记输出给机器读（JSON / JSONL）或读管道输入的命令，执行时不打印 banner"""
+    command.machine_output = True
+    return command
+
+
+def start_command(ctx: click.Context, name: str, command: click.Command):
+    """解析到最终要执行的子命令后：打印 banner、开启剖析"""
+    root = ctx.find_root()
+    # 子命令路径，如 ["twitter", "search"]
+    path = [name]
+    while ctx.parent is not None:
+        path.insert(0, ctx.info_name)
+        ctx = ctx.parent
+    if not getattr(command, "machine_output", False):
+        print_banner()
+    if root.params["verbose"]:
+        console.print("[dim]详细模式已开启[/dim]")
+    if root.params["profile_mode"]:
+        from profiling import Profiler
+
+        # 用子命令路径命名输出文件，如 twitter-search
+        profiler = Profiler("-".join(path), mode=root.params["profile_mode"],
+                            output_dir=root.params["profile_dir"])
+        # 关闭回调后进先出：先登记的输出在剖析结果写完之后执行
+        root.call_on_close(lambda: console.print(f"[dim]剖析结果: {profiler.files['summary']}[/dim]"))
+        root.with_resource(profiler)
+
+
+class AgentReachGroup(click.Group):
+    """按 click 的解析结果（而不是扫描 sys.argv）确定本次执行的子命令"""
+
+    # 子命令组也使用本类
+    group_class = type
+
+    def resolve_command(self, ctx, args):
+        name, command, rest = super().resolve_command(ctx, args)
+        if command is not None and not isinstance(command, click.Group) and not ctx.resilient_parsing:
+            start_command(ctx, name, command)
+        return name, command, rest
+
+
+@click.group(cls=AgentReachGroup)
 @click.option("--verbose", "-v", is_flag=True, help="详细输出")
-def cli(verbose):
+@click.option("--profile", "profile_mode", type=click.Choice(["cprofile", "sample"]), default=None,
+              help="剖析本次命令: cprofile 输出 .prof，sample 输出火焰图数据")
+@click.option("--profile-dir", type=click.Path(file_okay=False, path_type=Path), default=None,
+              help="剖析结果目录 (默认: ~/.cache/agent-reach/profiles)")
+def cli(verbose, profile_mode, profile_dir):
     """Agent-Reach - AI Agent 网络访问工具"""
-    print_banner()
-    if verbose:
-        console.print("[dim]详细模式已开启[/dim]")
 
 
 # ==================== GitHub ====================
@@ -58,7 +172,7 @@ def github():
 @click.option("--limit", "-l", default=10, help="返回结果数量")
 def search(query: str, limit: int):
     """搜索 GitHub 仓库"""
-    client = GitHubClient()
+    client = load_client("github")()
     results = client.search_repos(query, limit)
 
     for i, repo in enumerate(results, 1):
@@ -72,7 +186,7 @@ def search(query: str, limit: int):
 @click.argument("repo")
 def view(repo: str):
     """查看仓库详情 (格式: owner/repo)"""
-    client = GitHubClient()
+    client = load_client("github")()
     info = client.get_repo(repo)
 
     console.print(f"\n[bold cyan]{info['full_name']}[/bold cyan]")
@@ -81,16 +195,77 @@ def view(repo: str):
     console.print(f"🌐 {info['html_url']}")
 
 
+@github.command()
+@click.argument("repo")
+@click.option("--issues", default=10, help="Issue 数量")
+@click.option("--releases", default=5, help="Release 数量")
+@click.option("--json", "as_json", is_flag=True, help="输出合并后的 JSON")
+def snapshot(repo: str, issues: int, releases: int, as_json: bool):
+    """并发获取仓库快照 (格式: owner/repo)"""
+    client = load_client("github")()
+    snap = client.repo_snapshot(repo, issue_limit=issues, release_limit=releases)
+
+    if as_json:
+        console.print_json(json.dumps(snap, ensure_ascii=False))
+        return
+
+    info = snap.get("repository") or {}
+    console.print(f"\n[bold cyan]{info.get('full_name') or repo}[/bold cyan]")
+    console.print(f"[dim]{info.get('description') or '无描述'}[/dim]")
+    console.print(f"⭐ Stars: {info.get('stargazers_count', 0)} | 🍴 {info.get('forks_count', 0)}")
+
+    languages = snap.get("languages") or {}
+    if languages:
+        total = sum(languages.values()) or 1
+        langs = ", ".join(f"{k} {v * 100 / total:.1f}%" for k, v in languages.items())
+        console.print(f"🧬 {langs}")
+
+    for release in snap.get("releases") or []:
+        console.print(f"🏷  {release['tag_name']} [dim]{release.get('published_at') or ''}[/dim]")
+
+    for issue in snap.get("issues") or []:
+        console.print(f"#{issue.get('number')} {issue.get('title')} [dim]({issue.get('state')})[/dim]")
+
+    readme = snap.get("readme") or ""
+    if readme:
+        console.print(f"\n[dim]README ({len(readme)} 字符)[/dim]")
+
+    for name, error in (snap.get("errors") or {}).items():
+        console.print(f"[red]✗ {name}: {error}[/red]")
+
+
 # ==================== Twitter/X ====================
 @cli.group()
 @click.option("--account", "-a", default="default", help="账号名称 (默认: default)")
 @click.option("--no-stealth", is_flag=True, help="关闭 Stealth 模式")
+@click.option("--record-har", type=click.Path(path_type=Path), default=None,
+              help="把浏览器流量录制为 HAR（.har 文件，或目录按操作分文件）")
+@click.option("--replay-har", type=click.Path(exists=True, path_type=Path), default=None,
+              help="只从 HAR 回放，不访问网络、不需要 Cookie，未录到的请求直接失败")
+@click.option("--persistent-profile/--no-persistent-profile", default=None,
+              help="按账号保留浏览器 profile，静态资源走磁盘缓存 (默认: AGENT_REACH_PERSISTENT_PROFILE)")
+@click.option("--disk-cache-size", type=int, default=None,
+              help="持久化 profile 的 HTTP 磁盘缓存上限 MB (默认: 256)")
+@click.option("--fast-path/--no-fast-path", default=None,
+              help="读操作先走 Web 端 GraphQL 接口，失败再用浏览器 (默认: TWITTER_FAST_PATH)")
+@click.option("--launch-profile", type=click.Choice(["default", "lean", "compat"]), default=None,
+              help="浏览器启动配置：lean 小视口、关闭 GPU / 图片等，compat 贴近真实桌面浏览器")
 @click.pass_context
-def twitter(ctx, account: str, no_stealth: bool):
+def twitter(ctx, account: str, no_stealth: bool, record_har: Optional[Path], replay_har: Optional[Path],
+            persistent_profile: Optional[bool], disk_cache_size: Optional[int], launch_profile: Optional[str],
+            fast_path: Optional[bool]):
     """Twitter/X 操作（支持多账号）"""
+    if record_har and replay_har:
+        raise click.UsageError("--record-har 和 --replay-har 不能同时使用")
     ctx.ensure_object(dict)
     ctx.obj["account"] = account
     ctx.obj["stealth"] = not no_stealth
+    ctx.obj["browser"] = {
+        "record_har": record_har, "replay_har": replay_har,
+        "persistent_profile": persistent_profile, "disk_cache_mb": disk_cache_size,
+        "launch_profile": launch_profile,
+        "fast_path": fast_path,
+    }
 
 
 @twitter.command()
@@ -127,20 +302,43 @@ def config(ctx):
 @twitter.command()
 @click.argument("query")
 @click.option("--limit", "-l", default=10, help="返回推文数量")
+@click.option("--dedup", is_flag=True, help="合并近似重复的推文，每组只显示一条")
 @click.pass_context
-def search(ctx, query: str, limit: int):
+def search(ctx, query: str, limit: int, dedup: bool):
     """搜索推文"""
     account = ctx.obj["account"]
     stealth = ctx.obj["stealth"]
     cookie_file = COOKIES_DIR / f"twitter_{account}.json"
 
-    client = TwitterClient(cookie_file, account=account, stealth=stealth)
+    client = load_client("twitter")(cookie_file, account=account, stealth=stealth, **ctx.obj["browser"])
     tweets = client.search(query, limit)
+    if dedup and tweets:
+        from dedup import dedup_records
+
+        tweets = dedup_records(tweets)
 
     for i, tweet in enumerate(tweets, 1):
         console.print(f"\n[bold cyan]@{tweet['user']}[/bold cyan]")
         console.print(f"{tweet['text']}")
-        console.print(f"[dim]♥ {tweet.get('likes', 0)} | 🔄 {tweet.get('retweets', 0)} | {tweet['time']}[/dim]")
+        similar = f" | 另有 {tweet['cluster_size'] - 1} 条相似" if tweet.get("cluster_size", 1) > 1 else ""
+        console.print(f"[dim]♥ {tweet.get('likes', 0)} | 🔄 {tweet.get('retweets', 0)} | {tweet['time']}{similar}[/dim]")
+
+
+@machine_output
+@twitter.command()
+@click.argument("query")
+@watch_options
+@click.pass_context
+def watch(ctx, query: str, limit: int, min_interval: Optional[float], max_interval: Optional[float],
+          skip_existing: bool, max_polls: Optional[int], persist: bool, dedup: bool):
+    """持续搜索推文，只以 JSONL 输出新出现的推文"""
+    account = ctx.obj["account"]
+    stealth = ctx.obj["stealth"]
+    cookie_file = COOKIES_DIR / f"twitter_{account}.json"
+
+    client = load_client("twitter")(cookie_file, account=account, stealth=stealth, **ctx.obj["browser"])
+    watcher = make_watcher(f"twitter-{query}", min_interval, max_interval, skip_existing, persist, dedup)
+    emit_watch(client.watch(query, limit, watcher=watcher, max_polls=max_polls), watcher)
 
 
 @twitter.command()
@@ -154,7 +352,7 @@ def post(ctx, text: str, topic: str, ai: bool):
     stealth = ctx.obj["stealth"]
     cookie_file = COOKIES_DIR / f"twitter_{account}.json"
 
-    client = TwitterClient(cookie_file, account=account, stealth=stealth)
+    client = load_client("twitter")(cookie_file, account=account, stealth=stealth, **ctx.obj["browser"])
     result = client.post_tweet(text=text, topic=topic, use_ai=ai)
 
     if result.get("success"):
@@ -175,7 +373,7 @@ def timeline(ctx, user: Optional[str], limit: int):
     stealth = ctx.obj["stealth"]
     cookie_file = COOKIES_DIR / f"twitter_{account}.json"
 
-    client = TwitterClient(cookie_file, account=account, stealth=stealth)
+    client = load_client("twitter")(cookie_file, account=account, stealth=stealth, **ctx.obj["browser"])
     tweets = client.get_timeline(user, limit)
 
     for tweet in tweets:
@@ -195,7 +393,7 @@ def reply(ctx, url: str, text: str, ai: bool):
     stealth = ctx.obj["stealth"]
     cookie_file = COOKIES_DIR / f"twitter_{account}.json"
 
-    client = TwitterClient(cookie_file, account=account, stealth=stealth)
+    client = load_client("twitter")(cookie_file, account=account, stealth=stealth, **ctx.obj["browser"])
     result = client.reply_to_tweet(url, text=text, use_ai=ai)
 
     if result.get("success"):
@@ -210,12 +408,30 @@ def reply(ctx, url: str, text: str, ai: bool):
 @cli.group()
 @click.option("--account", "-a", default="default", help="账号名称 (默认: default)")
 @click.option("--no-stealth", is_flag=True, help="关闭 Stealth 模式")
+@click.option("--record-har", type=click.Path(path_type=Path), default=None,
+              help="把浏览器流量录制为 HAR（.har 文件，或目录按操作分文件）")
+@click.option("--replay-har", type=click.Path(exists=True, path_type=Path), default=None,
+              help="只从 HAR 回放，不访问网络、不需要 Cookie，未录到的请求直接失败")
+@click.option("--persistent-profile/--no-persistent-profile", default=None,
+              help="按账号保留浏览器 profile，静态资源走磁盘缓存 (默认: AGENT_REACH_PERSISTENT_PROFILE)")
+@click.option("--disk-cache-size", type=int, default=None,
+              help="持久化 profile 的 HTTP 磁盘缓存上限 MB (默认: 256)")
+@click.option("--launch-profile", type=click.Choice(["default", "lean", "compat"]), default=None,
+              help="浏览器启动配置：lean 小视口、关闭 GPU / 图片等，compat 贴近真实桌面浏览器")
 @click.pass_context
-def xiaohongshu(ctx, account: str, no_stealth: bool):
+def xiaohongshu(ctx, account: str, no_stealth: bool, record_har: Optional[Path], replay_har: Optional[Path],
+                persistent_profile: Optional[bool], disk_cache_size: Optional[int], launch_profile: Optional[str]):
     """小红书操作（支持多账号）"""
+    if record_har and replay_har:
+        raise click.UsageError("--record-har 和 --replay-har 不能同时使用")
     ctx.ensure_object(dict)
     ctx.obj["account"] = account
     ctx.obj["stealth"] = not no_stealth
+    ctx.obj["browser"] = {
+        "record_har": record_har, "replay_har": replay_har,
+        "persistent_profile": persistent_profile, "disk_cache_mb": disk_cache_size,
+        "launch_profile": launch_profile,
+    }
 
 
 @xiaohongshu.command()
@@ -244,23 +460,46 @@ def config(ctx):
 @xiaohongshu.command()
 @click.argument("keyword")
 @click.option("--limit", "-l", default=10, help="返回结果数量")
+@click.option("--dedup", is_flag=True, help="合并近似重复的笔记，每组只显示一条")
 @click.pass_context
-def search(ctx, keyword: str, limit: int):
+def search(ctx, keyword: str, limit: int, dedup: bool):
     """搜索笔记"""
     account = ctx.obj["account"]
     stealth = ctx.obj["stealth"]
     cookie_file = COOKIES_DIR / f"xiaohongshu_{account}.json"
 
-    client = XiaoHongShuClient(cookie_file, account=account, stealth=stealth)
+    client = load_client("xiaohongshu")(cookie_file, account=account, stealth=stealth, **ctx.obj["browser"])
     notes = client.search(keyword, limit)
+    if dedup and notes:
+        from dedup import dedup_records
+
+        notes = dedup_records(notes)
 
     for i, note in enumerate(notes, 1):
         console.print(f"\n[bold red]{i}. {note['title']}[/bold red]")
         console.print(f"   [dim]作者: @{note['user']}[/dim]")
-        console.print(f"   ♥ {note.get('likes', 0)}")
+        similar = f"  [dim]另有 {note['cluster_size'] - 1} 条相似[/dim]" if note.get("cluster_size", 1) > 1 else ""
+        console.print(f"   ♥ {note.get('likes', 0)}{similar}")
         console.print(f"   [blue]{note['url']}[/blue]")
 
 
+@machine_output
+@xiaohongshu.command()
+@click.argument("keyword")
+@watch_options
+@click.pass_context
+def watch(ctx, keyword: str, limit: int, min_interval: Optional[float], max_interval: Optional[float],
+          skip_existing: bool, max_polls: Optional[int], persist: bool, dedup: bool):
+    """持续搜索笔记，只以 JSONL 输出新出现的笔记"""
+    account = ctx.obj["account"]
+    stealth = ctx.obj["stealth"]
+    cookie_file = COOKIES_DIR / f"xiaohongshu_{account}.json"
+
+    client = load_client("xiaohongshu")(cookie_file, account=account, stealth=stealth, **ctx.obj["browser"])
+    watcher = make_watcher(f"xiaohongshu-{keyword}", min_interval, max_interval, skip_existing, persist, dedup)
+    emit_watch(client.watch(keyword, limit, watcher=watcher, max_polls=max_polls), watcher)
+
+
 @xiaohongshu.command()
 @click.argument("note_id")
 @click.pass_context
@@ -270,7 +509,7 @@ def like(ctx, note_id: str):
     stealth = ctx.obj["stealth"]
     cookie_file = COOKIES_DIR / f"xiaohongshu_{account}.json"
 
-    client = XiaoHongShuClient(cookie_file, account=account, stealth=stealth)
+    client = load_client("xiaohongshu")(cookie_file, account=account, stealth=stealth, **ctx.obj["browser"])
     result = client.like_note(note_id)
 
     if result.get("success"):
@@ -282,8 +521,9 @@ def like(ctx, note_id: str):
 @xiaohongshu.command()
 @click.option("--topic", "-t", required=True, help="笔记主题（AI 生成）")
 @click.option("--style", default="干货", help="笔记风格")
+@click.option("--no-stream", is_flag=True, help="等待完整结果后再输出")
 @click.pass_context
-def generate(ctx, topic: str, style: str):
+def generate(ctx, topic: str, style: str, no_stream: bool):
     """AI 生成小红书笔记"""
     from content_generator import ContentGenerator
 
@@ -291,7 +531,11 @@ def generate(ctx, topic: str, style: str):
     console.print(f"[dim]主题: {topic} | 风格: {style}[/dim]\n")
 
     generator = ContentGenerator()
-    note = generator.generate_xiaohongshu_note(topic, style)
+    if no_stream:
+        note = generator.generate_xiaohongshu_note(topic, style)
+    else:
+        note = generator.parse_note(render_stream(generator.stream_note(topic, style)), topic)
+        console.print()
 
     console.print(f"[bold red]标题: {note['title']}[/bold red]")
     console.print(f"\n{note['content']}")
@@ -309,7 +553,8 @@ def ai():
 @click.argument("topic")
 @click.option("--platform", "-p", default="twitter", type=click.Choice(["twitter", "xiaohongshu"]), help="目标平台")
 @click.option("--tone", default="casual", help="语气风格")
-def content(topic: str, platform: str, tone: str):
+@click.option("--no-stream", is_flag=True, help="等待完整结果后再输出")
+def content(topic: str, platform: str, tone: str, no_stream: bool):
     """生成社交媒体内容"""
     from content_generator import ContentGenerator
 
@@ -318,12 +563,19 @@ def content(topic: str, platform: str, tone: str):
     console.print(f"\n[yellow]🤖 正在生成 {platform} 内容...[/yellow]\n")
 
     if platform == "twitter":
-        text = generator.generate_tweet(topic, tone)
         console.print(f"[bold cyan]推文内容:[/bold cyan]")
-        console.print(f"{text}")
+        if no_stream:
+            text = generator.generate_tweet(topic, tone)
+            console.print(f"{text}")
+        else:
+            text = render_stream(generator.stream_tweet(topic, tone))
         console.print(f"\n[dim]长度: {len(text)}/280[/dim]")
     else:
-        note = generator.generate_xiaohongshu_note(topic, tone)
+        if no_stream:
+            note = generator.generate_xiaohongshu_note(topic, tone)
+        else:
+            note = generator.parse_note(render_stream(generator.stream_note(topic, tone)), topic)
+            console.print()
         console.print(f"[bold red]标题: {note['title']}[/bold red]")
         console.print(f"\n{note['content']}")
 
@@ -331,15 +583,135 @@ def content(topic: str, platform: str, tone: str):
 @ai.command()
 @click.argument("content_text")
 @click.option("--platform", "-p", default="twitter", type=click.Choice(["twitter", "xiaohongshu"]), help="目标平台")
-def hashtags(content_text: str, platform: str):
+@click.option("--no-stream", is_flag=True, help="等待完整结果后再输出")
+def hashtags(content_text: str, platform: str, no_stream: bool):
     """生成 Hashtag"""
     from content_generator import ContentGenerator
 
     generator = ContentGenerator()
-    tags = generator.generate_hashtags(content_text, platform)
 
     console.print(f"\n[bold green]推荐 Hashtag:[/bold green]")
-    console.print(f"{tags}")
+    if no_stream:
+        console.print(f"{generator.generate_hashtags(content_text, platform)}")
+    else:
+        render_stream(generator.stream_hashtags(content_text, platform))
+
+
+@ai.command()
+@click.option("--clear", is_flag=True, help="清空生成缓存")
+def cache(clear: bool):
+    """查看 / 清空 AI 生成缓存"""
+    from llm_cache import get_default_cache
+
+    cache = get_default_cache()
+    if not cache:
+        console.print("\n[yellow]AI 缓存已关闭 (AI_CACHE=0)[/yellow]")
+        return
+
+    if clear:
+        cache.clear()
+        console.print("\n[green]✓ AI 缓存已清空[/green]")
+        return
+
+    stats = cache.stats()
+    console.print(f"\n[bold green]AI 缓存[/bold green] [dim]{stats['path']}[/dim]")
+    console.print(f"磁盘条目: {stats['disk_entries']}")
+
+
+# ==================== 数据分析 ====================
+@machine_output
+@cli.command()
+@click.argument("files", nargs=-1, type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option("--top", default=10, help="头部作者数量")
+@click.option("--by", type=click.Choice(["engagement", "posts"]), default="engagement", help="作者排序依据")
+@click.option("--no-dedup", is_flag=True, help="不按 ID 去重（默认同一条只保留最后一次采集）")
+@click.option("--json", "as_json", is_flag=True, help="输出 JSON")
+def analyze(files, top: int, by: str, no_dedup: bool, as_json: bool):
+    """统计采集到的推文 / 笔记：互动数分位数、按小时分布、头部作者
+
+    FILES 为 JSONL（watch 输出）或 JSON 文件，缺省从 stdin 读取
+    """
+    from analytics import analyze as run_analysis, load_records
+
+    report = run_analysis(load_records(files or ["-"]), top=top, by=by, dedup=not no_dedup)
+    if as_json:
+        click.echo(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    summary = report["summary"]
+    console.print(f"\n[bold]{summary['records']} 条记录[/bold] · {summary['authors']} 位作者"
+                  + (f" · [dim]{summary['first']} ~ {summary['last']}[/dim]" if "first" in summary else ""))
+    names = {"likes": "点赞", "retweets": "转发", "replies": "评论", "engagement": "互动",
+             "engagement_per_hour": "互动/小时"}
+    for key, label in names.items():
+        stats = summary.get(key)
+        if stats:
+            percentiles = "  ".join(f"{k} {v:g}" for k, v in stats.items() if k.startswith("p"))
+            console.print(f"  {label:<8} 合计 {stats['total']:,}  均值 {stats['mean']:g}  {percentiles}")
+
+    posts = report["hourly"]["posts"]
+    if any(posts):
+        peak = max(posts)
+        console.print("\n[bold]按小时 (UTC)[/bold]")
+        for hour, (count, mean) in enumerate(zip(posts, report["hourly"]["mean_engagement"])):
+            bar = "█" * round(count / peak * 30) if peak else ""
+            console.print(f"  {hour:02d}  {bar:<30} {count:>7}  均互动 {mean:g}")
+
+    if report["top_authors"]:
+        console.print("\n[bold]头部作者[/bold]")
+        for row in report["top_authors"]:
+            console.print(f"  @{row['author']:<20} {row['posts']:>6} 条  互动 {row['engagement']:>10}  "
+                          f"均值 {row['mean_engagement']:g}")
+
+
+@machine_output
+@cli.command()
+@click.argument("files", nargs=-1, type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option("--threshold", type=float, default=None,
+              help="判为近似重复的 Jaccard 相似度 (默认: AGENT_REACH_DEDUP_THRESHOLD 或 0.7)")
+@click.option("--stats", "show_stats", is_flag=True, help="在 stderr 输出簇统计")
+def dedup(files, threshold: Optional[float], show_stats: bool):
+    """近似去重：每组相似的推文 / 笔记只保留第一条，以 JSONL 输出
+
+    输出的每条带 cluster_size（簇内条数）和 duplicates（其余条目的 ID），
+    适合在送进 AI 处理前先过一遍。FILES 格式同 analyze，缺省从 stdin 读取
+    """
+    from analytics import load_records
+    from dedup import NearDuplicateIndex
+
+    index = NearDuplicateIndex(threshold)
+    for record in load_records(files or ["-"]):
+        index.add(record)
+    for record in index.representatives():
+        click.echo(json.dumps(record, ensure_ascii=False))
+    if show_stats:
+        click.echo(json.dumps(index.stats(), ensure_ascii=False), err=True)
+
+
+# ==================== 指标 ====================
+@machine_output
+@cli.command()
+@click.option("--format", "fmt", default="prometheus", type=click.Choice(["prometheus", "json"]), help="输出格式")
+@click.option("--reset", is_flag=True, help="清空已累积的指标")
+def stats(fmt: str, reset: bool):
+    """导出分阶段耗时指标（需设置 AGENT_REACH_METRICS=1 采集）"""
+    from base import Metrics, metrics
+
+    if reset:
+        metrics.reset()
+        if metrics.path and metrics.path.exists():
+            metrics.path.unlink()
+        click.echo("指标已清空", err=True)
+        return
+
+    total = Metrics()
+    total.merge(metrics.load())
+    total.merge(metrics.to_json())
+
+    if fmt == "json":
+        click.echo(json.dumps(total.to_json(), ensure_ascii=False, indent=2))
+    else:
+        click.echo(total.to_prometheus(), nl=False)
 
 
 if __name__ == "__main__":
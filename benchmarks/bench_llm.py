@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+内容生成吞吐基准 - 对接本地替身服务，无需网络和 API Key
+
+    python3 benchmarks/bench_llm.py --requests 200 --latency 0.02
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "modules"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from local_llm_server import LocalLLMServer
+
+
+def run(label: str, func, n: int, server: LocalLLMServer):
+    before = server.requests
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {n / elapsed:>10.1f} 条/秒  {elapsed * 1000:>9.1f} ms  HTTP 请求 {server.requests - before}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ContentGenerator 吞吐基准")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.02, help="替身服务每请求延迟（秒）")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    server = LocalLLMServer(latency=args.latency).start()
+    os.environ.update({
+        "AI_PROVIDER": "local",
+        "LOCAL_AI_BASE_URL": server.base_url,
+        "AI_CACHE": "0",
+    })
+
+    from content_generator import ContentGenerator
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    contents = [f"第 {i} 条内容" for i in range(args.requests)]
+    generator = ContentGenerator(concurrency=args.concurrency)
+
+    run("顺序 generate_hashtags", lambda: [generator.generate_hashtags(c) for c in contents], args.requests, server)
+    run("并发 generate_many", lambda: generator.generate_hashtags_many(contents), args.requests, server)
+
+    generator.local_batch_size = args.batch_size
+    run(f"合批 generate_many (x{args.batch_size})", lambda: generator.generate_hashtags_many(contents), args.requests, server)
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
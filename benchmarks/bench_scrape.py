@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+抓取热路径基准 - 对接本地 fixture 站点，无需网络和真实账号（仅 Linux）
+
+    python3 benchmarks/bench_scrape.py --runs 5
+    python3 benchmarks/bench_scrape.py --only twitter.search --json > before.json
+    python3 benchmarks/bench_scrape.py --replay-har captures/   # 回放录制的真实会话
+    python3 benchmarks/bench_scrape.py --no-fast-path --launch-profile default --launch-profile lean
+
+每个读方法输出：冷启动耗时、热态耗时中位数、条/秒、每条记录的 Playwright IPC 往返次数、
+进程树（含 Chromium 子进程）峰值 RSS。
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "modules"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from browser import tree_rss
+from fixture_site import FixtureSite
+
+
+class PeakRSS:
+    """后台线程定时采样进程树 RSS，记录峰值"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        pid = os.getpid()
+        while True:
+            self.peak = max(self.peak, tree_rss(pid))
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self) -> "PeakRSS":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def count_records(result) -> int:
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict) and result and "error" not in result:
+        return 1
+    return 0
+
+
+def bench(name: str, func: Callable[[], object], runs: int) -> Dict[str, object]:
+    from profiling import IPCCounter
+
+    with PeakRSS() as rss:
+        started = time.perf_counter()
+        records = count_records(func())
+        cold = time.perf_counter() - started
+
+        ipc = IPCCounter()
+        ipc.install()
+        warm: List[float] = []
+        warm_records = 0
+        try:
+            for _ in range(runs):
+                started = time.perf_counter()
+                warm_records += count_records(func())
+                warm.append(time.perf_counter() - started)
+        finally:
+            ipc.uninstall()
+
+    warm_median = statistics.median(warm) if warm else cold
+    per_call = warm_records / len(warm) if warm else records
+    ipc_calls = sum(ipc.counts.values())
+    return {
+        "method": name,
+        "records": records,
+        "cold_ms": round(cold * 1000, 1),
+        "warm_ms": round(warm_median * 1000, 1),
+        "records_per_sec": round(per_call / warm_median, 2) if warm_median else 0.0,
+        "ipc_per_record": round(ipc_calls / warm_records, 1) if warm_records else None,
+        "peak_rss_mb": round(rss.peak / 1024 / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Twitter / 小红书抓取热路径基准")
+    parser.add_argument("--runs", type=int, default=3, help="热态重复次数")
+    parser.add_argument("--limit", type=int, default=20, help="每次抓取的条数")
+    parser.add_argument("--only", action="append", default=[], help="只跑指定方法，可多次传入")
+    parser.add_argument("--replay-har", type=Path, default=None,
+                        help="从 HAR 回放（目录按操作名分文件），替代 fixture 站点")
+    parser.add_argument("--no-fast-path", action="store_true",
+                        help="不走 HTTP 快速路径（Twitter GraphQL、小红书详情 / 主页），只测浏览器")
+    parser.add_argument("--launch-profile", action="append", default=[],
+                        help="浏览器启动配置（default / lean / compat），可多次传入逐个对比")
+    parser.add_argument("--json", dest="as_json", action="store_true", help="输出 JSON，便于前后对比")
+    args = parser.parse_args()
+
+    if not sys.platform.startswith("linux"):
+        parser.error("RSS 采样依赖 /proc，仅支持 Linux")
+
+    twitter_site = FixtureSite("twitter").start()
+    xhs_site = FixtureSite("xhs").start()
+
+    from base import logger
+    from browser import LAUNCH_PROFILES
+    from twitter import TwitterClient
+    from xiaohongshu import XiaoHongShuClient
+
+    logger.setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        twitter_cookie = Path(tmp) / "twitter.json"
+        twitter_cookie.write_text(json.dumps({"auth_token": "bench", "ct0": "bench"}))
+        xhs_cookie = Path(tmp) / "xhs.json"
+        xhs_cookie.write_text(json.dumps({"cookie": "web_session=bench; a1=bench"}))
+
+        results = []
+        for profile in args.launch_profile or ["default"]:
+            if profile not in LAUNCH_PROFILES:
+                parser.error(f"未知启动配置: {profile}")
+            if args.replay_har:
+                # 回放时使用录制时的线上地址，请求全部由 HAR 应答
+                twitter = TwitterClient(twitter_cookie, base_url="https://x.com", replay_har=args.replay_har,
+                                        launch_profile=profile)
+                xhs = XiaoHongShuClient(xhs_cookie, base_url="https://www.xiaohongshu.com",
+                                        replay_har=args.replay_har, launch_profile=profile)
+            else:
+                twitter = TwitterClient(twitter_cookie, base_url=twitter_site.base_url,
+                                        fast_path=not args.no_fast_path, launch_profile=profile)
+                xhs = XiaoHongShuClient(xhs_cookie, base_url=xhs_site.base_url,
+                                        fast_path=not args.no_fast_path, launch_profile=profile)
+
+            methods = {
+                "twitter.search": lambda: twitter.search("bench", args.limit),
+                "twitter.timeline": lambda: twitter.get_timeline(limit=args.limit),
+                "twitter.user_info": lambda: twitter.get_user_info("benchuser"),
+                "xiaohongshu.search": lambda: xhs.search("bench", args.limit),
+                "xiaohongshu.note_detail": lambda: xhs.get_note_detail("65f0bench"),
+                "xiaohongshu.user_profile": lambda: xhs.get_user_profile("u1"),
+            }
+            if args.only:
+                methods = {name: func for name, func in methods.items() if name in args.only}
+
+            for name, func in methods.items():
+                results.append({"profile": profile, **bench(name, func, args.runs)})
+
+    twitter_site.stop()
+    xhs_site.stop()
+
+    if args.as_json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    print(f"{'配置':<8} {'方法':<26} {'条数':>5} {'冷启动ms':>10} {'热态ms':>10} {'条/秒':>8} {'IPC/条':>8} {'峰值RSS MB':>11}")
+    for row in results:
+        ipc = row["ipc_per_record"] if row["ipc_per_record"] is not None else "-"
+        print(f"{row['profile']:<8} {row['method']:<26} {row['records']:>5} {row['cold_ms']:>10} {row['warm_ms']:>10} "
+              f"{row['records_per_sec']:>8} {ipc:>8} {row['peak_rss_mb']:>11}")
+
+
+if __name__ == "__main__":
+    main()
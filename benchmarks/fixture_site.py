@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+X / 小红书的本地 fixture 站点 - 仅用于离线基准
+只依赖标准库，按路径返回 benchmarks/fixtures 下已脱敏的页面
+
+    python3 benchmarks/fixture_site.py --site twitter --port 9001
+    export TWITTER_BASE_URL=http://127.0.0.1:9001
+"""
+
+import argparse
+import gzip
+import re
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+# (路径正则, fixture 文件)，按顺序匹配
+ROUTES = {
+    "twitter": [
+        # Web 端 GraphQL 接口（TwitterClient 的 HTTP 快速路径），queryId 不限
+        (r"^/i/api/graphql/[^/]+/SearchTimeline$", "twitter_graphql_search.json"),
+        (r"^/i/api/graphql/[^/]+/UserByScreenName$", "twitter_graphql_user.json"),
+        (r"^/i/api/graphql/[^/]+/UserTweets$", "twitter_graphql_user_tweets.json"),
+        (r"^/i/api/graphql/[^/]+/HomeLatestTimeline$", "twitter_graphql_home.json"),
+        (r"^/search$", "twitter_search.html"),
+        (r"^/home$", "twitter_timeline.html"),
+        (r"^/[A-Za-z0-9_]+$", "twitter_profile.html"),
+    ],
+    "xhs": [
+        (r"^/search_result$", "xhs_search.html"),
+        (r"^/explore/[0-9a-zA-Z]+$", "xhs_note.html"),
+        (r"^/user/(me|profile/[0-9a-zA-Z]+)$", "xhs_profile.html"),
+    ],
+}
+
+
+def brotli_stored(data: bytes, block: int = 8) -> bytes:
+    """按 RFC 7932 用不压缩的 meta-block 编码 brotli 流：标准库没有 brotli，但内容仍是合法的 br 编码
+
+    每 block 字节一个 meta-block，块头把原文切碎，未解码的响应体里不会留下可被正则误匹配的明文片段
+    """
+    out = bytearray()
+    acc = nbits = 0
+
+    def bits(value: int, n: int):
+        nonlocal acc, nbits
+        acc |= value << nbits
+        nbits += n
+        while nbits >= 8:
+            out.append(acc & 0xFF)
+            acc >>= 8
+            nbits -= 8
+
+    def align():
+        nonlocal acc, nbits
+        if nbits:
+            out.append(acc & 0xFF)
+            acc = nbits = 0
+
+    bits(0, 1)  # WBITS = 16
+    for i in range(0, len(data), block):
+        chunk = data[i:i + block]
+        # ISLAST=0，MNIBBLES=4，MLEN-1，ISUNCOMPRESSED=1，然后按字节对齐写原文
+        bits(0, 1)
+        bits(0, 2)
+        bits(len(chunk) - 1, 16)
+        bits(1, 1)
+        align()
+        out += chunk
+    # ISLAST=1，ISLASTEMPTY=1
+    bits(1, 1)
+    bits(1, 1)
+    align()
+    return bytes(out)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """与 X / 小红书一致：客户端声明支持 br 时优先 br，其次 gzip"""
+    offered = {part.split(";", 1)[0].strip().lower() for part in accept_encoding.split(",")}
+    for encoding in ("br", "gzip"):
+        if encoding in offered:
+            return encoding
+    return None
+
+
+# 1x1 透明 GIF，用作封面图占位，避免图片请求 404
+PIXEL = bytes.fromhex("47494638396101000100800000000000ffffff21f90401000000002c00000000010001000002024401003b")
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, encoding: Optional[str] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server: "FixtureSite" = self.server
+        server.count_request()
+        path = self.path.split("?", 1)[0]
+
+        if path.startswith("/img/"):
+            self._send(200, PIXEL, "image/gif")
+            return
+        if path == "/favicon.ico":
+            self._send(404, b"", "text/plain")
+            return
+
+        page = server.render(path)
+        if page is None:
+            self._send(404, b"not found", "text/plain")
+        else:
+            name, body = page
+            content_type = "application/json" if name.endswith(".json") else "text/html"
+            encoding = negotiate(self.headers.get("Accept-Encoding", "")) if server.compress else None
+            if encoding:
+                body = server.encoded(name, body, encoding)
+            self._send(200, body, f"{content_type}; charset=utf-8", encoding)
+
+
+class FixtureSite(ThreadingHTTPServer):
+    """可在基准中以线程方式启动的 fixture 站点"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, site: str, address: Tuple[str, int] = ("127.0.0.1", 0), compress: bool = True):
+        if site not in ROUTES:
+            raise ValueError(f"未知站点: {site}")
+        super().__init__(address, Handler)
+        self.site = site
+        # 按 Accept-Encoding 压缩页面和接口响应，和线上一样暴露客户端解码问题
+        self.compress = compress
+        self.routes = [(re.compile(pattern), name) for pattern, name in ROUTES[site]]
+        self.requests = 0
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def render(self, path: str) -> Optional[Tuple[str, bytes]]:
+        """返回 (fixture 文件名, 内容)"""
+        for pattern, name in self.routes:
+            if pattern.match(path):
+                if name not in self._pages:
+                    self._pages[name] = (FIXTURES_DIR / name).read_bytes()
+                return name, self._pages[name]
+        return None
+
+    def encoded(self, name: str, body: bytes, encoding: str) -> bytes:
+        key = (name, encoding)
+        if key not in self._pages:
+            self._pages[key] = brotli_stored(body) if encoding == "br" else gzip.compress(body)
+        return self._pages[key]
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self) -> "FixtureSite":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="X / 小红书本地 fixture 站点")
+    parser.add_argument("--site", choices=sorted(ROUTES), required=True)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--no-compress", action="store_true", help="不按 Accept-Encoding 压缩响应")
+    args = parser.parse_args(argv)
+
+    server = FixtureSite(args.site, (args.host, args.port), compress=not args.no_compress)
+    print(f"{args.site} fixture 站点: {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+CLI 启动导入耗时预算检查 - 基于 python -X importtime
+
+    python3 benchmarks/import_time.py                 # 超出预算或导入了禁止的模块时退出码为 1
+    python3 benchmarks/import_time.py --budget-ms 200 --top 15
+
+每个场景各跑若干次取中位数，输出导入总耗时和最慢的模块。
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+CLI = ROOT / "agent-reach.py"
+
+# 只跑到参数解析 / 轻量命令的场景，不应该导入平台客户端
+PLATFORM_MODULES = {"httpx", "playwright", "github", "twitter", "xiaohongshu", "browser", "content_generator"}
+
+# (场景参数, 不允许出现的顶层模块)
+SCENARIOS: List[Tuple[List[str], set]] = [
+    (["--help"], PLATFORM_MODULES | {"base"}),
+    (["twitter", "--help"], PLATFORM_MODULES | {"base"}),
+    (["xiaohongshu", "--help"], PLATFORM_MODULES | {"base"}),
+    (["github", "--help"], PLATFORM_MODULES | {"base"}),
+    (["ai", "cache"], {"playwright", "github", "twitter", "xiaohongshu", "browser"}),
+    (["ai", "hashtags", "benchmark"], {"httpx", "playwright", "github", "twitter", "xiaohongshu", "browser"}),
+]
+
+
+def import_times(args: List[str]) -> Dict[str, Tuple[int, int]]:
+    """返回 {模块名: (自身微秒, 累计微秒)}"""
+    # 去掉 API Key，ai 场景走模拟响应，不发起网络请求
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "GEMINI_API_KEY")}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(CLI)] + args,
+        capture_output=True, text=True, cwd=str(ROOT), env=env
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = [part.strip() for part in line.split(":", 1)[1].split("|")]
+        times[name] = (int(self_us), int(cumulative))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI 启动导入耗时预算检查")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="每个场景导入总耗时上限（毫秒）")
+    parser.add_argument("--runs", type=int, default=3, help="每个场景运行次数，取中位数")
+    parser.add_argument("--top", type=int, default=8, help="列出最慢的模块数")
+    args = parser.parse_args()
+
+    failed = False
+    for scenario, forbidden in SCENARIOS:
+        label = " ".join(scenario)
+        runs = [import_times(scenario) for _ in range(args.runs)]
+        totals = [sum(self_us for self_us, _ in times.values()) / 1000 for times in runs]
+        total = statistics.median(totals)
+        times = runs[-1]
+
+        loaded = {name for name in times if name.split(".")[0] in forbidden}
+        over = total > args.budget_ms
+        status = "✗" if over or loaded else "✓"
+        failed = failed or over or bool(loaded)
+
+        print(f"{status} {label:<22} {total:>8.1f} ms  (预算 {args.budget_ms:.0f} ms, {len(times)} 个模块)")
+        if loaded:
+            print(f"    不应导入: {', '.join(sorted({name.split('.')[0] for name in loaded}))}")
+        slowest = sorted(times.items(), key=lambda item: item[1][1], reverse=True)
+        top_level = [(name, cumulative) for name, (_, cumulative) in slowest if "." not in name][:args.top]
+        print("    " + "  ".join(f"{name} {cumulative / 1000:.1f}" for name, cumulative in top_level))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
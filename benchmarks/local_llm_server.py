@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+本地 OpenAI 兼容推理服务的替身 - 仅用于测试和压测
+只依赖标准库，返回确定性的内容，可模拟首 token 延迟和逐 token 延迟
+
+    python3 benchmarks/local_llm_server.py --port 8000 --latency 0.05
+    export AI_PROVIDER=local LOCAL_AI_BASE_URL=http://127.0.0.1:8000/v1
+"""
+
+import argparse
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+
+def fake_completion(prompt: str) -> str:
+    """根据 prompt 生成确定性的回复"""
+    if "小红书" in prompt:
+        return json.dumps({"title": "💡 本地模型笔记", "content": "✅ 第一点\n✅ 第二点\n✅ 第三点"}, ensure_ascii=False)
+    if "hashtag" in prompt.lower():
+        return "#本地 #模型 #测试"
+    head = " ".join(prompt.split())[:40]
+    return f"[local] {head}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持 keep-alive，便于测连接复用
+
+    def setup(self):
+        super().setup()
+        # 头和正文分两次写出，关掉 Nagle 避免和 delayed ACK 叠加出 40ms 延迟
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "local", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        server: "LocalLLMServer" = self.server
+        body = self._read_json()
+        server.count_request()
+
+        if self.path == "/v1/chat/completions":
+            prompt = (body.get("messages") or [{}])[-1].get("content", "")
+            text = fake_completion(prompt)
+            time.sleep(server.latency)
+            if body.get("stream"):
+                self._stream(text, server.token_latency)
+            else:
+                self._send_json(200, {
+                    "object": "chat.completion",
+                    "model": body.get("model", "local"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                })
+        elif self.path == "/v1/completions":
+            prompts = body.get("prompt", "")
+            prompts = prompts if isinstance(prompts, list) else [prompts]
+            # 批量请求只付一次固定延迟，模拟服务端合批
+            time.sleep(server.latency)
+            self._send_json(200, {
+                "object": "text_completion",
+                "model": body.get("model", "local"),
+                "choices": [
+                    {"index": i, "text": fake_completion(p), "finish_reason": "stop"}
+                    for i, p in enumerate(prompts)
+                ],
+            })
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _stream(self, text: str, token_latency: float, chunk_size: int = 4):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write(payload: str):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        for i in range(0, len(text), chunk_size):
+            chunk = {"choices": [{"index": 0, "delta": {"content": text[i:i + chunk_size]}}]}
+            write(json.dumps(chunk, ensure_ascii=False))
+            time.sleep(token_latency)
+        write("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class LocalLLMServer(ThreadingHTTPServer):
+    """可在测试中以线程方式启动的替身服务"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address: Tuple[str, int] = ("127.0.0.1", 0),
+                 latency: float = 0.0, token_latency: float = 0.0):
+        super().__init__(address, Handler)
+        self.latency = latency
+        self.token_latency = token_latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self) -> "LocalLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容服务替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="流式输出每段的延迟（秒）")
+    args = parser.parse_args(argv)
+
+    server = LocalLLMServer((args.host, args.port), args.latency, args.token_latency)
+    print(f"本地 LLM 替身服务: {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
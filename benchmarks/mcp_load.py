@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+MCP 服务压测 - 通过 stdio JSON-RPC 按目标速率发送 tools/list / tools/call 混合请求（仅 Linux）
+
+    python3 benchmarks/mcp_load.py --rate 50 --duration 30
+    python3 benchmarks/mcp_load.py --mix tools/list=1,twitter_search=3,xiaohongshu_search=2 --latency 0.05
+    python3 benchmarks/mcp_load.py --target real --replay-har captures/ --rate 2
+
+开环发送（不等上一个响应），报告吞吐、p50/p95/p99 延迟、错误率和服务进程树内存随时间的增长。
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+
+from bench_scrape import tree_rss
+
+DEFAULT_MIX = "tools/list=1,github_search=2,twitter_search=3,xiaohongshu_search=3,agent_reach_stats=1"
+
+# 各工具压测时使用的参数
+TOOL_ARGS: Dict[str, Dict] = {
+    "github_search": {"query": "agent", "limit": 5},
+    "github_view_repo": {"repo": "octocat/hello-world"},
+    "github_repo_snapshot": {"repo": "octocat/hello-world", "issue_limit": 5, "release_limit": 3},
+    "twitter_search": {"query": "AI", "limit": 5},
+    "twitter_timeline": {"user": "benchuser", "limit": 5},
+    "xiaohongshu_search": {"keyword": "咖啡", "limit": 5},
+    "xiaohongshu_note_detail": {"note_id": "65f0bench"},
+    "agent_reach_stats": {},
+    "ai_hashtags": {"content": "压测用的一段内容"},
+}
+
+
+def parse_mix(text: str) -> List[Tuple[str, float]]:
+    mix = []
+    for item in text.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name != "tools/list" and name not in TOOL_ARGS:
+            raise ValueError(f"未知工具: {name}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def percentile(samples: List[float], p: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class LoadRunner:
+    """驱动一个 MCP 服务子进程"""
+
+    def __init__(self, command: List[str], mix: List[Tuple[str, float]], rate: float,
+                 duration: float, sample_interval: float = 1.0, seed: int = 0):
+        self.command = command
+        self.mix = mix
+        self.rate = rate
+        self.duration = duration
+        self.sample_interval = sample_interval
+        self.random = random.Random(seed)
+        self.proc: Optional[subprocess.Popen] = None
+        self.pending: Dict[int, Tuple[str, float]] = {}
+        self.results: List[Tuple[str, float, bool]] = []  # (方法, 延迟秒, 是否出错)
+        self.memory: List[Tuple[float, float]] = []  # (相对时间秒, RSS MB)
+        self.sent = 0
+        self.noise_lines = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._initialized = threading.Event()
+        self._started = 0.0
+        self._last_response = 0.0
+
+    def _write(self, message: Dict):
+        self.proc.stdin.write(json.dumps(message, ensure_ascii=False) + "\n")
+        self.proc.stdin.flush()
+
+    def _request(self, request_id: int, kind: str) -> Dict:
+        if kind == "tools/list":
+            return {"jsonrpc": "2.0", "id": request_id, "method": "tools/list"}
+        return {
+            "jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": kind, "arguments": TOOL_ARGS[kind]},
+        }
+
+    def _read(self):
+        for line in self.proc.stdout:
+            now = time.perf_counter()
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                # 日志等非协议输出
+                self.noise_lines += 1
+                continue
+            if not isinstance(message, dict) or "id" not in message:
+                continue
+            if message["id"] == 0:
+                self._initialized.set()
+                continue
+            with self._lock:
+                entry = self.pending.pop(message["id"], None)
+                if entry is None:
+                    continue
+                kind, sent_at = entry
+                result = message.get("result") or {}
+                failed = "error" in message or bool(result.get("isError"))
+                self.results.append((kind, now - sent_at, failed))
+                self._last_response = now
+                if self._done.is_set() and not self.pending:
+                    return
+
+    def _sample_memory(self):
+        while not self._done.wait(self.sample_interval):
+            self.memory.append((time.perf_counter() - self._started, tree_rss(self.proc.pid) / 1024 / 1024))
+        self.memory.append((time.perf_counter() - self._started, tree_rss(self.proc.pid) / 1024 / 1024))
+
+    def run(self, drain: float = 30.0) -> Dict:
+        self.proc = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, text=True, bufsize=1, cwd=str(ROOT)
+        )
+        reader = threading.Thread(target=self._read, daemon=True)
+        reader.start()
+
+        self._write({"jsonrpc": "2.0", "id": 0, "method": "initialize", "params": {}})
+        if not self._initialized.wait(60):
+            self.proc.kill()
+            raise RuntimeError("MCP 服务初始化超时")
+
+        names = [name for name, _ in self.mix]
+        weights = [weight for _, weight in self.mix]
+        self._started = time.perf_counter()
+        self.memory.append((0.0, tree_rss(self.proc.pid) / 1024 / 1024))
+        sampler = threading.Thread(target=self._sample_memory, daemon=True)
+        sampler.start()
+
+        # 开环发送：按计划时间点发出，不等待响应
+        interval = 1.0 / self.rate
+        request_id = 0
+        while True:
+            due = self._started + request_id * interval
+            if due - self._started >= self.duration:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            request_id += 1
+            kind = self.random.choices(names, weights)[0]
+            with self._lock:
+                self.pending[request_id] = (kind, time.perf_counter())
+            self._write(self._request(request_id, kind))
+            self.sent += 1
+        send_elapsed = time.perf_counter() - self._started
+
+        self._done.set()
+        reader.join(drain)
+        sampler.join()
+        self.proc.stdin.close()
+        try:
+            self.proc.wait(5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        return self.report(send_elapsed)
+
+    def report(self, send_elapsed: float) -> Dict:
+        with self._lock:
+            results = list(self.results)
+            timeouts = len(self.pending)
+
+        def summarize(rows: List[Tuple[str, float, bool]], extra_errors: int = 0) -> Dict:
+            latencies = [latency for _, latency, _ in rows]
+            errors = sum(1 for _, _, failed in rows if failed) + extra_errors
+            total = len(rows) + extra_errors
+            return {
+                "count": len(rows),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+                "p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+                "p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+            }
+
+        elapsed = (self._last_response - self._started) if results else 0.0
+        summary = summarize(results, timeouts)
+        summary.update({
+            "sent": self.sent,
+            "timeouts": timeouts,
+            "offered_rate": round(self.sent / send_elapsed, 2) if send_elapsed else 0.0,
+            "throughput": round(len(results) / elapsed, 2) if elapsed else 0.0,
+            "non_protocol_lines": self.noise_lines,
+        })
+
+        by_method = {}
+        for name in sorted({kind for kind, _, _ in results}):
+            by_method[name] = summarize([row for row in results if row[0] == name])
+
+        rss = [mb for _, mb in self.memory]
+        memory = {
+            "start_mb": round(rss[0], 1),
+            "end_mb": round(rss[-1], 1),
+            "peak_mb": round(max(rss), 1),
+            "growth_mb_per_min": round(self._slope() * 60, 2),
+            "samples": [(round(t, 1), round(mb, 1)) for t, mb in self.memory],
+        }
+        return {"summary": summary, "methods": by_method, "memory": memory}
+
+    def _slope(self) -> float:
+        """RSS 随时间的最小二乘斜率（MB/秒）"""
+        if len(self.memory) < 2:
+            return 0.0
+        n = len(self.memory)
+        mean_t = sum(t for t, _ in self.memory) / n
+        mean_m = sum(m for _, m in self.memory) / n
+        var = sum((t - mean_t) ** 2 for t, _ in self.memory)
+        if not var:
+            return 0.0
+        return sum((t - mean_t) * (m - mean_m) for t, m in self.memory) / var
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP 服务压测")
+    parser.add_argument("--rate", type=float, default=20.0, help="目标请求速率（请求/秒）")
+    parser.add_argument("--duration", type=float, default=10.0, help="发送时长（秒）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="请求配比，如 tools/list=1,twitter_search=3")
+    parser.add_argument("--target", choices=["stub", "real"], default="stub",
+                        help="stub: 替身客户端；real: 真实 mcp_server.py（建议配合 --replay-har）")
+    parser.add_argument("--latency", type=float, default=0.01, help="替身客户端每次调用的耗时（秒）")
+    parser.add_argument("--replay-har", type=Path, default=None, help="real 模式下浏览器工具从 HAR 回放")
+    parser.add_argument("--server-arg", action="append", default=[],
+                        help="额外传给 mcp_server.py 的参数，如 --server-arg=--workers=8")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="内存采样间隔（秒）")
+    parser.add_argument("--drain", type=float, default=30.0, help="发送结束后等待未完成请求的时间（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="as_json", action="store_true", help="输出 JSON")
+    args = parser.parse_args()
+
+    if not sys.platform.startswith("linux"):
+        parser.error("内存采样依赖 /proc，仅支持 Linux")
+
+    if args.target == "stub":
+        command = [sys.executable, str(BENCH_DIR / "mcp_stub_server.py"), "--latency", str(args.latency)]
+    else:
+        command = [sys.executable, str(ROOT / "mcp_server.py")]
+        if args.replay_har:
+            command += ["--replay-har", str(args.replay_har)]
+        command += args.server_arg
+
+    runner = LoadRunner(command, parse_mix(args.mix), args.rate, args.duration,
+                        args.sample_interval, args.seed)
+    report = runner.run(args.drain)
+
+    if args.as_json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    s = report["summary"]
+    print(f"发送 {s['sent']} 个请求（{s['offered_rate']}/秒），完成 {s['count']}，超时 {s['timeouts']}")
+    print(f"吞吐 {s['throughput']}/秒  p50 {s['p50_ms']} ms  p95 {s['p95_ms']} ms  "
+          f"p99 {s['p99_ms']} ms  错误率 {s['error_rate'] * 100:.2f}%")
+    if s["non_protocol_lines"]:
+        print(f"⚠ stdout 中有 {s['non_protocol_lines']} 行非 JSON-RPC 输出")
+
+    print(f"\n{'方法':<26} {'次数':>6} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'错误率':>8}")
+    for name, row in report["methods"].items():
+        print(f"{name:<26} {row['count']:>6} {row['p50_ms']!s:>9} {row['p95_ms']!s:>9} "
+              f"{row['p99_ms']!s:>9} {row['error_rate'] * 100:>7.2f}%")
+
+    m = report["memory"]
+    print(f"\n内存: 起始 {m['start_mb']} MB  结束 {m['end_mb']} MB  峰值 {m['peak_mb']} MB  "
+          f"增长 {m['growth_mb_per_min']} MB/分钟")
+    print("  " + "  ".join(f"{t}s:{mb}" for t, mb in m["samples"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+替身客户端版本的 MCP 服务 - 仅用于压测
+GitHub / Twitter / 小红书客户端换成返回固定数据的替身，可模拟每次调用的延迟，
+用来测 JSON-RPC 分发、序列化和 _meta 统计本身的开销
+
+    python3 benchmarks/mcp_stub_server.py --latency 0.02
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "modules"))
+
+from base import configure_logging, span
+from mcp_server import MCPServer
+
+
+class StubClient:
+    """按操作名记录分阶段耗时并返回固定数据"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def _work(self, op: str):
+        with span("navigate", op):
+            time.sleep(self.latency)
+
+
+class StubGitHubClient(StubClient):
+    def search_repos(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        self._work("gh.search.repos")
+        return [
+            {"full_name": f"stub/{query}-{i}", "description": "替身仓库", "stargazersCount": i * 10}
+            for i in range(limit)
+        ]
+
+    def get_repo(self, repo: str) -> Dict[str, Any]:
+        self._work("gh.repo.view")
+        return {"name": repo.split("/")[-1], "owner": {"login": repo.split("/")[0]}, "stargazerCount": 42}
+
+    def repo_snapshot(self, repo: str, issue_limit: int = 10, release_limit: int = 5) -> Dict[str, Any]:
+        self._work("gh.snapshot")
+        return {"repository": self.get_repo(repo), "issues": [], "readme": "", "languages": {}, "releases": []}
+
+
+class StubTwitterClient(StubClient):
+    def _tweets(self, op: str, limit: int) -> List[Dict[str, Any]]:
+        self._work(op)
+        return [
+            {"id": f"{i}", "url": f"https://x.com/user{i}/status/{i}", "user": f"user{i}",
+             "text": f"替身推文 {i}", "time": "2026-01-01T00:00:00.000Z",
+             "likes": i, "retweets": 0, "replies": 0}
+            for i in range(limit)
+        ]
+
+    def search(self, query: str, limit: int = 10):
+        return self._tweets("twitter.search", limit)
+
+    def get_timeline(self, user: Optional[str] = None, limit: int = 10):
+        return self._tweets("twitter.timeline", limit)
+
+    def post_tweet(self, text: str = None, **kwargs) -> Dict[str, Any]:
+        self._work("twitter.post")
+        return {"success": True, "message": "推文已发布"}
+
+
+class StubXiaoHongShuClient(StubClient):
+    def search(self, keyword: str, limit: int = 10):
+        self._work("xiaohongshu.search")
+        return [
+            {"id": f"stub{i}", "title": f"替身笔记 {i}", "user": "作者", "likes": i,
+             "url": f"https://www.xiaohongshu.com/explore/stub{i}", "images": []}
+            for i in range(limit)
+        ]
+
+    def get_note_detail(self, note_id: str) -> Dict[str, Any]:
+        self._work("xiaohongshu.note_detail")
+        return {"id": note_id, "title": "替身笔记", "content": "内容", "author": "作者", "url": ""}
+
+    def like_note(self, note_id: str) -> Dict[str, Any]:
+        self._work("xiaohongshu.like")
+        return {"success": True}
+
+
+class StubMCPServer(MCPServer):
+    """只替换客户端工厂，其余逻辑与真实服务一致"""
+
+    def __init__(self, latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    def _github_client(self):
+        return StubGitHubClient(self.latency)
+
+    def _twitter_client(self):
+        return StubTwitterClient(self.latency)
+
+    def _xiaohongshu_client(self):
+        return StubXiaoHongShuClient(self.latency)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="替身客户端版本的 MCP 服务")
+    parser.add_argument("--latency", type=float, default=0.0, help="每次工具调用的模拟耗时（秒）")
+    args = parser.parse_args(argv)
+    configure_logging(os.getenv("AGENT_REACH_LOG", "plain"))
+    StubMCPServer(latency=args.latency).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,21 @@ Agent-Reach MCP Server
 让 OpenClaw 能直接调用 Agent-Reach 功能
 """
 
+import itertools
 import json
+import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 # 添加 modules 到路径
 sys.path.insert(0, str(Path(__file__).parent / "modules"))
 
+from base import Collector, collect, configure_logging, metrics
+from profiling import Profiler
 from github import GitHubClient
 from twitter import TwitterClient
 from xiaohongshu import XiaoHongShuClient
@@ -20,9 +27,33 @@ from xiaohongshu import XiaoHongShuClient
 class MCPServer:
     """MCP 服务器实现"""
     
-    def __init__(self):
+    def __init__(self, profile_mode: Optional[str] = None, profile_dir: Optional[Path] = None,
+                 replay_har: Optional[Path] = None, workers: int = 0, worker_routing: str = "sticky",
+                 persistent_profile: Optional[bool] = None, launch_profile: Optional[str] = None):
         self.cookies_dir = Path(__file__).parent / "cookies"
+        # 浏览器类工具从 HAR 回放，用于离线压测
+        self.replay_har = replay_har
+        # 按账号保留浏览器 profile，静态资源走磁盘缓存
+        self.persistent_profile = persistent_profile
+        self.launch_profile = launch_profile
+        # worker 模式：浏览器读任务分发到多个进程，工具调用并发处理
+        self.farm = None
+        self._executor = None
+        if workers:
+            from worker_farm import WorkerFarm
+            self.farm = WorkerFarm(workers, routing=worker_routing)
+            self._executor = ThreadPoolExecutor(max_workers=workers * 2, thread_name_prefix="mcp-call")
         self.tools = self._define_tools()
+        self._write_lock = threading.Lock()
+        # watch 订阅：每个订阅一个后台线程，新条目经 notifications/message 推送
+        self._watches: Dict[str, Any] = {}
+        self._watch_ids = itertools.count(1)
+        # 剖析模式：每次工具调用单独输出一份剖析结果
+        self.profile_mode = profile_mode
+        self.profile_dir = profile_dir
+        # 常驻进程默认采集分阶段耗时，AGENT_REACH_METRICS=0 可关闭
+        if os.getenv("AGENT_REACH_METRICS") is None:
+            metrics.enabled = True
     
     def _define_tools(self) -> List[Dict]:
         """定义可用工具"""
@@ -50,6 +81,19 @@ class MCPServer:
                     "required": ["repo"]
                 }
             },
+            {
+                "name": "github_repo_snapshot",
+                "description": "并发获取 GitHub 仓库快照（详情、Issues、README、语言、Release）",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "repo": {"type": "string", "description": "仓库名 (格式: owner/repo)"},
+                        "issue_limit": {"type": "integer", "description": "Issue 数量", "default": 10},
+                        "release_limit": {"type": "integer", "description": "Release 数量", "default": 5}
+                    },
+                    "required": ["repo"]
+                }
+            },
             {
                 "name": "twitter_search",
                 "description": "搜索 Twitter/X 推文",
@@ -57,7 +101,8 @@ class MCPServer:
                     "type": "object",
                     "properties": {
                         "query": {"type": "string", "description": "搜索关键词"},
-                        "limit": {"type": "integer", "description": "返回数量", "default": 5}
+                        "limit": {"type": "integer", "description": "返回数量", "default": 5},
+                        "dedup": {"type": "boolean", "description": "合并近似重复的推文（转发、复制粘贴），每条带 cluster_size", "default": False}
                     },
                     "required": ["query"]
                 }
@@ -92,7 +137,8 @@ class MCPServer:
                     "type": "object",
                     "properties": {
                         "keyword": {"type": "string", "description": "搜索关键词"},
-                        "limit": {"type": "integer", "description": "返回数量", "default": 5}
+                        "limit": {"type": "integer", "description": "返回数量", "default": 5},
+                        "dedup": {"type": "boolean", "description": "合并近似重复的笔记，每条带 cluster_size", "default": False}
                     },
                     "required": ["keyword"]
                 }
@@ -118,19 +164,139 @@ class MCPServer:
                     },
                     "required": ["note_id"]
                 }
+            },
+            {
+                "name": "watch_start",
+                "description": "订阅 Twitter/X 或小红书搜索：后台持续轮询，新条目经 notifications/message 推送，也可用 watch_poll 拉取",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "platform": {"type": "string", "enum": ["twitter", "xiaohongshu"]},
+                        "query": {"type": "string", "description": "搜索关键词"},
+                        "limit": {"type": "integer", "description": "每轮提取的条目数", "default": 20},
+                        "min_interval": {"type": "number", "description": "最短轮询间隔（秒）"},
+                        "max_interval": {"type": "number", "description": "没有新条目时的最长轮询间隔（秒）"},
+                        "skip_existing": {"type": "boolean", "description": "不推送订阅时已有的条目", "default": False},
+                        "persist": {"type": "boolean", "description": "已见 ID 存到磁盘，服务重启后同一订阅不重复推送", "default": False},
+                        "dedup": {"type": "boolean", "description": "不推送与已推送内容近似重复的条目", "default": False}
+                    },
+                    "required": ["platform", "query"]
+                }
+            },
+            {
+                "name": "watch_poll",
+                "description": "取走 watch 订阅自上次拉取以来的新条目",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "watch_id": {"type": "string", "description": "watch_start 返回的订阅 ID"}
+                    },
+                    "required": ["watch_id"]
+                }
+            },
+            {
+                "name": "watch_stop",
+                "description": "停止 watch 订阅，返回尚未拉取的条目",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "watch_id": {"type": "string", "description": "watch_start 返回的订阅 ID"}
+                    },
+                    "required": ["watch_id"]
+                }
+            },
+            {
+                "name": "agent_reach_stats",
+                "description": "导出本进程的分阶段耗时直方图（浏览器启动、导航、等待、提取、子进程、LLM）",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "format": {"type": "string", "enum": ["json", "prometheus"], "default": "json"}
+                    }
+                }
+            },
+            {
+                "name": "ai_content",
+                "description": "AI 生成推文或小红书笔记（请求带 progressToken 时流式推送进度）",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "topic": {"type": "string", "description": "主题"},
+                        "platform": {"type": "string", "enum": ["twitter", "xiaohongshu"], "default": "twitter"},
+                        "tone": {"type": "string", "description": "语气 / 风格", "default": "casual"}
+                    },
+                    "required": ["topic"]
+                }
+            },
+            {
+                "name": "ai_hashtags",
+                "description": "AI 生成 Hashtag（请求带 progressToken 时流式推送进度）",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "content": {"type": "string", "description": "内容"},
+                        "platform": {"type": "string", "enum": ["twitter", "xiaohongshu"], "default": "twitter"}
+                    },
+                    "required": ["content"]
+                }
             }
         ]
     
     def run(self):
         """运行 MCP 服务器"""
-        for line in sys.stdin:
-            try:
-                request = json.loads(line)
-                response = self._handle_request(request)
-                if response:
-                    print(json.dumps(response, ensure_ascii=False), flush=True)
-            except json.JSONDecodeError:
-                continue
+        try:
+            for line in sys.stdin:
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if self._executor is not None and request.get("method") == "tools/call":
+                    self._executor.submit(self._dispatch, request)
+                else:
+                    self._dispatch(request)
+        finally:
+            for subscription in list(self._watches.values()):
+                subscription.stop()
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+            if self.farm is not None:
+                self.farm.close()
+    
+    def _dispatch(self, request: Dict):
+        response = self._handle_request(request)
+        if response:
+            self._send(response)
+    
+    def _send(self, message: Dict):
+        """写出一条 JSON-RPC 消息"""
+        line = json.dumps(message, ensure_ascii=False)
+        with self._write_lock:
+            print(line, flush=True)
+    
+    def _notify_progress(self, token: Any, progress: int, message: str = ""):
+        """发送 MCP 进度通知"""
+        params = {"progressToken": token, "progress": progress}
+        if message:
+            params["message"] = message
+        self._send({"jsonrpc": "2.0", "method": "notifications/progress", "params": params})
+    
+    def _notify_watch(self, watch_id: str, item: Dict):
+        """推送 watch 订阅的一个新条目"""
+        self._send({
+            "jsonrpc": "2.0", "method": "notifications/message",
+            "params": {"level": "info", "logger": "agent-reach.watch", "data": {"watch_id": watch_id, "item": item}}
+        })
+    
+    def _stream_text(self, chunks, progress_token: Any = None) -> str:
+        """消费流式生成结果，有 progressToken 时逐段推送进度"""
+        parts = []
+        length = 0
+        for chunk in chunks:
+            parts.append(chunk)
+            length += len(chunk)
+            if progress_token is not None:
+                self._notify_progress(progress_token, length, chunk)
+        return "".join(parts)
     
     def _handle_request(self, request: Dict) -> Optional[Dict]:
         """处理请求"""
@@ -143,7 +309,7 @@ class MCPServer:
                 "id": request_id,
                 "result": {
                     "protocolVersion": "2024-11-05",
-                    "capabilities": {"tools": {}},
+                    "capabilities": {"tools": {}, "logging": {}},
                     "serverInfo": {
                         "name": "agent-reach-mcp",
                         "version": "1.0.0"
@@ -170,73 +336,260 @@ class MCPServer:
         tool_name = params.get("name")
         arguments = params.get("arguments", {})
         
-        try:
-            result = self._execute_tool(tool_name, arguments)
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "content": [{"type": "text", "text": json.dumps(result, ensure_ascii=False, indent=2)}]
-                }
-            }
-        except Exception as e:
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "error": {
-                    "code": -32603,
-                    "message": f"工具执行失败: {str(e)}"
+        progress_token = (params.get("_meta") or {}).get("progressToken")
+        started = time.perf_counter()
+        
+        with collect() as collector:
+            try:
+                if self.profile_mode:
+                    with Profiler(f"{tool_name}-{request_id}", mode=self.profile_mode,
+                                  output_dir=self.profile_dir):
+                        result = self._execute_tool(tool_name, arguments, progress_token)
+                else:
+                    result = self._execute_tool(tool_name, arguments, progress_token)
+            except Exception as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {
+                        "code": -32603,
+                        "message": f"工具执行失败: {str(e)}",
+                        "data": {"_meta": self._build_meta(None, collector, started)}
+                    }
                 }
+        
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": {
+                "content": [{"type": "text", "text": json.dumps(result, ensure_ascii=False, indent=2)}],
+                "_meta": self._build_meta(result, collector, started)
             }
+        }
+    
+    def _build_meta(self, result: Any, collector: Collector, started: float) -> Dict:
+        """本次调用的耗时信息，供调度方按实测成本路由"""
+        stages = {
+            stage: round(seconds * 1000, 1)
+            for stage, (seconds, _) in sorted(collector.stages.items())
+        }
+        events = collector.events
+        
+        cache = None
+        hits, misses = events.get("llm_cache.hit", 0), events.get("llm_cache.miss", 0)
+        if hits or misses:
+            cache = {"hits": hits, "misses": misses}
+        
+        launches = collector.stage_count("launch")
+        reuses = events.get("browser.reuse", 0)
+        browser = None
+        if launches:
+            browser = "cold"
+        elif reuses:
+            browser = "reused"
+        
+        fast_path = None
+        if any(event.endswith(".fast_path.hit") for event in events):
+            fast_path = "hit"
+        elif any(event.endswith(".fast_path.fallback") for event in events):
+            fast_path = "fallback"
+        
+        return {
+            "wall_ms": round((time.perf_counter() - started) * 1000, 1),
+            "stages_ms": stages,
+            "cache": cache,
+            "browser": browser,
+            "browser_launches": launches,
+            "fast_path": fast_path,
+            "records": self._count_records(result),
+            "events": dict(events),
+        }
+    
+    def _count_records(self, result: Any) -> Optional[int]:
+        """统计结果里返回的记录数（tweets / notes / repositories 等列表）"""
+        if isinstance(result, list):
+            return len(result)
+        if not isinstance(result, dict):
+            return None
+        counts = [len(v) for v in result.values() if isinstance(v, list)]
+        if counts:
+            return sum(counts)
+        return 1 if result else 0
+    
+    def _github_client(self) -> GitHubClient:
+        return GitHubClient()
+    
+    def _client_kwargs(self, platform: str) -> Dict[str, Any]:
+        return {"cookie_file": self.cookies_dir / f"{platform}.json", "replay_har": self.replay_har,
+                "persistent_profile": self.persistent_profile, "launch_profile": self.launch_profile}
+    
+    def _twitter_client(self) -> TwitterClient:
+        kwargs = self._client_kwargs("twitter")
+        if self.farm is not None:
+            from worker_farm import FarmClient
+            return FarmClient(self.farm, "twitter", **kwargs)
+        return TwitterClient(**kwargs)
+    
+    def _xiaohongshu_client(self) -> XiaoHongShuClient:
+        kwargs = self._client_kwargs("xiaohongshu")
+        if self.farm is not None:
+            from worker_farm import FarmClient
+            return FarmClient(self.farm, "xiaohongshu", **kwargs)
+        return XiaoHongShuClient(**kwargs)
+    
+    def _watch_client(self, platform: str):
+        """watch 长时间占着一个页面，不进 worker，在订阅线程里单独创建客户端"""
+        cls = TwitterClient if platform == "twitter" else XiaoHongShuClient
+        return cls(**self._client_kwargs(platform))
+    
+    def _start_watch(self, args: Dict) -> Dict:
+        from seen_set import SeenSet, default_path
+        from watch import Subscription, Watcher
+        
+        platform = args["platform"]
+        if platform not in ("twitter", "xiaohongshu"):
+            raise ValueError(f"不支持 watch 的平台: {platform}")
+        query, limit = args["query"], args.get("limit", 20)
+        seen_set = SeenSet(default_path(f"{platform}-{query}")) if args.get("persist") else None
+        near_dup = None
+        if args.get("dedup"):
+            from dedup import NearDuplicateIndex
+            near_dup = NearDuplicateIndex()
+        watcher = Watcher(min_interval=args.get("min_interval"), max_interval=args.get("max_interval"),
+                          skip_existing=args.get("skip_existing", False), seen_set=seen_set, near_dup=near_dup)
+        
+        def source(watcher):
+            return self._watch_client(platform).watch(query, limit, watcher=watcher)
+        
+        watch_id = f"{platform}-{next(self._watch_ids)}"
+        self._watches[watch_id] = Subscription(watch_id, source, watcher, on_item=self._notify_watch)
+        return {"watch_id": watch_id, "min_interval": watcher.min_interval, "max_interval": watcher.max_interval}
     
-    def _execute_tool(self, name: str, args: Dict) -> Dict:
+    def _maybe_dedup(self, records: List[Dict], args: Dict) -> List[Dict]:
+        """dedup 参数为真时每组近似重复只返回代表条目"""
+        if not args.get("dedup") or not records:
+            return records
+        from dedup import dedup_records
+        return dedup_records(records)
+    
+    def _get_watch(self, watch_id: str):
+        subscription = self._watches.get(watch_id)
+        if subscription is None:
+            raise ValueError(f"未知 watch: {watch_id}")
+        return subscription
+    
+    def _execute_tool(self, name: str, args: Dict, progress_token: Any = None) -> Dict:
         """执行具体工具"""
         
         # GitHub 工具
         if name == "github_search":
-            client = GitHubClient()
+            client = self._github_client()
             return {"repositories": client.search_repos(args["query"], args.get("limit", 10))}
         
         elif name == "github_view_repo":
-            client = GitHubClient()
+            client = self._github_client()
             return {"repository": client.get_repo(args["repo"])}
         
+        elif name == "github_repo_snapshot":
+            client = self._github_client()
+            return client.repo_snapshot(
+                args["repo"],
+                issue_limit=args.get("issue_limit", 10),
+                release_limit=args.get("release_limit", 5)
+            )
+        
         # Twitter 工具
         elif name == "twitter_search":
-            cookie_file = self.cookies_dir / "twitter.json"
-            client = TwitterClient(cookie_file)
-            return {"tweets": client.search(args["query"], args.get("limit", 5))}
+            client = self._twitter_client()
+            return {"tweets": self._maybe_dedup(client.search(args["query"], args.get("limit", 5)), args)}
         
         elif name == "twitter_timeline":
-            cookie_file = self.cookies_dir / "twitter.json"
-            client = TwitterClient(cookie_file)
+            client = self._twitter_client()
             return {"tweets": client.get_timeline(args["user"], args.get("limit", 5))}
         
         elif name == "twitter_post":
-            cookie_file = self.cookies_dir / "twitter.json"
-            client = TwitterClient(cookie_file)
+            client = self._twitter_client()
             return client.post_tweet(args["text"])
         
         # 小红书工具
         elif name == "xiaohongshu_search":
-            cookie_file = self.cookies_dir / "xiaohongshu.json"
-            client = XiaoHongShuClient(cookie_file)
-            return {"notes": client.search(args["keyword"], args.get("limit", 5))}
+            client = self._xiaohongshu_client()
+            return {"notes": self._maybe_dedup(client.search(args["keyword"], args.get("limit", 5)), args)}
         
         elif name == "xiaohongshu_note_detail":
-            cookie_file = self.cookies_dir / "xiaohongshu.json"
-            client = XiaoHongShuClient(cookie_file)
+            client = self._xiaohongshu_client()
             return {"note": client.get_note_detail(args["note_id"])}
         
         elif name == "xiaohongshu_like":
-            cookie_file = self.cookies_dir / "xiaohongshu.json"
-            client = XiaoHongShuClient(cookie_file)
+            client = self._xiaohongshu_client()
             return client.like_note(args["note_id"])
         
+        # watch 订阅
+        elif name == "watch_start":
+            return self._start_watch(args)
+        
+        elif name == "watch_poll":
+            subscription = self._get_watch(args["watch_id"])
+            return {"items": subscription.drain(), "status": subscription.stats()}
+        
+        elif name == "watch_stop":
+            subscription = self._watches.pop(args["watch_id"], None) or self._get_watch(args["watch_id"])
+            subscription.stop()
+            return {"items": subscription.drain(), "status": subscription.stats()}
+        
+        # 指标
+        elif name == "agent_reach_stats":
+            if args.get("format") == "prometheus":
+                return {"prometheus": metrics.to_prometheus()}
+            return metrics.to_json()
+        
+        # AI 生成工具
+        elif name == "ai_content":
+            from content_generator import ContentGenerator
+            generator = ContentGenerator()
+            topic = args["topic"]
+            tone = args.get("tone", "casual")
+            if args.get("platform", "twitter") == "xiaohongshu":
+                text = self._stream_text(generator.stream_note(topic, tone), progress_token)
+                return {"note": generator.parse_note(text, topic)}
+            return {"tweet": self._stream_text(generator.stream_tweet(topic, tone), progress_token)}
+        
+        elif name == "ai_hashtags":
+            from content_generator import ContentGenerator
+            generator = ContentGenerator()
+            stream = generator.stream_hashtags(args["content"], args.get("platform", "twitter"))
+            return {"hashtags": self._stream_text(stream, progress_token)}
+        
         else:
             raise ValueError(f"未知工具: {name}")
 
 
 if __name__ == "__main__":
-    server = MCPServer()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Agent-Reach MCP Server")
+    parser.add_argument("--profile", choices=["cprofile", "sample"], default=None,
+                        help="剖析每次工具调用: cprofile 输出 .prof，sample 输出火焰图数据")
+    parser.add_argument("--profile-dir", type=Path, default=None,
+                        help="剖析结果目录 (默认: ~/.cache/agent-reach/profiles)")
+    parser.add_argument("--replay-har", type=Path, default=None,
+                        help="Twitter / 小红书工具只从 HAR 回放（离线压测用）")
+    parser.add_argument("--persistent-profile", action="store_true", default=None,
+                        help="按账号保留浏览器 profile，静态资源走磁盘缓存")
+    parser.add_argument("--launch-profile", choices=["default", "lean", "compat"], default=None,
+                        help="浏览器启动配置 (默认: AGENT_REACH_LAUNCH_PROFILE 或 default)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="浏览器 worker 进程数，0 表示在本进程执行（默认）")
+    parser.add_argument("--worker-routing", choices=["sticky", "least_loaded"], default="sticky",
+                        help="sticky: 同一账号固定到同一 worker；least_loaded: 分给最空闲的 worker")
+    parser.add_argument("--log-format", choices=["rich", "plain", "json"],
+                        default=os.getenv("AGENT_REACH_LOG", "plain"),
+                        help="日志格式（写 stderr），默认 plain，经后台线程写出")
+    args = parser.parse_args()
+
+    configure_logging(args.log_format)
+
+    server = MCPServer(profile_mode=args.profile, profile_dir=args.profile_dir, replay_har=args.replay_har,
+                       workers=args.workers, worker_routing=args.worker_routing,
+                       persistent_profile=args.persistent_profile, launch_profile=args.launch_profile)
     server.run()
@@ -0,0 +1,253 @@
+"""
+互动数据分析 - 把采集到的推文 / 笔记记录装进 NumPy 列数组，统计全部用向量化运算完成
+百万级记录的报告只在读入时逐条解析一次，之后不再有 Python 层的逐条循环
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from base import get_logger
+
+logger = get_logger(__name__)
+
+# MCP 结果里记录所在的键
+LIST_KEYS = ("tweets", "notes", "items", "records")
+
+
+def _iter_json(data: Any) -> Iterator[Dict[str, Any]]:
+    if isinstance(data, list):
+        for item in data:
+            yield from _iter_json(item)
+    elif isinstance(data, dict):
+        for key in LIST_KEYS:
+            if isinstance(data.get(key), list):
+                yield from _iter_json(data[key])
+                return
+        if "note" in data and isinstance(data["note"], dict):
+            yield data["note"]
+        else:
+            yield data
+
+
+def load_records(paths: Sequence[Union[str, Path]]) -> Iterator[Dict[str, Any]]:
+    """逐条读出记录：支持 JSONL（watch 输出）、JSON 列表和 MCP 结果（{"tweets": [...]} 等）；- 表示 stdin"""
+    for path in paths:
+        stream = sys.stdin if str(path) == "-" else open(path, encoding="utf-8")
+        try:
+            text = stream.read()
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        stripped = text.lstrip()
+        if not stripped:
+            continue
+        try:
+            yield from _iter_json(json.loads(stripped))
+            continue
+        except json.JSONDecodeError:
+            pass
+        # JSONL：每行一条记录是常见情况，直接产出
+        for lineno, line in enumerate(text.splitlines(), 1):
+            if not line or line.isspace():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("%s:%s 不是合法 JSON，已跳过", path, lineno)
+                continue
+            if isinstance(data, dict) and "id" in data:
+                yield data
+            else:
+                yield from _iter_json(data)
+
+
+def _to_int64(values: List[Any]) -> np.ndarray:
+    """计数列 -> int64；个别值不是整数时逐个转换，失败记 0"""
+    try:
+        return np.array(values, dtype=np.int64)
+    except (TypeError, ValueError, OverflowError):
+        out = np.zeros(len(values), dtype=np.int64)
+        for i, value in enumerate(values):
+            try:
+                out[i] = int(value)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        return out
+
+
+def _to_datetime(values: List[str]) -> np.ndarray:
+    """ISO 时间字符串 -> datetime64[s]（UTC），空值和无法解析的记为 NaT"""
+    # numpy 不接受带时区后缀的字符串，页面 / 接口给出的都是 UTC
+    cleaned = [v[:-1] if v.endswith("Z") else v for v in values]
+    try:
+        return np.array(cleaned, dtype="datetime64[s]")
+    except ValueError:
+        out = np.full(len(cleaned), np.datetime64("NaT"), dtype="datetime64[s]")
+        for i, value in enumerate(cleaned):
+            try:
+                out[i] = np.datetime64(value, "s")
+            except ValueError:
+                pass
+        return out
+
+
+class RecordTable:
+    """推文 / 笔记记录的列存表
+
+    列：ids、authors（作者编码，对应 author_names）、likes / retweets / replies（int64）、
+    times（datetime64[s]，没有时间的记录为 NaT）
+    """
+
+    def __init__(self, ids: np.ndarray, author_codes: np.ndarray, author_names: np.ndarray,
+                 likes: np.ndarray, retweets: np.ndarray, replies: np.ndarray, times: np.ndarray):
+        self.ids = ids
+        self.author_codes = author_codes
+        self.author_names = author_names
+        self.likes = likes
+        self.retweets = retweets
+        self.replies = replies
+        self.times = times
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], dedup: bool = True) -> "RecordTable":
+        """从记录字典构建；dedup 时按 id（没有 id 时按 url）去重，保留最后一次采集到的计数"""
+        ids: List[str] = []
+        authors: List[str] = []
+        likes: List[Any] = []
+        retweets: List[Any] = []
+        replies: List[Any] = []
+        times: List[str] = []
+        # 读入是唯一的逐条循环，保持尽量少的操作；类型转换留给整列进行
+        for record in records:
+            get = record.get
+            ids.append(str(get("id") or get("url") or ""))
+            authors.append(str(get("user") or get("author") or ""))
+            likes.append(get("likes") or 0)
+            retweets.append(get("retweets") or 0)
+            replies.append(get("replies") or 0)
+            times.append(get("time") or "NaT")
+
+        author_names, author_codes = np.unique(np.array(authors, dtype=str), return_inverse=True)
+        table = cls(
+            np.array(ids, dtype=str),
+            author_codes.astype(np.int64),
+            author_names,
+            _to_int64(likes),
+            _to_int64(retweets),
+            _to_int64(replies),
+            _to_datetime(times),
+        )
+        return table.deduplicated() if dedup else table
+
+    def __len__(self) -> int:
+        return len(self.likes)
+
+    def _take(self, index: np.ndarray) -> "RecordTable":
+        return RecordTable(self.ids[index], self.author_codes[index], self.author_names,
+                           self.likes[index], self.retweets[index], self.replies[index], self.times[index])
+
+    def deduplicated(self) -> "RecordTable":
+        """同一 id 只保留最后一条；没有 id 的记录全部保留"""
+        if not len(self):
+            return self
+        keys = self.ids
+        # 反转后 np.unique 的 return_index 取到的是每个 id 最后一次出现的位置
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = np.zeros(len(self), dtype=bool)
+        keep[len(self) - 1 - last] = True
+        keep |= keys == ""
+        return self if keep.all() else self._take(np.flatnonzero(keep))
+
+    @property
+    def engagement(self) -> np.ndarray:
+        """每条记录的互动数：点赞 + 转发 + 评论"""
+        return self.likes + self.retweets + self.replies
+
+    def engagement_rates(self, reference: Optional[np.datetime64] = None, min_hours: float = 1.0) -> np.ndarray:
+        """每小时互动数：互动数 / 发布至今的小时数（不足 min_hours 按 min_hours 计）
+
+        reference 默认取记录里最新的时间；没有时间的记录为 NaN
+        """
+        valid = ~np.isnat(self.times)
+        rates = np.full(len(self), np.nan)
+        if not valid.any():
+            return rates
+        if reference is None:
+            reference = self.times[valid].max()
+        hours = (np.datetime64(reference, "s") - self.times[valid]).astype(np.float64) / 3600
+        rates[valid] = self.engagement[valid] / np.maximum(hours, min_hours)
+        return rates
+
+    def summary(self, percentiles: Sequence[float] = (50, 90, 99)) -> Dict[str, Any]:
+        """各计数列及互动数的合计、均值和分位数"""
+        columns = {
+            "likes": self.likes, "retweets": self.retweets,
+            "replies": self.replies, "engagement": self.engagement,
+        }
+        present = np.unique(self.author_codes)
+        authors = int(np.count_nonzero(self.author_names[present] != ""))
+        result: Dict[str, Any] = {"records": len(self), "authors": authors}
+        rates = self.engagement_rates()
+        if not np.isnan(rates).all():
+            columns["engagement_per_hour"] = rates[~np.isnan(rates)]
+        for name, values in columns.items():
+            if not len(values):
+                continue
+            stats = {"total": round(values.sum().item(), 2), "mean": round(float(values.mean()), 2)}
+            for p, value in zip(percentiles, np.percentile(values, percentiles)):
+                stats[f"p{p:g}"] = round(float(value), 2)
+            result[name] = stats
+        valid = ~np.isnat(self.times)
+        if valid.any():
+            result["first"] = str(self.times[valid].min())
+            result["last"] = str(self.times[valid].max())
+        return result
+
+    def hourly(self) -> Dict[str, List[float]]:
+        """按 UTC 小时（0–23）统计发帖数和平均互动数"""
+        valid = ~np.isnat(self.times)
+        hours = (self.times[valid].astype(np.int64) // 3600) % 24
+        posts = np.bincount(hours, minlength=24)
+        engagement = np.bincount(hours, weights=self.engagement[valid], minlength=24)
+        mean = np.divide(engagement, posts, out=np.zeros(24), where=posts > 0)
+        return {"posts": posts.tolist(), "mean_engagement": np.round(mean, 2).tolist()}
+
+    def top_authors(self, n: int = 10, by: str = "engagement") -> List[Dict[str, Any]]:
+        """按总互动数（by="engagement"）或发帖数（by="posts"）排前 n 的作者"""
+        size = len(self.author_names)
+        posts = np.bincount(self.author_codes, minlength=size)
+        engagement = np.bincount(self.author_codes, weights=self.engagement, minlength=size)
+        if by not in ("engagement", "posts"):
+            raise ValueError(f"未知排序方式: {by}")
+        score = engagement if by == "engagement" else posts.astype(np.float64)
+        # 匿名作者和去重后已没有记录的作者不参与排名
+        score = np.where((self.author_names == "") | (posts == 0), -1, score)
+        n = min(n, size)
+        if n <= 0:
+            return []
+        top = np.argpartition(-score, n - 1)[:n]
+        top = top[np.argsort(-score[top], kind="stable")]
+        return [
+            {
+                "author": str(self.author_names[i]),
+                "posts": int(posts[i]),
+                "engagement": int(engagement[i]),
+                "mean_engagement": round(float(engagement[i] / posts[i]), 2),
+            }
+            for i in top if score[i] >= 0
+        ]
+
+
+def analyze(records: Iterable[Dict[str, Any]], top: int = 10, by: str = "engagement",
+            dedup: bool = True) -> Dict[str, Any]:
+    """完整报告：汇总 + 分位数、按小时分布、头部作者"""
+    table = RecordTable.from_records(records, dedup=dedup)
+    return {
+        "summary": table.summary(),
+        "hourly": table.hourly(),
+        "top_authors": table.top_authors(top, by=by),
+    }
@@ -2,24 +2,393 @@
 Agent-Reach 基类模块
 """
 
+import atexit
 import json
 import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import httpx
-from rich.logging import RichHandler
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True)]
-)
+# ==================== 日志 ====================
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """一行一个 JSON 对象，便于日志采集"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """原样入队：消息插值、格式化和写出都在 QueueListener 线程完成
+
+    标准 QueueHandler.prepare 会在调用线程里格式化（为跨进程 pickle 准备），
+    这里队列只在进程内使用，不需要。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_module_levels: List[str] = []
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(mode: Optional[str] = None, level: Optional[str] = None,
+                      levels: Optional[str] = None):
+    """配置日志后端
+
+    mode: rich（交互式 CLI，默认）、plain 或 json；plain / json 经 QueueHandler 交给后台线程写出
+    level: 全局级别，默认 INFO
+    levels: 按模块设置级别，如 "agent-reach.twitter=DEBUG,httpx=WARNING"
+    未传的参数依次读取 AGENT_REACH_LOG / AGENT_REACH_LOG_LEVEL / AGENT_REACH_LOG_LEVELS。
+    日志一律写 stderr，stdout 留给命令输出和 MCP 协议。
+    """
+    mode = mode or os.getenv("AGENT_REACH_LOG", "rich")
+    level = (level or os.getenv("AGENT_REACH_LOG_LEVEL", "INFO")).upper()
+    levels = levels if levels is not None else os.getenv("AGENT_REACH_LOG_LEVELS", "")
+    if mode not in ("rich", "plain", "json"):
+        raise ValueError(f"未知日志模式: {mode}")
+
+    root = logging.getLogger()
+    _stop_listener()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level)
+
+    if mode == "rich":
+        from rich.console import Console
+        from rich.logging import RichHandler
+
+        handler = RichHandler(console=Console(stderr=True), rich_tracebacks=True)
+        handler.setFormatter(logging.Formatter("%(message)s", datefmt="[%X]"))
+        root.addHandler(handler)
+    else:
+        global _listener
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter() if mode == "json" else logging.Formatter(LOG_FORMAT))
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        root.addHandler(_QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, handler)
+        _listener.start()
+
+    # 重新配置时先清掉上一次的按模块级别
+    while _module_levels:
+        logging.getLogger(_module_levels.pop()).setLevel(logging.NOTSET)
+    for item in filter(None, (part.strip() for part in levels.split(","))):
+        name, _, value = item.partition("=")
+        logging.getLogger(name.strip()).setLevel(value.strip().upper())
+        _module_levels.append(name.strip())
+
+
+def get_logger(name: str) -> logging.Logger:
+    """模块日志器，挂在 agent-reach 下，可按模块单独设置级别"""
+    return logging.getLogger(f"agent-reach.{name}")
+
+
+configure_logging()
+atexit.register(_stop_listener)
 logger = logging.getLogger("agent-reach")
 
+# 本地缓存目录（认证状态、生成缓存等）
+CACHE_DIR = Path(os.getenv("AGENT_REACH_CACHE_DIR", Path.home() / ".cache" / "agent-reach"))
+
+
+# ==================== 分阶段计时 ====================
+class Histogram:
+    """固定桶的耗时直方图（秒）"""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)  # 最后一个桶是 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        i = 0
+        for bound in self.BUCKETS:
+            if seconds <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+    def merge(self, data: Dict[str, Any]):
+        for i, c in enumerate(data.get("counts", [])[:len(self.counts)]):
+            self.counts[i] += c
+        self.sum += data.get("sum", 0.0)
+        self.count += data.get("count", 0)
+
+
+class Span:
+    """计时上下文，退出时把耗时记入 Metrics"""
+
+    __slots__ = ("metrics", "stage", "op", "started")
+
+    def __init__(self, metrics: "Metrics", stage: str, op: str):
+        self.metrics = metrics
+        self.stage = stage
+        self.op = op
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.metrics.observe(self.stage, self.op, time.perf_counter() - self.started)
+        return False
+
+
+class _NullSpan:
+    """关闭计时时使用的空上下文，不做任何事"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Collector:
+    """单次调用内的阶段耗时与事件计数（用于 MCP 结果的 _meta）"""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}  # stage -> [累计秒数, 次数]
+        self.events: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def incr(self, event: str, n: int = 1):
+        with self._lock:
+            self.events[event] = self.events.get(event, 0) + n
+
+    def stage_count(self, stage: str) -> int:
+        return int(self.stages.get(stage, (0.0, 0))[1])
+
+    def merge(self, stages: Dict[str, List[float]], events: Dict[str, int]):
+        """合并其他进程（如 worker）收集到的数据"""
+        with self._lock:
+            for stage, (seconds, count) in stages.items():
+                entry = self.stages.setdefault(stage, [0.0, 0])
+                entry[0] += seconds
+                entry[1] += count
+            for event, n in events.items():
+                self.events[event] = self.events.get(event, 0) + n
+
+
+def hit_ratios(events: Dict[str, int]) -> Dict[str, float]:
+    """由 <名称>.hit 与 <名称>.miss / <名称>.fallback 事件计算命中率，如 llm_cache、xhs.fast_path"""
+    ratios = {}
+    for event, hits in events.items():
+        if not event.endswith(".hit"):
+            continue
+        name = event[:-4]
+        total = hits + events.get(f"{name}.miss", 0) + events.get(f"{name}.fallback", 0)
+        if total:
+            ratios[name] = round(hits / total, 4)
+    return dict(sorted(ratios.items()))
+
+
+_collector: ContextVar[Optional[Collector]] = ContextVar("agent_reach_collector", default=None)
+
+
+def current_collector() -> Optional[Collector]:
+    """当前上下文中正在收集的 Collector，没有时返回 None"""
+    return _collector.get()
+
+
+@contextmanager
+def collect():
+    """收集当前调用（含 copy_context 派生的线程）内的阶段耗时和事件"""
+    collector = Collector()
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+
+
+class Metrics:
+    """按 (阶段, 操作) 聚合的耗时直方图 + 事件计数
+
+    阶段: launch / context / navigate / wait / extract / subprocess / llm
+    操作: twitter.search、xiaohongshu.note_detail、gh.repo.view 等
+    事件: llm_cache.hit、browser.reuse、xhs.fast_path.hit、twitter.fast_path.hit 等
+    """
+
+    def __init__(self, enabled: bool = False, path: Optional[Path] = None):
+        self.enabled = enabled
+        self.path = path
+        self._hists: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage: str, op: str = ""):
+        if not self.enabled and _collector.get() is None:
+            return _NULL_SPAN
+        return Span(self, stage, op)
+
+    def observe(self, stage: str, op: str, seconds: float):
+        collector = _collector.get()
+        if collector is not None:
+            collector.observe(stage, seconds)
+        if not self.enabled:
+            return
+        key = (stage, op)
+        with self._lock:
+            hist = self._hists.get(key)
+            if hist is None:
+                hist = self._hists[key] = Histogram()
+            hist.observe(seconds)
+
+    def incr(self, event: str, n: int = 1):
+        """事件计数（缓存命中、浏览器复用等）"""
+        collector = _collector.get()
+        if collector is not None:
+            collector.incr(event, n)
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[event] = self._counters.get(event, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self._hists.clear()
+            self._counters.clear()
+
+    def to_json(self) -> Dict[str, Any]:
+        """导出为 JSON"""
+        with self._lock:
+            return {
+                "buckets": list(Histogram.BUCKETS),
+                "stages": [
+                    {"stage": stage, "op": op, **hist.to_dict()}
+                    for (stage, op), hist in sorted(self._hists.items())
+                ],
+                "events": dict(sorted(self._counters.items())),
+                "hit_ratios": hit_ratios(self._counters),
+            }
+
+    def merge(self, data: Dict[str, Any]):
+        """合并 to_json() 格式的数据"""
+        with self._lock:
+            for entry in data.get("stages", []):
+                key = (entry["stage"], entry.get("op", ""))
+                hist = self._hists.get(key)
+                if hist is None:
+                    hist = self._hists[key] = Histogram()
+                hist.merge(entry)
+            for event, n in data.get("events", {}).items():
+                self._counters[event] = self._counters.get(event, 0) + n
+
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式"""
+        data = self.to_json()
+        name = "agent_reach_stage_seconds"
+        lines = [
+            f"# HELP {name} Time spent per stage of an agent-reach operation.",
+            f"# TYPE {name} histogram",
+        ]
+        for entry in data["stages"]:
+            labels = f'stage="{entry["stage"]}",op="{entry["op"]}"'
+            cumulative = 0
+            for bound, count in zip(list(Histogram.BUCKETS) + ["+Inf"], entry["counts"]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {entry['sum']:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {entry['count']}")
+        if data["events"]:
+            lines.append("# HELP agent_reach_events_total Counted agent-reach events.")
+            lines.append("# TYPE agent_reach_events_total counter")
+            for event, n in data["events"].items():
+                lines.append(f'agent_reach_events_total{{event="{event}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def load(self) -> Dict[str, Any]:
+        """读取磁盘上累积的指标"""
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def flush(self):
+        """把本进程的指标合并写入磁盘（CLI 单次命令之间累积）"""
+        if not self.enabled or not self.path:
+            return
+        current = self.to_json()
+        if not current["stages"] and not current["events"]:
+            return
+        total = Metrics()
+        total.merge(self.load())
+        total.merge(current)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(total.to_json(), f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.debug("保存指标失败: %s", e)
+        self.reset()
+
+
+# AGENT_REACH_METRICS=1 开启；关闭时 span() 返回共享的空上下文，开销可以忽略
+metrics = Metrics(
+    enabled=os.getenv("AGENT_REACH_METRICS", "0") not in ("", "0"),
+    path=CACHE_DIR / "metrics.json",
+)
+atexit.register(metrics.flush)
+
+
+def span(stage: str, op: str = ""):
+    """分阶段计时: with span("navigate", "twitter.search"): page.goto(...)"""
+    return metrics.span(stage, op)
+
 
 class BaseClient(ABC):
     """平台客户端基类"""
@@ -27,6 +396,8 @@ class BaseClient(ABC):
     def __init__(self, cookie_file: Optional[Path] = None):
         self.cookie_file = cookie_file
         self.cookies = self._load_cookies()
+        # 延迟导入：只用指标 / 缓存的命令不加载 httpx
+        import httpx
         self.client = httpx.Client(
             timeout=30.0,
             follow_redirects=True,
@@ -43,7 +414,7 @@ class BaseClient(ABC):
                 data = json.load(f)
                 return data
         except Exception as e:
-            logger.error(f"加载 Cookie 失败: {e}")
+            logger.error("加载 Cookie 失败: %s", e)
             return {}
     
     def _get_default_headers(self) -> Dict[str, str]:
@@ -0,0 +1,617 @@
+"""
+浏览器客户端基类 - Playwright 启动 / 上下文 / Cookie / Stealth 的公共部分
+"""
+
+import hashlib
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+from urllib.parse import urlparse
+
+from base import CACHE_DIR, BaseClient, get_logger, metrics, span
+from profiling import active_profiler
+from stealth import get_stealth_script
+
+logger = get_logger(__name__)
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def descendant_pids(pid: int) -> Set[int]:
+    """经 /proc 列出进程的所有子孙进程（非 Linux 返回空集合）"""
+    found: Set[int] = set()
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                children = [int(child) for child in f.read().split()]
+        except (OSError, ValueError):
+            continue
+        found.update(children)
+        stack.extend(children)
+    return found
+
+
+# 启动配置：viewport、设备像素比、Chromium 启动参数、是否禁用 JS、语言
+#   default  与原先一致，1920x1080
+#   lean     只为解析 DOM：小视口，关闭 GPU / 扩展 / 后台联网 / 图片加载，服务端渲染的页面禁用 JS
+#   compat   贴近真实桌面浏览器（Retina 像素比、隐藏自动化特征），用于反爬更严的场景
+# 可在 LAUNCH_PROFILES 中注册新的配置
+LAUNCH_PROFILES: Dict[str, Dict] = {
+    "default": {
+        "viewport": {"width": 1920, "height": 1080},
+        "device_scale_factor": 1,
+        "args": [],
+        "javascript": True,
+        "locale": None,
+    },
+    "lean": {
+        "viewport": {"width": 1280, "height": 800},
+        "device_scale_factor": 1,
+        "args": [
+            "--disable-gpu", "--disable-extensions", "--disable-background-networking",
+            "--disable-component-update", "--disable-default-apps", "--disable-sync",
+            "--no-first-run", "--mute-audio", "--blink-settings=imagesEnabled=false",
+        ],
+        # 只对子类 NO_JS_OPS 中的操作生效
+        "javascript": False,
+        "locale": "en-US",
+    },
+    "compat": {
+        "viewport": {"width": 1440, "height": 900},
+        "device_scale_factor": 2,
+        "args": ["--disable-blink-features=AutomationControlled"],
+        "javascript": True,
+        "locale": "en-US",
+    },
+}
+
+# 持久化 profile 根目录，每个账号（Cookie 文件）一个子目录
+PROFILES_DIR = Path(os.getenv("AGENT_REACH_BROWSER_PROFILES", CACHE_DIR / "browser-profiles"))
+
+# --disk-cache-size 只约束 HTTP 缓存，JS 字节码、GPU、Service Worker 缓存不受限，由定期清理兜底
+PROFILE_CACHE_DIRS = (
+    "Default/Cache", "Default/Code Cache", "Default/GPUCache",
+    "Default/Service Worker/CacheStorage", "Default/Service Worker/ScriptCache",
+    "GrShaderCache", "ShaderCache",
+)
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def prune_profile(path: Path, max_bytes: int, interval: float) -> int:
+    """清理 profile 中的缓存目录，返回释放的字节数
+
+    距上次清理不足 interval 秒时跳过；缓存总量超过 max_bytes 时从最大的缓存目录删起，直到回到上限内。
+    只应在没有浏览器使用该 profile 时调用。
+    """
+    marker = path / ".agent-reach-cleanup"
+    try:
+        if time.time() - marker.stat().st_mtime < interval:
+            return 0
+    except OSError:
+        pass
+
+    sizes = [(path / name, _dir_size(path / name)) for name in PROFILE_CACHE_DIRS if (path / name).is_dir()]
+    total = sum(size for _, size in sizes)
+    freed = 0
+    for cache_dir, size in sorted(sizes, key=lambda item: item[1], reverse=True):
+        if total - freed <= max_bytes:
+            break
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        freed += size
+    if freed:
+        logger.info("清理浏览器缓存 %s: %.1f MB", path.name, freed / 1024 / 1024)
+
+    path.mkdir(parents=True, exist_ok=True)
+    marker.touch()
+    return freed
+
+
+def tree_rss(pid: int) -> int:
+    """进程及其所有子孙进程的 RSS 之和（字节）"""
+    total = 0
+    for current in {pid} | descendant_pids(pid):
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+class BrowserClient(BaseClient):
+    """基于 Playwright 的平台客户端基类"""
+
+    base_url = ""
+
+    def __init__(self, cookie_file: Optional[Path] = None,
+                 record_har: Optional[Path] = None, replay_har: Optional[Path] = None,
+                 pool: Optional["BrowserPool"] = None, persistent_profile: Optional[bool] = None,
+                 disk_cache_mb: Optional[int] = None, launch_profile: Optional[str] = None,
+                 op_profiles: Optional[Dict[str, str]] = None):
+        super().__init__(cookie_file)
+        # 常驻进程（worker 等）传入浏览器池以复用浏览器和上下文
+        self.pool = pool
+        if record_har and replay_har:
+            raise ValueError("record_har 和 replay_har 不能同时使用")
+        # HAR 录制 / 回放：传 .har/.zip 文件则所有操作共用，传目录则按操作名分文件
+        self.record_har = Path(record_har) if record_har else None
+        self.replay_har = Path(replay_har) if replay_har else None
+        # 持久化 profile：按账号保留 user_data_dir，JS / CSS / 字体等静态资源走本地磁盘缓存
+        self.persistent_profile = (persistent_profile if persistent_profile is not None
+                                   else os.getenv("AGENT_REACH_PERSISTENT_PROFILE", "0") not in ("", "0"))
+        self.disk_cache_mb = (disk_cache_mb if disk_cache_mb is not None
+                              else int(os.getenv("AGENT_REACH_DISK_CACHE_MB", "256")))
+        self.profile_cleanup_interval = float(os.getenv("AGENT_REACH_PROFILE_CLEANUP_HOURS", "24")) * 3600
+        # 启动配置：客户端级默认 + 按操作覆盖，如 {"twitter.search": "lean"}
+        self.launch_profile = launch_profile or os.getenv("AGENT_REACH_LAUNCH_PROFILE", "default")
+        if op_profiles is None:
+            op_profiles = {}
+            for item in os.getenv("AGENT_REACH_OP_PROFILES", "").split(","):
+                name, _, profile = item.strip().partition("=")
+                if name and profile:
+                    op_profiles[name] = profile
+        self.op_profiles = op_profiles
+        for profile in [self.launch_profile, *self.op_profiles.values()]:
+            if profile not in LAUNCH_PROFILES:
+                raise ValueError(f"未知启动配置: {profile}，可选: {', '.join(LAUNCH_PROFILES)}")
+
+    def _get_playwright(self):
+        """延迟导入 playwright"""
+        try:
+            from playwright.sync_api import sync_playwright
+            return sync_playwright
+        except ImportError:
+            logger.error("Playwright 未安装，运行: pip install playwright && playwright install chromium")
+            raise
+
+    def _cookie_domain(self) -> str:
+        """由 base_url 推导 Cookie 域，如 https://www.xiaohongshu.com -> .xiaohongshu.com"""
+        host = urlparse(self.base_url).hostname or ""
+        # 本地 fixture 站点（localhost / IP）不能带前导点
+        if host == "localhost" or host.replace(".", "").isdigit():
+            return host
+        if host.startswith("www."):
+            host = host[4:]
+        return f".{host}"
+
+    def _har_path(self, base: Path, op: str) -> Path:
+        if base.suffix in (".har", ".zip"):
+            return base
+        return base / f"{op}.har"
+
+    # 服务端渲染、不依赖 JS 就能提取的操作，lean 配置下对它们禁用 JS（由子类声明）
+    NO_JS_OPS: frozenset = frozenset()
+
+    def profile_for(self, op: str) -> str:
+        return self.op_profiles.get(op, self.launch_profile)
+
+    def launch_key(self, op: str, headless: bool) -> tuple:
+        """启动级参数：相同的 launch_key 可以共用一个浏览器进程"""
+        return (headless, self.profile_for(op))
+
+    def _launch_args(self, op: str) -> List[str]:
+        return list(LAUNCH_PROFILES[self.profile_for(op)]["args"])
+
+    def user_data_dir(self, headless: bool, user_agent: Optional[str], op: str = "") -> Path:
+        """持久化 profile 目录
+
+        同一个 user_data_dir 只能被一个 Chromium 进程使用，而 headless、启动配置、JS 开关和 UA
+        都是启动级参数，所以按账号 + 启动参数分目录
+        """
+        account = self.cookie_file.stem if self.cookie_file else type(self).__name__.lower()
+        variant = "headless" if headless else "headed"
+        profile = self.profile_for(op)
+        if profile != "default":
+            variant += f"-{profile}"
+        if self.pool_key(op, headless, user_agent)[-1]:
+            variant += "-nojs"
+        if user_agent:
+            variant += "-" + hashlib.sha1(user_agent.encode("utf-8")).hexdigest()[:8]
+        return PROFILES_DIR / account / variant
+
+    def _launch_persistent(self, chromium, op: str, headless: bool, user_agent: Optional[str]):
+        """以持久化 profile 启动，返回未设置 Cookie / 回放路由的 BrowserContext（没有独立的 Browser 对象）"""
+        path = self.user_data_dir(headless, user_agent, op)
+        max_bytes = self.disk_cache_mb * 1024 * 1024
+        prune_profile(path, max_bytes * 2, self.profile_cleanup_interval)
+        with span("launch", op):
+            context = chromium.launch_persistent_context(
+                str(path), headless=headless, args=self._launch_args(op) + [f"--disk-cache-size={max_bytes}"],
+                **self._context_options(op, user_agent)
+            )
+        return context
+
+    def _settle(self, page, ms: int):
+        """等待页面内容加载
+
+        回放时响应都来自本地 HAR，不做固定等待，只等网络空闲（最多 ms 毫秒）
+        """
+        if not self.replay_har:
+            page.wait_for_timeout(ms)
+            return
+        try:
+            page.wait_for_load_state("networkidle", timeout=ms)
+        except Exception as e:
+            logger.debug("回放等待网络空闲超时: %s", e)
+
+    def _build_cookies_for_playwright(self) -> List[Dict]:
+        """构建 Playwright 格式的 cookies（由子类实现）"""
+        return []
+
+    def _context_options(self, op: str, user_agent: Optional[str]) -> Dict:
+        profile = LAUNCH_PROFILES[self.profile_for(op)]
+        options = {"viewport": dict(profile["viewport"]), "device_scale_factor": profile["device_scale_factor"]}
+        if profile.get("locale"):
+            options["locale"] = profile["locale"]
+        if not profile.get("javascript", True) and op in self.NO_JS_OPS:
+            options["java_script_enabled"] = False
+        if user_agent:
+            options["user_agent"] = user_agent
+        if self.record_har:
+            har = self._har_path(self.record_har, op)
+            har.parent.mkdir(parents=True, exist_ok=True)
+            options["record_har_path"] = str(har)
+            options["record_har_content"] = "embed"
+        return options
+
+    def _prepare_context(self, context, op: str):
+        """回放路由 + Cookie"""
+        # 回放：所有请求只从 HAR 应答，未录到的请求直接中止，绝不回落到线上
+        if self.replay_har:
+            har = self._har_path(self.replay_har, op)
+            if not har.exists():
+                raise FileNotFoundError(f"HAR 文件不存在: {har}")
+            context.route_from_har(str(har), not_found="abort")
+
+        cookies = [] if self.replay_har else self._build_cookies_for_playwright()
+        if cookies:
+            context.add_cookies(cookies)
+
+    def _new_page(self, context, stealth: bool):
+        page = context.new_page()
+        # 注入 stealth 脚本
+        if stealth:
+            page.add_init_script(get_stealth_script())
+            logger.debug("Stealth 模式已启用")
+        return page
+
+    def pool_key(self, op: str, headless: bool, user_agent: Optional[str]) -> tuple:
+        """浏览器池中上下文的复用键：同一账号（Cookie 文件）、同样的启动参数共用一个上下文"""
+        har = str(self._har_path(self.replay_har, op)) if self.replay_har else None
+        # 同一启动配置下 JS 开关不同的操作不能共用上下文
+        no_js = op in self.NO_JS_OPS and not LAUNCH_PROFILES[self.profile_for(op)].get("javascript", True)
+        return (type(self).__name__, str(self.cookie_file), self.launch_key(op, headless), user_agent, har, no_js)
+
+    @contextmanager
+    def _open_page(self, op: str, headless: bool = True, user_agent: Optional[str] = None,
+                   stealth: bool = False) -> Iterator:
+        """准备好带 Cookie 的页面
+
+        有浏览器池时复用池里的浏览器和上下文，退出时只关闭页面；否则每次启动浏览器，退出时关闭。
+        op 用于分阶段计时和 trace 文件命名，如 twitter.search
+        """
+        # 录制 HAR 要在上下文关闭时写盘，不能复用
+        if self.pool is not None and not self.record_har:
+            with self.pool.page(self, op, headless, user_agent, stealth) as page:
+                yield page
+            return
+
+        sync_playwright = self._get_playwright()
+        with sync_playwright() as p:
+            browser = context = None
+            if self.persistent_profile:
+                try:
+                    context = self._launch_persistent(p.chromium, op, headless, user_agent)
+                except Exception as e:
+                    # profile 被另一个进程占用等情况，退回临时浏览器
+                    logger.warning("持久化 profile 启动失败，改用临时浏览器: %s", e)
+            if context is None:
+                with span("launch", op):
+                    browser = p.chromium.launch(headless=headless, args=self._launch_args(op))
+            profiler = active_profiler()
+            try:
+                with span("context", op):
+                    if browser is not None:
+                        context = browser.new_context(**self._context_options(op, user_agent))
+                    self._prepare_context(context, op)
+
+                    # 剖析模式下录制 Playwright trace
+                    if profiler:
+                        context.tracing.start(screenshots=True, snapshots=True)
+
+                    page = self._new_page(context, stealth)
+
+                yield page
+            finally:
+                if profiler and context is not None:
+                    try:
+                        context.tracing.stop(path=str(profiler.trace_path(op)))
+                    except Exception as e:
+                        logger.debug("保存 trace 失败: %s", e)
+                # HAR 在上下文关闭时才写盘
+                if context is not None:
+                    try:
+                        context.close()
+                    except Exception as e:
+                        logger.debug("关闭浏览器上下文失败: %s", e)
+                if browser is not None:
+                    browser.close()
+
+
+class _Slot:
+    """池中的一个浏览器或上下文：记录创建时间、已服务页面数和在用页面数"""
+
+    __slots__ = ("obj", "kind", "pid", "created", "served", "in_use", "closed")
+
+    def __init__(self, obj, kind: str, pid: Optional[int] = None):
+        self.obj = obj
+        self.kind = kind  # browser / context
+        self.pid = pid
+        self.created = time.monotonic()
+        self.served = 0
+        self.in_use = 0
+        self.closed = False
+
+
+class BrowserPool:
+    """常驻进程内复用的浏览器池
+
+    按 BrowserClient.launch_key（headless + 启动配置）各保留一个浏览器，按 BrowserClient.pool_key 复用上下文（保留 Cookie 和 HTTP 缓存），
+    每次调用只新建 / 关闭页面。sync Playwright 对象绑定创建它的线程，池只能在单个线程里使用。
+
+    回收：X 这类重 SPA 的渲染进程内存随页面数持续增长。浏览器超过 max_pages / max_age 秒 /
+    max_rss_mb（Chromium 进程树 RSS，读 /proc），上下文超过 context_max_pages / context_max_age 时
+    退役：新页面落到新实例上，旧实例等在用页面全部关闭后再关掉。阈值为 0 表示不限制。
+    """
+
+    def __init__(self, max_pages: Optional[int] = None, max_age: Optional[float] = None,
+                 max_rss_mb: Optional[float] = None, context_max_pages: Optional[int] = None,
+                 context_max_age: Optional[float] = None):
+        self.max_pages = max_pages if max_pages is not None else int(os.getenv("AGENT_REACH_BROWSER_MAX_PAGES", "200"))
+        self.max_age = max_age if max_age is not None else float(os.getenv("AGENT_REACH_BROWSER_MAX_AGE", "3600"))
+        self.max_rss_mb = (max_rss_mb if max_rss_mb is not None
+                           else float(os.getenv("AGENT_REACH_BROWSER_MAX_RSS_MB", "1536")))
+        self.context_max_pages = (context_max_pages if context_max_pages is not None
+                                  else int(os.getenv("AGENT_REACH_CONTEXT_MAX_PAGES", "50")))
+        self.context_max_age = (context_max_age if context_max_age is not None
+                                else float(os.getenv("AGENT_REACH_CONTEXT_MAX_AGE", "1800")))
+        self._playwright = None
+        self._browsers: Dict[tuple, _Slot] = {}
+        self._contexts: Dict[tuple, _Slot] = {}
+        # 持久化 profile 的上下文自带浏览器进程，按浏览器的阈值回收
+        self._persistent: Dict[tuple, _Slot] = {}
+        # 已退役、等在用页面关闭后再关掉的实例
+        self._retiring: List[_Slot] = []
+
+    def _start(self):
+        if self._playwright is None:
+            from playwright.sync_api import sync_playwright
+            self._playwright = sync_playwright().start()
+        return self._playwright
+
+    def _launch(self, client: BrowserClient, op: str, headless: bool) -> _Slot:
+        # 先启动 Playwright driver，再对比启动前后的子孙进程，新出现的最上层进程即该浏览器的 Chromium 主进程
+        playwright = self._start()
+        before = descendant_pids(os.getpid())
+        with span("launch", op):
+            browser = playwright.chromium.launch(headless=headless, args=client._launch_args(op))
+        return _Slot(browser, "browser", self._root_pid(descendant_pids(os.getpid()) - before))
+
+    def _persistent_context(self, client: BrowserClient, key: tuple, op: str, headless: bool,
+                            user_agent: Optional[str]) -> _Slot:
+        slot = self._persistent.get(key)
+        if slot is not None and slot.closed:
+            del self._persistent[key]
+            slot = None
+        elif slot is not None:
+            reason = self._expired(slot, self.max_pages, self.max_age, self.max_rss_mb)
+            if reason:
+                self._retire(slot, reason)
+                del self._persistent[key]
+                # 新实例要用同一个 user_data_dir，旧实例空闲时先关掉
+                self._drain()
+                slot = None
+        if slot is not None:
+            metrics.incr("browser.reuse")
+            return slot
+        playwright = self._start()
+        before = descendant_pids(os.getpid())
+        context = client._launch_persistent(playwright.chromium, op, headless, user_agent)
+        slot = _Slot(context, "browser", self._root_pid(descendant_pids(os.getpid()) - before))
+        context.on("close", lambda *_: setattr(slot, "closed", True))
+        try:
+            with span("context", op):
+                client._prepare_context(context, op)
+        except Exception:
+            context.close()
+            raise
+        self._persistent[key] = slot
+        return slot
+
+    @staticmethod
+    def _root_pid(pids: Set[int]) -> Optional[int]:
+        """一组进程中父进程不在组内的那个"""
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, ValueError, IndexError):
+                continue
+            if ppid not in pids:
+                return pid
+        return None
+
+    def rss_mb(self, slot: _Slot) -> float:
+        return tree_rss(slot.pid) / 1024 / 1024 if slot.pid else 0.0
+
+    def _expired(self, slot: _Slot, max_pages: int, max_age: float, max_rss_mb: float = 0) -> Optional[str]:
+        if max_pages and slot.served >= max_pages:
+            return f"pages={slot.served}"
+        age = time.monotonic() - slot.created
+        if max_age and age >= max_age:
+            return f"age={age:.0f}s"
+        if max_rss_mb and slot.pid:
+            rss = self.rss_mb(slot)
+            if rss >= max_rss_mb:
+                return f"rss={rss:.0f}MB"
+        return None
+
+    def _retire(self, slot: _Slot, reason: str):
+        logger.info("回收%s (%s)", "浏览器" if slot.kind == "browser" else "上下文", reason)
+        metrics.incr(f"{slot.kind}.recycle")
+        self._retiring.append(slot)
+
+    def _browser(self, client: BrowserClient, op: str, headless: bool) -> _Slot:
+        launch_key = client.launch_key(op, headless)
+        slot = self._browsers.get(launch_key)
+        if slot is not None and not slot.obj.is_connected():
+            # 浏览器崩溃或被关闭后，其上下文一并作废
+            self._drop_contexts(launch_key, retire=False)
+            slot = None
+        elif slot is not None:
+            reason = self._expired(slot, self.max_pages, self.max_age, self.max_rss_mb)
+            if reason:
+                self._retire(slot, reason)
+                self._drop_contexts(launch_key, retire=True)
+                slot = None
+        if slot is not None:
+            metrics.incr("browser.reuse")
+            return slot
+        slot = self._browsers[launch_key] = self._launch(client, op, headless)
+        return slot
+
+    def _drop_contexts(self, launch_key: tuple, retire: bool):
+        # pool_key 的第 3 项是 launch_key
+        for key in [key for key in self._contexts if key[2] == launch_key]:
+            slot = self._contexts.pop(key)
+            # 随浏览器退役的上下文在浏览器关闭时一起关掉，只有仍在用的才需要等
+            if retire and slot.in_use:
+                self._retiring.append(slot)
+
+    def _context(self, client: BrowserClient, browser: _Slot, key: tuple, op: str,
+                 user_agent: Optional[str]) -> _Slot:
+        slot = self._contexts.get(key)
+        if slot is not None:
+            reason = self._expired(slot, self.context_max_pages, self.context_max_age)
+            if reason:
+                self._retire(slot, reason)
+                del self._contexts[key]
+                slot = None
+        if slot is None:
+            context = browser.obj.new_context(**client._context_options(op, user_agent))
+            client._prepare_context(context, op)
+            slot = self._contexts[key] = _Slot(context, "context")
+        return slot
+
+    def _drain(self):
+        """关闭在用页面已全部释放的退役实例；上下文先于浏览器关闭"""
+        idle = [slot for slot in self._retiring if not slot.in_use]
+        if not idle:
+            return
+        # 浏览器的 in_use 包含其所有上下文的页面，浏览器空闲时其上下文必然也已空闲
+        self._retiring = [slot for slot in self._retiring if slot.in_use]
+        for slot in sorted(idle, key=lambda s: s.kind == "browser"):
+            try:
+                slot.obj.close()
+            except Exception as e:
+                logger.debug("关闭退役实例失败: %s", e)
+
+    @staticmethod
+    def _start_page(client: BrowserClient, context: _Slot, profiler, stealth: bool):
+        if profiler:
+            context.obj.tracing.start(screenshots=True, snapshots=True)
+        return client._new_page(context.obj, stealth)
+
+    @contextmanager
+    def page(self, client: BrowserClient, op: str, headless: bool = True,
+             user_agent: Optional[str] = None, stealth: bool = False) -> Iterator:
+        key = client.pool_key(op, headless, user_agent)
+        context = None
+        if client.persistent_profile:
+            try:
+                context = self._persistent_context(client, key, op, headless, user_agent)
+            except FileNotFoundError:
+                # 回放用的 HAR 不存在，退回临时浏览器也一样会失败
+                raise
+            except Exception as e:
+                logger.warning("持久化 profile 启动失败，改用临时浏览器: %s", e)
+        profiler = active_profiler()
+        page = None
+        if context is not None:
+            slots = (context,)
+            with span("context", op):
+                page = self._start_page(client, context, profiler, stealth)
+        else:
+            browser = self._browser(client, op, headless)
+            with span("context", op):
+                context = self._context(client, browser, key, op, user_agent)
+                page = self._start_page(client, context, profiler, stealth)
+            slots = (browser, context)
+        for slot in slots:
+            slot.served += 1
+            slot.in_use += 1
+        try:
+            yield page
+        finally:
+            for slot in slots:
+                slot.in_use -= 1
+            if profiler:
+                try:
+                    context.obj.tracing.stop(path=str(profiler.trace_path(op)))
+                except Exception as e:
+                    logger.debug("保存 trace 失败: %s", e)
+            try:
+                page.close()
+            except Exception as e:
+                logger.debug("关闭页面失败: %s", e)
+            self._drain()
+
+    def stats(self) -> List[Dict]:
+        """当前浏览器的页面数、存活时间和进程树 RSS"""
+        now = time.monotonic()
+        rows = [
+            {"headless": launch_key[0], "profile": launch_key[1], "pid": slot.pid, "pages": slot.served,
+             "age": round(now - slot.created, 1), "rss_mb": round(self.rss_mb(slot), 1),
+             "contexts": sum(1 for key in self._contexts if key[2] == launch_key)}
+            for launch_key, slot in self._browsers.items()
+        ]
+        rows += [
+            {"headless": key[2][0], "profile": key[2][1], "pid": slot.pid, "pages": slot.served,
+             "age": round(now - slot.created, 1), "rss_mb": round(self.rss_mb(slot), 1),
+             "contexts": 1, "persistent": True}
+            for key, slot in self._persistent.items()
+        ]
+        return rows
+
+    def close(self):
+        slots = list(self._contexts.values()) + list(self._browsers.values())
+        slots += list(self._persistent.values()) + self._retiring
+        for slot in sorted(slots, key=lambda s: s.kind == "browser"):
+            try:
+                slot.obj.close()
+            except Exception as e:
+                logger.debug("关闭浏览器失败: %s", e)
+        self._contexts.clear()
+        self._browsers.clear()
+        self._persistent.clear()
+        self._retiring.clear()
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
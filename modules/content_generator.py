@@ -3,32 +3,97 @@ AI 内容生成模块
 集成 LLM 生成推文、笔记内容
 """
 
+import asyncio
+import inspect
+import json
 import os
-from typing import Optional
-from base import logger
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from base import get_logger, metrics
+from llm_cache import PromptCache, get_default_cache
+from llm_router import LLMRouter, get_default_router
+
+logger = get_logger(__name__)
+
+# 进程内共享的 LLM 客户端池，避免每次调用都重新创建客户端和 TLS 连接
+# key: (provider, api_key / base_url) -> 同步客户端
+_sync_clients: Dict[Tuple[str, str], Any] = {}
+# 异步客户端绑定事件循环，按 loop 分别缓存
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], Any]]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+class RateLimiter:
+    """简单的异步限速器 - 保证请求发起间隔不低于 1/rate 秒"""
+    
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
 
 
 class ContentGenerator:
     """内容生成器 - 使用 AI 生成社交媒体内容"""
     
-    def __init__(self):
+    # 只有真实调用 LLM 的 provider 才写缓存，模拟响应不缓存
+    CACHEABLE_PROVIDERS = {"openai", "local"}
+    
+    def __init__(self, concurrency: Optional[int] = None, rate_limit: Optional[float] = None,
+                 cache: Optional[PromptCache] = None, use_cache: bool = True):
         self.provider = os.getenv("AI_PROVIDER", "openai")  # openai, gemini, local
+        # 参与路由 / 对冲的 provider 列表，逗号分隔，默认只用 AI_PROVIDER
+        self.providers = [
+            p.strip() for p in os.getenv("AI_PROVIDERS", self.provider).split(",") if p.strip()
+        ]
         self.api_key = os.getenv("OPENAI_API_KEY") or os.getenv("GEMINI_API_KEY")
+        # 本地 OpenAI 兼容推理服务（vLLM / llama.cpp server 等），不需要 API Key
+        self.local_base_url = os.getenv("LOCAL_AI_BASE_URL", "http://127.0.0.1:8000/v1").rstrip("/")
+        self.local_model = os.getenv("LOCAL_AI_MODEL", "local")
+        self.local_api_key = os.getenv("LOCAL_AI_API_KEY", "")
+        # 批量生成时每个 /completions 请求合并的 prompt 数，0 / 1 表示不合并
+        self.local_batch_size = int(os.getenv("LOCAL_AI_BATCH_SIZE", "0"))
+        self.model = os.getenv("AI_MODEL", "gpt-3.5-turbo")
+        self.temperature = 0.7
+        self.max_tokens = 500
+        # 批量生成的并发数与限速（每秒请求数，0 表示不限速）
+        self.concurrency = concurrency or int(os.getenv("AI_CONCURRENCY", "8"))
+        self.rate_limit = rate_limit if rate_limit is not None else float(os.getenv("AI_RATE_LIMIT", "0"))
+        # 响应缓存，重试 / 重跑相同任务时直接命中
+        self.cache = (cache or get_default_cache()) if use_cache else None
+        # 单次请求截止时间与对冲策略
+        self.deadline = float(os.getenv("AI_DEADLINE", "30"))
+        self.hedge = os.getenv("AI_HEDGE", "1") != "0"
+        # 只有一个付费 provider 时，向它自己对冲会重复计费，须显式开启
+        self.hedge_same = os.getenv("AI_HEDGE_SAME", "0") == "1"
+        self.router: LLMRouter = get_default_router(
+            deadline=self.deadline,
+            hedge_after=float(os.getenv("AI_HEDGE_AFTER", "3"))
+        )
     
-    def generate_tweet(self, topic: str, tone: str = "casual", max_length: int = 280) -> str:
-        """生成推文"""
-        prompt = f"""写一条关于"{topic}"的推文。
+    # ==================== Prompt 构建 ====================
+    def _tweet_prompt(self, topic: str, tone: str = "casual", max_length: int = 280) -> str:
+        return f"""写一条关于"{topic}"的推文。
 风格：{tone}
 限制：{max_length} 字符以内
 要求：吸引人、有互动性、可加 emoji
 
 直接返回推文内容，不要解释。"""
-        
-        return self._call_llm(prompt)
     
-    def generate_xiaohongshu_note(self, topic: str, style: str = "干货") -> dict:
-        """生成小红书笔记"""
-        prompt = f"""写一篇关于"{topic}"的小红书笔记。
+    def _note_prompt(self, topic: str, style: str = "干货") -> str:
+        return f"""写一篇关于"{topic}"的小红书笔记。
 风格：{style}
 格式：JSON，包含 title 和 content
 
@@ -38,21 +103,9 @@ class ContentGenerator:
 - 语气亲切像朋友分享
 
 只返回 JSON 格式：{{"title": "...", "content": "..."}}"""
-        
-        response = self._call_llm(prompt)
-        try:
-            import json
-            return json.loads(response)
-        except:
-            # 解析失败，手动分割
-            lines = response.split("\n")
-            title = lines[0].replace("标题：", "").strip() if lines else topic
-            content = "\n".join(lines[1:]).strip()
-            return {"title": title, "content": content}
     
-    def generate_reply(self, original_text: str, context: str = "") -> str:
-        """生成回复"""
-        prompt = f"""针对以下推文写一条回复：
+    def _reply_prompt(self, original_text: str, context: str = "") -> str:
+        return f"""针对以下推文写一条回复：
 
 原推文：{original_text}
 上下文：{context}
@@ -63,14 +116,11 @@ class ContentGenerator:
 - 自然不做作
 
 直接返回回复内容。"""
-        
-        return self._call_llm(prompt)
     
-    def generate_hashtags(self, content: str, platform: str = "twitter") -> str:
-        """生成标签"""
+    def _hashtags_prompt(self, content: str, platform: str = "twitter") -> str:
         count = 3 if platform == "twitter" else 5
         
-        prompt = f"""为以下内容生成 {count} 个合适的 hashtag：
+        return f"""为以下内容生成 {count} 个合适的 hashtag：
 
 内容：{content}
 平台：{platform}
@@ -81,44 +131,531 @@ class ContentGenerator:
 - 直接返回 hashtag 列表，用空格分隔
 
 例如：#AI #科技 #创新"""
+    
+    def _parse_note(self, response: str, topic: str = "", *args, **kwargs) -> dict:
+        """解析小红书笔记 JSON"""
+        try:
+            return json.loads(response)
+        except Exception:
+            # 解析失败，手动分割
+            lines = response.split("\n")
+            title = lines[0].replace("标题：", "").strip() if lines else topic
+            content = "\n".join(lines[1:]).strip()
+            return {"title": title, "content": content}
+    
+    def _tasks(self) -> Dict[str, Tuple[Callable[..., str], Optional[Callable[..., Any]]]]:
+        """批量任务表: 任务名 -> (prompt 构建函数, 结果后处理函数)"""
+        return {
+            "tweet": (self._tweet_prompt, None),
+            "xiaohongshu_note": (self._note_prompt, self._parse_note),
+            "reply": (self._reply_prompt, None),
+            "hashtags": (self._hashtags_prompt, None),
+        }
+    
+    # ==================== 单条生成 ====================
+    # use_cache=False 用于需要多样性的场景，跳过缓存直接请求
+    def generate_tweet(self, topic: str, tone: str = "casual", max_length: int = 280,
+                       use_cache: bool = True) -> str:
+        """生成推文"""
+        return self._call_llm(self._tweet_prompt(topic, tone, max_length), use_cache=use_cache)
+    
+    def generate_xiaohongshu_note(self, topic: str, style: str = "干货", use_cache: bool = True) -> dict:
+        """生成小红书笔记"""
+        response = self._call_llm(self._note_prompt(topic, style), use_cache=use_cache)
+        return self._parse_note(response, topic)
+    
+    def generate_reply(self, original_text: str, context: str = "", use_cache: bool = True) -> str:
+        """生成回复"""
+        return self._call_llm(self._reply_prompt(original_text, context), use_cache=use_cache)
+    
+    def generate_hashtags(self, content: str, platform: str = "twitter", use_cache: bool = True) -> str:
+        """生成标签"""
+        return self._call_llm(self._hashtags_prompt(content, platform), use_cache=use_cache)
+    
+    # ==================== 流式生成 ====================
+    # 逐段产出 provider 返回的 token，首个 token 到达即可开始展示
+    def stream_tweet(self, topic: str, tone: str = "casual", max_length: int = 280,
+                     use_cache: bool = True) -> Iterator[str]:
+        """流式生成推文"""
+        return self._stream_llm(self._tweet_prompt(topic, tone, max_length), use_cache=use_cache)
+    
+    def stream_note(self, topic: str, style: str = "干货", use_cache: bool = True) -> Iterator[str]:
+        """流式生成小红书笔记（产出原始 JSON 文本，结束后可用 parse_note 解析）"""
+        return self._stream_llm(self._note_prompt(topic, style), use_cache=use_cache)
+    
+    def stream_reply(self, original_text: str, context: str = "", use_cache: bool = True) -> Iterator[str]:
+        """流式生成回复"""
+        return self._stream_llm(self._reply_prompt(original_text, context), use_cache=use_cache)
+    
+    def stream_hashtags(self, content: str, platform: str = "twitter", use_cache: bool = True) -> Iterator[str]:
+        """流式生成标签"""
+        return self._stream_llm(self._hashtags_prompt(content, platform), use_cache=use_cache)
+    
+    def parse_note(self, text: str, topic: str = "") -> dict:
+        """把 stream_note 拼接后的文本解析为 {"title", "content"}"""
+        return self._parse_note(text, topic)
+    
+    def router_stats(self) -> Dict[str, Any]:
+        """各 provider 的延迟分位数与错误率"""
+        return self.router.snapshot()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        if not self.cache:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    # ==================== 批量生成 ====================
+    def generate_many(self, task: str, inputs: Iterable[Any],
+                      concurrency: Optional[int] = None,
+                      rate_limit: Optional[float] = None,
+                      use_cache: bool = True, dedup: bool = False) -> List[Any]:
+        """批量生成，结果顺序与 inputs 一致
+
+        task: tweet / xiaohongshu_note / reply / hashtags
+        inputs: 每项可以是单个参数、参数元组或关键字参数字典，
+                例如 generate_many("hashtags", [{"content": c, "platform": "twitter"} for c in contents])
+        dedup: 按第一个参数（主题 / 原文 / 内容）做近似去重，其余参数相同的近似重复输入只调用一次 LLM，
+               结果复用给簇内所有输入
+
+        同步接口，内部用 asyncio.run 运行；已在事件循环里时请 await agenerate_many(...)
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.agenerate_many(task, inputs, concurrency, rate_limit, use_cache, dedup))
+        raise RuntimeError("generate_many 不能在运行中的事件循环里调用，请改用 await agenerate_many(...)")
+    
+    def generate_hashtags_many(self, contents: Iterable[str], platform: str = "twitter", **kwargs) -> List[str]:
+        """批量生成标签"""
+        return self.generate_many("hashtags", [(c, platform) for c in contents], **kwargs)
+    
+    def generate_tweets_many(self, topics: Iterable[str], tone: str = "casual", **kwargs) -> List[str]:
+        """按主题列表批量生成推文"""
+        return self.generate_many("tweet", [(t, tone) for t in topics], **kwargs)
+    
+    def generate_replies_many(self, texts: Iterable[str], context: str = "", dedup: bool = True,
+                              **kwargs) -> List[str]:
+        """批量生成回复；默认对原文做近似去重，转发和复制粘贴的内容只生成一次"""
+        return self.generate_many("reply", [(t, context) for t in texts], dedup=dedup, **kwargs)
+    
+    async def agenerate_many(self, task: str, inputs: Iterable[Any],
+                             concurrency: Optional[int] = None,
+                             rate_limit: Optional[float] = None,
+                             use_cache: bool = True, dedup: bool = False) -> List[Any]:
+        """批量生成（异步版本）"""
+        tasks = self._tasks()
+        if task not in tasks:
+            raise ValueError(f"未知生成任务: {task}，可选: {', '.join(tasks)}")
+        build_prompt, postprocess = tasks[task]
+        
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+        limiter = RateLimiter(self.rate_limit if rate_limit is None else rate_limit)
         
-        return self._call_llm(prompt)
+        async def run_one(prompt: str) -> str:
+            response = self._cache_get(prompt) if use_cache else None
+            if response is None:
+                async with semaphore:
+                    await limiter.wait()
+                    response = await self._acall_llm(prompt, use_cache=use_cache)
+            return response
+        
+        prepared = []
+        for item in inputs:
+            args, kwargs = self._split_args(item)
+            prepared.append((args, kwargs, build_prompt(*args, **kwargs)))
+        if dedup:
+            unique, mapping = self._dedup_inputs(build_prompt, prepared)
+        else:
+            unique, mapping = list(range(len(prepared))), list(range(len(prepared)))
+        prompts = [prepared[i][2] for i in unique]
+        logger.info("批量生成 %s: %s 条（去重后 %s 条）", task, len(prepared), len(prompts))
+        
+        if self._local_batching():
+            responses = await self._abatch_local(prompts, semaphore, limiter, use_cache)
+        else:
+            responses = await asyncio.gather(*(run_one(prompt) for prompt in prompts))
+        responses = [responses[j] for j in mapping]
+        
+        return [
+            postprocess(response, *args, **kwargs) if postprocess else response
+            for (args, kwargs, _), response in zip(prepared, responses)
+        ]
+    
+    def _dedup_inputs(self, build_prompt: Callable[..., str],
+                      prepared: List[Tuple[tuple, dict, str]]) -> Tuple[List[int], List[int]]:
+        """近似重复的输入只保留一个：返回 (要生成的输入下标, 每个输入对应的结果位置)
+
+        只比较主文本而不比较完整 prompt，模板部分会抬高不同输入之间的相似度
+        """
+        from dedup import NearDuplicateIndex
+        
+        first = next(iter(inspect.signature(build_prompt).parameters))
+        index = NearDuplicateIndex()
+        groups: Dict[Tuple[int, str], int] = {}
+        unique: List[int] = []
+        mapping: List[int] = []
+        for i, (args, kwargs, _) in enumerate(prepared):
+            text = args[0] if args else kwargs.get(first, "")
+            rest = (args[1:], sorted((k, v) for k, v in kwargs.items() if k != first))
+            cluster, _ = index.add(str(text), member=i)
+            key = (cluster.id, repr(rest))
+            if key not in groups:
+                groups[key] = len(unique)
+                unique.append(i)
+            mapping.append(groups[key])
+        return unique, mapping
+    
+    def _local_batching(self) -> bool:
+        """本地服务支持多 prompt 合并请求时走批量接口"""
+        return self.provider == "local" and self.local_batch_size > 1
+    
+    async def _abatch_local(self, prompts: List[str], semaphore: asyncio.Semaphore,
+                            limiter: RateLimiter, use_cache: bool) -> List[str]:
+        """把未命中缓存的 prompt 按 local_batch_size 合并请求本地服务"""
+        results: List[Optional[str]] = [self._cache_get(p) if use_cache else None for p in prompts]
+        missing = [i for i, r in enumerate(results) if r is None]
+        batches = [missing[i:i + self.local_batch_size] for i in range(0, len(missing), self.local_batch_size)]
+        
+        async def run_batch(indexes: List[int]):
+            async with semaphore:
+                await limiter.wait()
+                try:
+                    texts = await asyncio.wait_for(
+                        self._acall_local_batch([prompts[i] for i in indexes]), self.deadline
+                    )
+                except Exception as e:
+                    logger.error("本地 AI 批量调用失败: %s", e)
+                    texts = []
+            for i, text in zip(indexes, texts):
+                results[i] = text
+                if use_cache:
+                    self._cache_set(prompts[i], text, "local")
+        
+        await asyncio.gather(*(run_batch(b) for b in batches))
+        return [r if r is not None else self._mock_response(prompts[i]) for i, r in enumerate(results)]
+    
+    def _split_args(self, item: Any) -> Tuple[tuple, dict]:
+        """把批量输入项统一拆成 (args, kwargs)"""
+        if isinstance(item, dict):
+            return (), item
+        if isinstance(item, (list, tuple)):
+            return tuple(item), {}
+        return (item,), {}
+    
+    # ==================== 缓存 ====================
+    def _model_for(self, provider: str) -> str:
+        """provider 实际请求时使用的模型名"""
+        return self.local_model if provider == "local" else self.model
+    
+    def _cache_key(self, prompt: str, provider: Optional[str] = None) -> Optional[str]:
+        """只有真实 provider 的请求才参与缓存；按实际应答的 provider 及其模型区分"""
+        provider = provider or self.provider
+        if not self.cache or provider not in self.CACHEABLE_PROVIDERS:
+            return None
+        if provider not in self._routable_providers():
+            return None
+        return PromptCache.make_key(provider, self._model_for(provider), prompt, self.temperature, self.max_tokens)
+    
+    def _cache_get(self, prompt: str, provider: Optional[str] = None) -> Optional[str]:
+        """不指定 provider 时依次查各 provider 的缓存（对冲时由哪个 provider 应答不确定）"""
+        names = [provider] if provider else dict.fromkeys([self.provider, *self.providers])
+        for name in names:
+            key = self._cache_key(prompt, name)
+            cached = self.cache.get(key) if key else None
+            if cached is not None:
+                return cached
+        return None
     
-    def _call_llm(self, prompt: str) -> str:
+    def _cache_set(self, prompt: str, response: str, provider: Optional[str] = None):
+        key = self._cache_key(prompt, provider)
+        if key and response:
+            self.cache.set(key, response)
+    
+    # ==================== LLM 调用 ====================
+    def _has_backend(self) -> bool:
+        """是否有可调用的 provider（local 不需要 API Key）"""
+        return bool(self._routable_providers()) or (self.provider == "gemini" and bool(self.api_key))
+    
+    def _call_llm(self, prompt: str, use_cache: bool = True) -> str:
         """调用 LLM"""
-        if not self.api_key:
+        if not self._has_backend():
             logger.warning("未配置 AI API Key，使用模拟响应")
             return self._mock_response(prompt)
         
+        if use_cache:
+            cached = self._cache_get(prompt)
+            if cached is not None:
+                logger.debug("AI 响应命中缓存")
+                return cached
+        
+        try:
+            providers = self._routable_providers()
+            if providers:
+                started, winner = time.perf_counter(), "failed"
+                try:
+                    response, winner = self.router.call(prompt, providers, deadline=self.deadline, hedge=self.hedge,
+                                                        hedge_same=self._hedge_same(providers))
+                finally:
+                    # 按实际应答的 provider 记录耗时
+                    metrics.observe("llm", f"llm.{winner}", time.perf_counter() - started)
+            elif self.provider == "gemini":
+                return self._call_gemini(prompt)
+            else:
+                return self._mock_response(prompt)
+        except Exception as e:
+            logger.error("AI 调用失败: %s", e)
+            return self._mock_response(prompt)
+        
+        if use_cache:
+            self._cache_set(prompt, response, winner)
+        return response
+    
+    def _routable_providers(self) -> Dict[str, Callable[[str], str]]:
+        """已实现真实调用的 provider，交给路由器选路和对冲"""
+        implemented = {
+            "local": self._call_local,
+        }
+        if self.api_key:
+            implemented["openai"] = self._call_openai
+        return {name: implemented[name] for name in self.providers if name in implemented}
+    
+    def _hedge_same(self, providers: Dict[str, Any]) -> bool:
+        """只有一个 provider 时是否向它自己对冲：本地服务不计费，默认允许"""
+        return self.hedge_same or list(providers) == ["local"]
+    
+    async def _acall_llm(self, prompt: str, use_cache: bool = True) -> str:
+        """调用 LLM（异步，缓存查询由调用方在排队前完成）"""
+        if not self._has_backend():
+            return self._mock_response(prompt)
+        
+        callers = {"openai": self._acall_openai, "local": self._acall_local}
         try:
-            if self.provider == "openai":
-                return self._call_openai(prompt)
+            providers = {name: callers[name] for name in self._routable_providers()}
+            if providers:
+                started, winner = time.perf_counter(), "failed"
+                try:
+                    response, winner = await self.router.acall(prompt, providers, deadline=self.deadline,
+                                                               hedge=self.hedge,
+                                                               hedge_same=self._hedge_same(providers))
+                finally:
+                    metrics.observe("llm", f"llm.{winner}", time.perf_counter() - started)
             elif self.provider == "gemini":
                 return self._call_gemini(prompt)
             else:
                 return self._mock_response(prompt)
         except Exception as e:
-            logger.error(f"AI 调用失败: {e}")
+            logger.error("AI 调用失败: %s", e)
             return self._mock_response(prompt)
+        
+        if use_cache:
+            self._cache_set(prompt, response, winner)
+        return response
+    
+    def _stream_llm(self, prompt: str, use_cache: bool = True) -> Iterator[str]:
+        """流式调用 LLM，失败时退回模拟响应"""
+        if not self._has_backend():
+            logger.warning("未配置 AI API Key，使用模拟响应")
+            yield from self._mock_stream(prompt)
+            return
+        
+        if use_cache:
+            cached = self._cache_get(prompt)
+            if cached is not None:
+                yield cached
+                return
+        
+        streamers = {"openai": self._stream_openai, "local": self._stream_local}
+        providers = self.router.rank(list(self._routable_providers()))
+        if not providers:
+            yield from self._mock_stream(prompt)
+            return
+        
+        # 已输出内容后无法换 provider 重来；还没有输出时按排序依次改用下一个 provider
+        for name in providers:
+            chunks = []
+            started = time.perf_counter()
+            try:
+                for token in streamers[name](prompt):
+                    chunks.append(token)
+                    yield token
+            except Exception as e:
+                self.router.record(name, None, False)
+                logger.error("AI 流式调用失败 (%s): %s", name, e)
+                if chunks:
+                    return
+                continue
+            finally:
+                # 计时包含消费方处理每段的时间
+                metrics.observe("llm", f"llm.{name}", time.perf_counter() - started)
+            # 延迟里混有消费方的处理时间，只记录结果
+            self.router.record(name, None, True)
+            if use_cache:
+                self._cache_set(prompt, "".join(chunks), name)
+            return
+        
+        yield from self._mock_stream(prompt)
+    
+    def _messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": "你是一个社交媒体内容创作专家。"},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _openai_client(self, asynchronous: bool = False):
+        """获取共享的 OpenAI 客户端（同步客户端进程内复用，异步客户端按事件循环复用）"""
+        import openai
+        key = ("openai", self.api_key)
+        with _clients_lock:
+            if not asynchronous:
+                client = _sync_clients.get(key)
+                if client is None:
+                    client = _sync_clients[key] = openai.OpenAI(api_key=self.api_key, timeout=self.deadline)
+                return client
+            
+            loop = asyncio.get_running_loop()
+            pool = _async_clients.setdefault(loop, {})
+            client = pool.get(key)
+            if client is None:
+                client = pool[key] = openai.AsyncOpenAI(api_key=self.api_key, timeout=self.deadline)
+            return client
     
     def _call_openai(self, prompt: str) -> str:
         """调用 OpenAI"""
         try:
-            import openai
-            client = openai.OpenAI(api_key=self.api_key)
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "你是一个社交媒体内容创作专家。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            return response.choices[0].message.content
+            client = self._openai_client()
         except ImportError:
-            logger.error("openai 库未安装，运行: pip install openai")
-            return self._mock_response(prompt)
+            # 抛给 _call_llm 处理，避免模拟响应被写进缓存
+            raise RuntimeError("openai 库未安装，运行: pip install openai")
+        response = client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(prompt),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
+        )
+        return response.choices[0].message.content
+    
+    async def _acall_openai(self, prompt: str) -> str:
+        """调用 OpenAI（异步）"""
+        try:
+            client = self._openai_client(asynchronous=True)
+        except ImportError:
+            raise RuntimeError("openai 库未安装，运行: pip install openai")
+        response = await client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(prompt),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
+        )
+        return response.choices[0].message.content
+    
+    def _stream_openai(self, prompt: str) -> Iterator[str]:
+        """调用 OpenAI（流式）"""
+        try:
+            client = self._openai_client()
+        except ImportError:
+            raise RuntimeError("openai 库未安装，运行: pip install openai")
+        stream = client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(prompt),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                yield token
+    
+    # ==================== 本地 OpenAI 兼容服务 ====================
+    def _local_client(self, asynchronous: bool = False):
+        """获取共享的本地服务 httpx 客户端（keep-alive 连接池）"""
+        # 延迟导入：只用云端服务或模拟响应的命令不加载 httpx
+        import httpx
+        
+        key = ("local", self.local_base_url)
+        headers = {"Authorization": f"Bearer {self.local_api_key}"} if self.local_api_key else {}
+        limits = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60)
+        with _clients_lock:
+            if not asynchronous:
+                client = _sync_clients.get(key)
+                if client is None:
+                    client = _sync_clients[key] = httpx.Client(
+                        base_url=self.local_base_url, timeout=self.deadline, limits=limits, headers=headers
+                    )
+                return client
+            
+            loop = asyncio.get_running_loop()
+            pool = _async_clients.setdefault(loop, {})
+            client = pool.get(key)
+            if client is None:
+                client = pool[key] = httpx.AsyncClient(
+                    base_url=self.local_base_url, timeout=self.deadline, limits=limits, headers=headers
+                )
+            return client
+    
+    def _local_payload(self, prompt: str, stream: bool = False) -> Dict[str, Any]:
+        payload = {
+            "model": self.local_model,
+            "messages": self._messages(prompt),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+    
+    def _call_local(self, prompt: str) -> str:
+        """调用本地 OpenAI 兼容服务"""
+        response = self._local_client().post("/chat/completions", json=self._local_payload(prompt))
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+    
+    async def _acall_local(self, prompt: str) -> str:
+        """调用本地 OpenAI 兼容服务（异步）"""
+        response = await self._local_client(asynchronous=True).post(
+            "/chat/completions", json=self._local_payload(prompt)
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+    
+    async def _acall_local_batch(self, prompts: List[str]) -> List[str]:
+        """一次 /completions 请求提交多个 prompt（服务端需支持 prompt 数组）"""
+        system = self._messages("")[0]["content"]
+        response = await self._local_client(asynchronous=True).post("/completions", json={
+            "model": self.local_model,
+            "prompt": [f"{system}\n\n{p}\n" for p in prompts],
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        })
+        response.raise_for_status()
+        choices = sorted(response.json()["choices"], key=lambda c: c.get("index", 0))
+        return [c.get("text", "").strip() for c in choices]
+    
+    def _stream_local(self, prompt: str) -> Iterator[str]:
+        """调用本地 OpenAI 兼容服务（流式，SSE）"""
+        with self._local_client().stream(
+            "POST", "/chat/completions", json=self._local_payload(prompt, stream=True)
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                token = choices[0].get("delta", {}).get("content") if choices else None
+                if token:
+                    yield token
+    
+    def _mock_stream(self, prompt: str, chunk_size: int = 4) -> Iterator[str]:
+        """把模拟响应切成小段，模拟流式输出"""
+        text = self._mock_response(prompt)
+        for i in range(0, len(text), chunk_size):
+            yield text[i:i + chunk_size]
     
     def _call_gemini(self, prompt: str) -> str:
         """调用 Gemini"""
@@ -0,0 +1,198 @@
+"""
+近似重复检测 - MinHash + LSH
+搜索结果里有大量转发、复制粘贴的笔记和模板化广告，送进 LLM 之前先按文本 shingle 聚类，
+每个簇只保留一个代表并记录簇大小，下游成本只随不同内容的数量增长。
+
+条目逐个加入（add），适合边抓取边去重；签名计算用 NumPy 按排列整列完成。
+"""
+
+import os
+import re
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from base import get_logger, metrics
+
+logger = get_logger(__name__)
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+URL_RE = re.compile(r"https?://\S+")
+MENTION_RE = re.compile(r"@\w+")
+RETWEET_RE = re.compile(r"^\s*rt\b")
+# 去掉标点、符号和空白后按字符切 shingle，中英文都适用
+NOISE_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def record_text(item: Union[str, Dict[str, Any]]) -> str:
+    """推文取 text，笔记取标题 + 正文"""
+    if isinstance(item, str):
+        return item
+    if item.get("text"):
+        return str(item["text"])
+    parts = [item.get("title"), item.get("content") or item.get("desc")]
+    return " ".join(str(p) for p in parts if p)
+
+
+def normalize(text: str) -> str:
+    text = URL_RE.sub(" ", RETWEET_RE.sub("", text.lower()))
+    text = MENTION_RE.sub(" ", text)
+    return NOISE_RE.sub("", text)
+
+
+def _optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """选 band 数 b 和每 band 行数 r（b * r <= num_perm），使漏判和误判概率的积分之和最小"""
+    xs = np.linspace(0, 1, 201)
+    below = xs < threshold
+    best, best_error = (1, num_perm), float("inf")
+    for b in range(1, num_perm + 1):
+        r = num_perm // b
+        # 相似度为 s 的两条文本成为候选的概率；步长相同，求和即可比较积分大小
+        p = 1 - (1 - xs ** r) ** b
+        error = p[below].sum() + (1 - p[~below]).sum()
+        if error < best_error:
+            best, best_error = (b, r), error
+    return best
+
+
+class MinHasher:
+    """字符 shingle 的 MinHash 签名：num_perm 个 (a * h + b) mod p 形式的哈希排列"""
+
+    def __init__(self, num_perm: int = 128, shingle: int = 4, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle = shingle
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> set:
+        text = normalize(text)
+        k = self.shingle
+        if len(text) <= k:
+            return {text} if text else set()
+        return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """文本为空时返回 None"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        # (shingle 数, num_perm)，乘法溢出按 2^64 回绕，与常见实现一致
+        permuted = ((hashes[:, None] * self.a + self.b) % MERSENNE_PRIME) & MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class Cluster:
+    """一个近似重复簇：第一条为代表"""
+
+    __slots__ = ("id", "representative", "signature", "size", "members")
+
+    def __init__(self, cluster_id: int, representative: Any, signature: Optional[np.ndarray], member: Any):
+        self.id = cluster_id
+        self.representative = representative
+        self.signature = signature
+        self.size = 1
+        self.members = [member]
+
+
+class NearDuplicateIndex:
+    """增量 LSH 索引
+
+    add() 把条目归入已有的簇（与某个簇代表的估计 Jaccard 相似度 >= threshold）或新建一个簇。
+    签名按 band 切段后放进哈希桶，只和同桶的簇比较，条目数增长时每次 add 的开销基本不变。
+    """
+
+    def __init__(self, threshold: Optional[float] = None, num_perm: int = 128, shingle: int = 4,
+                 seed: int = 1, max_members: int = 100):
+        self.threshold = (threshold if threshold is not None
+                          else float(os.getenv("AGENT_REACH_DEDUP_THRESHOLD", "0.7")))
+        if not 0 < self.threshold <= 1:
+            raise ValueError("threshold 须在 (0, 1] 之间")
+        self.hasher = MinHasher(num_perm, shingle, seed)
+        self.bands, self.rows = _optimal_bands(self.threshold, num_perm)
+        # 每个簇最多记录多少个成员 ID，簇大小不受限制
+        self.max_members = max_members
+        self.clusters: List[Cluster] = []
+        self._buckets: List[Dict[bytes, int]] = [{} for _ in range(self.bands)]
+        self.items = 0
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        r = self.rows
+        return [signature[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def add(self, item: Any, text: Optional[str] = None, member: Any = None) -> Tuple[Cluster, bool]:
+        """加入一条，返回 (所属簇, 是否新建簇)
+
+        text 默认由 record_text(item) 得到；member 为记录在簇里的标识，默认取 item 的 id / url
+        """
+        self.items += 1
+        if member is None:
+            member = (item.get("id") or item.get("url")) if isinstance(item, dict) else item
+        signature = self.hasher.signature(record_text(item) if text is None else text)
+
+        if signature is None:
+            # 空文本不参与聚类
+            cluster = Cluster(len(self.clusters), item, None, member)
+            self.clusters.append(cluster)
+            return cluster, True
+
+        keys = self._band_keys(signature)
+        candidates = {bucket[key] for bucket, key in zip(self._buckets, keys) if key in bucket}
+        best, best_similarity = None, self.threshold
+        for index in candidates:
+            similarity = float(np.mean(self.clusters[index].signature == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = self.clusters[index], similarity
+
+        if best is not None:
+            best.size += 1
+            if len(best.members) < self.max_members:
+                best.members.append(member)
+            # 成员的 band 也指向该簇，改写过多次的转发仍能找到
+            for bucket, key in zip(self._buckets, keys):
+                bucket.setdefault(key, best.id)
+            metrics.incr("dedup.duplicate")
+            return best, False
+
+        cluster = Cluster(len(self.clusters), item, signature, member)
+        self.clusters.append(cluster)
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, cluster.id)
+        return cluster, True
+
+    def representatives(self) -> List[Dict[str, Any]]:
+        """每个簇的代表（dict 条目会复制一份并加上 cluster_size / duplicates）"""
+        result = []
+        for cluster in self.clusters:
+            rep = cluster.representative
+            if isinstance(rep, dict):
+                rep = dict(rep, cluster_size=cluster.size, duplicates=cluster.members[1:])
+            result.append(rep)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = [cluster.size for cluster in self.clusters]
+        return {
+            "items": self.items,
+            "clusters": len(self.clusters),
+            "largest": max(sizes, default=0),
+            "threshold": self.threshold,
+            "bands": self.bands,
+            "rows": self.rows,
+        }
+
+
+def dedup_records(records: Iterable[Dict[str, Any]], threshold: Optional[float] = None,
+                  **kwargs) -> List[Dict[str, Any]]:
+    """一次性去重：返回每个簇的代表，按簇首次出现的顺序，带 cluster_size 和 duplicates"""
+    index = NearDuplicateIndex(threshold, **kwargs)
+    for record in records:
+        index.add(record)
+    stats = index.stats()
+    logger.info("近似去重: %s 条 -> %s 个簇", stats["items"], stats["clusters"])
+    return index.representatives()
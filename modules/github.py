@@ -2,44 +2,158 @@
 GitHub 模块 - 基于 gh CLI
 """
 
+import contextvars
 import json
+import os
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
-from base import BaseClient, logger
+from base import BaseClient, CACHE_DIR, get_logger, span
+
+logger = get_logger(__name__)
+
+# gh 认证状态缓存有效期（秒）
+AUTH_CACHE_TTL = float(os.getenv("GH_AUTH_CACHE_TTL", "3600"))
+AUTH_CACHE_FILE = CACHE_DIR / "gh_auth.json"
+
+# gh 输出中表示认证失效的关键字
+AUTH_ERROR_MARKERS = (
+    "gh auth login",
+    "not logged in",
+    "authentication",
+    "bad credentials",
+    "http 401",
+)
+
+
+class AuthCache:
+    """gh 认证状态缓存 - 进程内 + 可选磁盘持久化
+    
+    "ok" 状态在 TTL 内直接复用，不再每次构造客户端都跑一遍 `gh auth status`；
+    未登录 / 未安装不缓存，`gh auth login` 之后下一次调用立即生效。
+    命令因认证错误失败时调用 invalidate() 触发下一次重新检查。
+    """
+    
+    def __init__(self, ttl: float = AUTH_CACHE_TTL, path: Optional[os.PathLike] = AUTH_CACHE_FILE):
+        self.ttl = ttl
+        self.path = path
+        self._lock = threading.Lock()
+        self._state: Optional[Dict[str, Any]] = None
+    
+    def get(self) -> Optional[Dict[str, Any]]:
+        """返回未过期的 ok 状态，没有（或上次检查未通过）则返回 None，由调用方重新检查"""
+        with self._lock:
+            if self._state is None:
+                self._state = self._load()
+            state = self._state
+        if state and state.get("status") == "ok" and time.time() - state.get("checked_at", 0) < self.ttl:
+            return state
+        return None
+    
+    def set(self, status: str) -> Dict[str, Any]:
+        """记录认证状态: ok / unauthenticated / missing"""
+        state = {"status": status, "checked_at": time.time()}
+        with self._lock:
+            self._state = state
+        self._save(state)
+        return state
+    
+    def invalidate(self):
+        """作废缓存，下次访问时重新检查"""
+        with self._lock:
+            self._state = {}
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+    
+    def _load(self) -> Dict[str, Any]:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save(self, state: Dict[str, Any]):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.debug("保存 gh 认证缓存失败: %s", e)
+
+
+# 进程内共享，CLI / MCP 每次新建客户端都能命中
+_auth_cache = AuthCache()
 
 
 class GitHubClient(BaseClient):
     """GitHub 客户端 - 使用官方 CLI"""
     
-    def __init__(self):
+    def __init__(self, auth_cache: Optional[AuthCache] = None):
         super().__init__(None)
+        self.auth_cache = auth_cache or _auth_cache
         self._check_auth()
     
-    def _check_auth(self):
-        """检查是否已登录"""
+    def _check_auth(self, force: bool = False) -> str:
+        """检查是否已登录（优先使用缓存的认证状态）"""
+        state = None if force else self.auth_cache.get()
+        if state is None:
+            state = self.auth_cache.set(self._probe_auth())
+        
+        status = state["status"]
+        if status == "unauthenticated":
+            logger.warning("GitHub CLI 未登录，请先运行: gh auth login")
+        elif status == "missing":
+            logger.error("未找到 gh CLI，请先安装: brew install gh")
+        return status
+    
+    def _probe_auth(self) -> str:
+        """运行 gh auth status 获取真实认证状态"""
         try:
-            result = subprocess.run(
-                ["gh", "auth", "status"],
-                capture_output=True,
-                text=True,
-                check=False
-            )
-            if result.returncode != 0:
-                logger.warning("GitHub CLI 未登录，请先运行: gh auth login")
+            with span("subprocess", "gh.auth.status"):
+                result = subprocess.run(
+                    ["gh", "auth", "status"],
+                    capture_output=True,
+                    text=True,
+                    check=False
+                )
+            return "ok" if result.returncode == 0 else "unauthenticated"
         except FileNotFoundError:
-            logger.error("未找到 gh CLI，请先安装: brew install gh")
+            return "missing"
+    
+    def _is_auth_error(self, stderr: str) -> bool:
+        """判断 gh 的错误输出是否为认证问题"""
+        text = (stderr or "").lower()
+        return any(marker in text for marker in AUTH_ERROR_MARKERS)
+    
+    def _op_name(self, args: List[str]) -> str:
+        """计时用的操作名: gh.repo.view / gh.issue.list / gh.api"""
+        if not args or args[0] == "api":
+            return "gh.api"
+        return "gh." + ".".join(a for a in args[:2] if not a.startswith("-"))
     
     def _run_gh_command(self, args: List[str]) -> Dict[str, Any]:
         """运行 gh 命令"""
         cmd = ["gh"] + args
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            with span("subprocess", self._op_name(args)):
+                result = subprocess.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    check=True
+                )
             if result.stdout:
                 try:
                     return json.loads(result.stdout)
@@ -47,12 +161,20 @@ class GitHubClient(BaseClient):
                     return {"output": result.stdout}
             return {}
         except subprocess.CalledProcessError as e:
-            logger.error(f"gh 命令失败: {e.stderr}")
+            logger.error("gh 命令失败: %s", e.stderr)
+            if self._is_auth_error(e.stderr):
+                # 认证失效时才重新验证，平时不再额外跑 gh auth status
+                self.auth_cache.invalidate()
+                self._check_auth(force=True)
             return {"error": e.stderr}
+        except FileNotFoundError:
+            self.auth_cache.set("missing")
+            logger.error("未找到 gh CLI，请先安装: brew install gh")
+            return {"error": "gh CLI not found"}
     
     def search_repos(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """搜索仓库"""
-        logger.info(f"搜索 GitHub 仓库: {query}")
+        logger.info("搜索 GitHub 仓库: %s", query)
         
         result = self._run_gh_command([
             "search", "repos",
@@ -80,7 +202,7 @@ class GitHubClient(BaseClient):
     
     def get_repo(self, repo: str) -> Dict[str, Any]:
         """获取仓库详情"""
-        logger.info(f"获取仓库信息: {repo}")
+        logger.info("获取仓库信息: %s", repo)
         
         result = self._run_gh_command([
             "repo", "view", repo,
@@ -100,7 +222,7 @@ class GitHubClient(BaseClient):
     
     def create_issue(self, repo: str, title: str, body: str = "") -> Dict[str, Any]:
         """创建 Issue"""
-        logger.info(f"创建 Issue: {title}")
+        logger.info("创建 Issue: %s", title)
         
         cmd = ["issue", "create", "--repo", repo, "--title", title]
         if body:
@@ -119,3 +241,83 @@ class GitHubClient(BaseClient):
         ])
         
         return result if isinstance(result, list) else []
+
+    def get_readme(self, repo: str) -> Any:
+        """获取仓库 README 原文，gh 失败时返回 {"error": ...}"""
+        result = self._run_gh_command([
+            "api", f"repos/{repo}/readme",
+            "-H", "Accept: application/vnd.github.raw"
+        ])
+        if isinstance(result, dict) and "error" in result:
+            return result
+        return result.get("output", "") if isinstance(result, dict) else ""
+    
+    def get_languages(self, repo: str) -> Dict[str, Any]:
+        """获取仓库语言分布（字节数），gh 失败时返回 {"error": ...}"""
+        result = self._run_gh_command(["api", f"repos/{repo}/languages"])
+        return result if isinstance(result, dict) else {}
+    
+    def list_releases(self, repo: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """列出最近的 Release"""
+        result = self._run_gh_command([
+            "release", "list",
+            "--repo", repo,
+            "--limit", str(limit),
+            "--json", "name,tagName,publishedAt,isLatest,isPrerelease"
+        ])
+        
+        if isinstance(result, list):
+            return [
+                {
+                    "name": item.get("name"),
+                    "tag_name": item.get("tagName"),
+                    "published_at": item.get("publishedAt"),
+                    "is_latest": item.get("isLatest", False),
+                    "prerelease": item.get("isPrerelease", False)
+                }
+                for item in result
+            ]
+        return []
+    
+    def repo_snapshot(self, repo: str, issue_limit: int = 10, release_limit: int = 5) -> Dict[str, Any]:
+        """并发获取仓库快照：详情 + Issues + README + 语言 + Release
+        
+        各部分是相互独立的 gh 子进程，并发执行后总耗时取决于最慢的一项，
+        而不是所有调用耗时之和。
+        """
+        logger.info("获取仓库快照: %s", repo)
+        
+        parts = {
+            "repository": (self.get_repo, (repo,)),
+            "issues": (self.list_issues, (repo, issue_limit)),
+            "readme": (self.get_readme, (repo,)),
+            "languages": (self.get_languages, (repo,)),
+            "releases": (self.list_releases, (repo, release_limit)),
+        }
+        
+        snapshot: Dict[str, Any] = {"repo": repo}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=len(parts)) as executor:
+            # 每个任务带上当前上下文，分阶段计时能归到本次调用
+            futures = {
+                name: executor.submit(contextvars.copy_context().run, func, *args)
+                for name, (func, args) in parts.items()
+            }
+            for name, future in futures.items():
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error("快照部分 %s 获取失败: %s", name, e)
+                    snapshot[name] = None
+                    errors[name] = str(e)
+                    continue
+                if isinstance(result, dict) and "error" in result:
+                    # gh 失败以 {"error": ...} 返回，同样计入 errors
+                    snapshot[name] = None
+                    errors[name] = result["error"]
+                else:
+                    snapshot[name] = result
+        
+        if errors:
+            snapshot["errors"] = errors
+        return snapshot
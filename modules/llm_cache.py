@@ -0,0 +1,188 @@
+"""
+LLM 响应缓存模块
+内存 LRU + SQLite 磁盘持久化，重复的生成请求直接命中缓存
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from base import CACHE_DIR, get_logger, metrics
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_PATH = CACHE_DIR / "llm_cache.sqlite3"
+
+
+class PromptCache:
+    """Prompt -> 响应缓存
+
+    key 由 (provider, model, prompt, temperature, max_tokens) 计算得到；
+    读取先查内存 LRU，未命中再查磁盘，磁盘命中会回填内存。
+    """
+
+    def __init__(self, path: Optional[Path] = DEFAULT_CACHE_PATH,
+                 ttl: float = 7 * 24 * 3600,
+                 max_memory_entries: int = 256,
+                 max_disk_entries: int = 10000):
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str,
+                 temperature: float, max_tokens: int) -> str:
+        """计算缓存 key"""
+        raw = json.dumps([provider, model, prompt, temperature, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """延迟打开磁盘缓存"""
+        if self._db is None and self.path:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning("打开 LLM 磁盘缓存失败，仅使用内存缓存: %s", e)
+                self.path = None
+                self._db = None
+        return self._db
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                metrics.incr("llm_cache.hit")
+                return entry[0]
+            if entry:
+                del self._memory[key]
+
+            db = self._connect()
+            if db is not None:
+                row = db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] < self.ttl:
+                    db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                    db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    metrics.incr("llm_cache.hit")
+                    return row[0]
+
+            self.misses += 1
+            metrics.incr("llm_cache.miss")
+            return None
+
+    def set(self, key: str, value: str):
+        """写入缓存"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            db = self._connect()
+            if db is None:
+                return
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._writes += 1
+            # 每写入一批清理一次，避免每次写都扫表
+            if self._writes % 100 == 0:
+                self._prune(db, now)
+            db.commit()
+
+    def _remember(self, key: str, value: str, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _prune(self, db: sqlite3.Connection, now: float):
+        """删除过期条目，并按最近访问时间淘汰超出上限的条目"""
+        db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._memory.clear()
+            db = self._connect()
+            if db is not None:
+                db.execute("DELETE FROM responses")
+                db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率统计"""
+        with self._lock:
+            disk_entries = 0
+            db = self._connect()
+            if db is not None:
+                disk_entries = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "path": str(self.path) if self.path else None,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_default_cache: Optional[PromptCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[PromptCache]:
+    """进程内共享的默认缓存，AI_CACHE=0 时关闭"""
+    global _default_cache
+    if os.getenv("AI_CACHE", "1") == "0":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PromptCache(
+                ttl=float(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600))),
+                max_memory_entries=int(os.getenv("AI_CACHE_MEMORY_ENTRIES", "256")),
+                max_disk_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", "10000")),
+            )
+        return _default_cache
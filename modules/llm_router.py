@@ -0,0 +1,252 @@
+"""
+LLM 路由模块
+按 provider 的延迟分位数和错误率选路，超过 p95 仍未返回时发出对冲请求
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from base import get_logger
+
+logger = get_logger(__name__)
+
+
+class LLMRouterError(Exception):
+    """所有 provider 都失败或超过截止时间"""
+
+
+class ProviderStats:
+    """单个 provider 的滑动窗口统计"""
+
+    def __init__(self, window: int = 100):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: Optional[float], ok: bool):
+        with self._lock:
+            if ok and latency is not None:
+                self.latencies.append(latency)
+            self.outcomes.append(ok)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """延迟分位数（秒），样本不足时返回 None"""
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def samples(self) -> int:
+        with self._lock:
+            return len(self.latencies)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "samples": self.samples,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "error_rate": round(self.error_rate, 4),
+        }
+
+
+class LLMRouter:
+    """多 provider 路由
+
+    - 按错误率和 p50 排序选择主 provider
+    - 主请求超过其 p95（样本不足时用 hedge_after）仍未返回，就向下一个
+      provider 发出对冲请求，取先成功的结果；只有一个 provider 时仅在
+      hedge_same=True 时向同一 provider 重发（付费接口会被计费两次）
+    - 请求失败时立即改用下一个 provider（关闭对冲时也是如此）
+    - 整体超过 deadline 抛出 LLMRouterError，由调用方决定降级
+    """
+
+    def __init__(self, deadline: float = 30.0, hedge_after: float = 3.0,
+                 min_samples: int = 5, max_error_rate: float = 0.5, max_workers: int = 16):
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.stats: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+        # 被对冲掉的慢请求无法中断，会在后台线程里跑完（受 provider 客户端超时约束）
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-router")
+
+    def _stats(self, name: str) -> ProviderStats:
+        with self._lock:
+            if name not in self.stats:
+                self.stats[name] = ProviderStats()
+            return self.stats[name]
+
+    def rank(self, names: List[str]) -> List[str]:
+        """健康的 provider 优先，其次按 p50 从低到高；没有样本的排在已知快的后面"""
+        def score(name: str) -> Tuple[int, float]:
+            stats = self._stats(name)
+            unhealthy = stats.samples >= self.min_samples and stats.error_rate > self.max_error_rate
+            p50 = stats.percentile(50)
+            return (1 if unhealthy else 0, p50 if p50 is not None else self.hedge_after)
+        return sorted(names, key=score)
+
+    def _hedge_delay(self, name: str) -> float:
+        stats = self._stats(name)
+        p95 = stats.percentile(95)
+        if p95 is None or stats.samples < self.min_samples:
+            return self.hedge_after
+        return p95
+
+    def record(self, name: str, latency: Optional[float], ok: bool):
+        """记录一次不经路由器发出的调用（如流式请求）"""
+        self._stats(name).record(latency, ok)
+
+    def _submit(self, name: str, func: Callable[[str], str], prompt: str) -> Future:
+        started = time.monotonic()
+        future = self._executor.submit(func, prompt)
+
+        def done(f: Future):
+            ok = f.exception() is None
+            self._stats(name).record(time.monotonic() - started if ok else None, ok)
+
+        future.add_done_callback(done)
+        return future
+
+    def call(self, prompt: str, providers: Dict[str, Callable[[str], str]],
+             deadline: Optional[float] = None, hedge: bool = True,
+             hedge_same: bool = False) -> Tuple[str, str]:
+        """路由一次调用，返回 (响应文本, 实际应答的 provider)"""
+        if not providers:
+            raise LLMRouterError("没有可用的 AI provider")
+
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        order = self.rank(list(providers))
+        backups = order[1:] or ([order[0]] if hedge and hedge_same else [])
+        pending: Dict[Future, str] = {}
+        errors: List[str] = []
+
+        primary = order[0]
+        pending[self._submit(primary, providers[primary], prompt)] = primary
+        hedge_at = time.monotonic() + self._hedge_delay(primary)
+
+        while pending:
+            now = time.monotonic()
+            if now >= deadline_at:
+                break
+            timeout = deadline_at - now
+            if hedge and backups:
+                timeout = min(timeout, max(0.0, hedge_at - now))
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                if future.exception() is None:
+                    if name != primary:
+                        logger.info("AI 对冲请求胜出: %s", name)
+                    return future.result(), name
+                errors.append(f"{name}: {future.exception()}")
+                logger.warning("AI provider %s 调用失败: %s", name, future.exception())
+
+            # 主请求失败或超过 p95 未返回：发出下一个对冲请求
+            if backups and (not pending or (hedge and time.monotonic() >= hedge_at)):
+                name = backups.pop(0)
+                logger.debug("AI 请求失败或超过 p95，转到 %s", name)
+                pending[self._submit(name, providers[name], prompt)] = name
+                hedge_at = time.monotonic() + self._hedge_delay(name)
+
+        if pending:
+            raise LLMRouterError(f"AI 请求超过截止时间 {deadline or self.deadline:.1f}s")
+        raise LLMRouterError("; ".join(errors) or "AI 调用失败")
+
+    def _create_task(self, name: str, func: Callable[[str], Awaitable[str]], prompt: str) -> "asyncio.Task":
+        started = time.monotonic()
+        task = asyncio.ensure_future(func(prompt))
+
+        def done(t: "asyncio.Task"):
+            # 被对冲掉而取消的请求不计入统计
+            if t.cancelled():
+                return
+            ok = t.exception() is None
+            self._stats(name).record(time.monotonic() - started if ok else None, ok)
+
+        task.add_done_callback(done)
+        return task
+
+    async def acall(self, prompt: str, providers: Dict[str, Callable[[str], Awaitable[str]]],
+                    deadline: Optional[float] = None, hedge: bool = True,
+                    hedge_same: bool = False) -> Tuple[str, str]:
+        """call 的异步版本：provider 为协程函数，对冲请求是同一事件循环里的任务，落败的请求会被取消"""
+        if not providers:
+            raise LLMRouterError("没有可用的 AI provider")
+
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        order = self.rank(list(providers))
+        backups = order[1:] or ([order[0]] if hedge and hedge_same else [])
+        pending: Dict["asyncio.Task", str] = {}
+        errors: List[str] = []
+
+        primary = order[0]
+        pending[self._create_task(primary, providers[primary], prompt)] = primary
+        hedge_at = time.monotonic() + self._hedge_delay(primary)
+
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline_at:
+                    break
+                timeout = deadline_at - now
+                if hedge and backups:
+                    timeout = min(timeout, max(0.0, hedge_at - now))
+
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        if name != primary:
+                            logger.info("AI 对冲请求胜出: %s", name)
+                        return task.result(), name
+                    errors.append(f"{name}: {task.exception()}")
+                    logger.warning("AI provider %s 调用失败: %s", name, task.exception())
+
+                if backups and (not pending or (hedge and time.monotonic() >= hedge_at)):
+                    name = backups.pop(0)
+                    logger.debug("AI 请求失败或超过 p95，转到 %s", name)
+                    pending[self._create_task(name, providers[name], prompt)] = name
+                    hedge_at = time.monotonic() + self._hedge_delay(name)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if pending:
+            raise LLMRouterError(f"AI 请求超过截止时间 {deadline or self.deadline:.1f}s")
+        raise LLMRouterError("; ".join(errors) or "AI 调用失败")
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """各 provider 的延迟 / 错误率统计"""
+        with self._lock:
+            names = list(self.stats)
+        return {name: self._stats(name).snapshot() for name in names}
+
+
+_default_router: Optional[LLMRouter] = None
+_default_router_lock = threading.Lock()
+
+
+def get_default_router(deadline: float = 30.0, hedge_after: float = 3.0) -> LLMRouter:
+    """进程内共享的路由器，统计在多个 ContentGenerator 之间累积"""
+    global _default_router
+    with _default_router_lock:
+        if _default_router is None:
+            _default_router = LLMRouter(deadline=deadline, hedge_after=hedge_after)
+        return _default_router
@@ -0,0 +1,228 @@
+"""
+性能剖析模块
+cProfile / 采样火焰图 + Playwright trace + IPC 往返计数
+"""
+
+import collections
+import cProfile
+import io
+import pstats
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from base import CACHE_DIR, collect, current_collector, get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_PROFILE_DIR = CACHE_DIR / "profiles"
+
+# 当前激活的剖析会话，浏览器客户端据此决定是否录制 trace
+_active: Optional["Profiler"] = None
+
+
+def active_profiler() -> Optional["Profiler"]:
+    return _active
+
+
+class IPCCounter:
+    """统计 Playwright 驱动进程的 IPC 往返次数（按协议方法分组）"""
+
+    def __init__(self):
+        self.counts: "collections.Counter[str]" = collections.Counter()
+        self._original = None
+        self._method_name = ""
+        self._connection_cls = None
+
+    def install(self):
+        try:
+            from playwright._impl._connection import Connection
+        except ImportError:
+            return
+        # 不同版本的 playwright 方法名不同
+        for name in ("_send_message_to_server", "send_message_to_server"):
+            original = getattr(Connection, name, None)
+            if original is not None:
+                break
+        else:
+            return
+        counts = self.counts
+
+        def counted(conn, obj, method, *args, **kwargs):
+            counts[method] += 1
+            return original(conn, obj, method, *args, **kwargs)
+
+        self._connection_cls = Connection
+        self._method_name = name
+        self._original = original
+        setattr(Connection, name, counted)
+
+    def uninstall(self):
+        if self._connection_cls is not None:
+            setattr(self._connection_cls, self._method_name, self._original)
+            self._connection_cls = None
+
+
+class _Sampler:
+    """采样剖析：定时抓取目标线程调用栈，输出 collapsed stack（flamegraph.pl / speedscope 可直接读取）"""
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: "collections.Counter[str]" = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="agent-reach-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, path: Path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top_functions(self, limit: int) -> list:
+        """按自身采样数（栈顶）排序"""
+        leaf = collections.Counter()
+        for stack, count in self.stacks.items():
+            leaf[stack.rsplit(";", 1)[-1]] += count
+        return leaf.most_common(limit)
+
+
+class Profiler:
+    """一次命令 / 工具调用的剖析会话
+
+    mode: cprofile（输出 .prof，可用 snakeviz 查看）或 sample（输出 .folded 火焰图数据）
+    浏览器操作会额外输出 Playwright trace zip（playwright show-trace 查看）
+    """
+
+    def __init__(self, label: str, mode: str = "cprofile",
+                 output_dir: Optional[Path] = None, interval: float = 0.005, top: int = 25):
+        if mode not in ("cprofile", "sample"):
+            raise ValueError(f"未知剖析模式: {mode}")
+        self.mode = mode
+        self.output_dir = Path(output_dir or DEFAULT_PROFILE_DIR)
+        self.interval = interval
+        self.top = top
+        safe_label = re.sub(r"[^\w.-]+", "_", label).strip("_") or "run"
+        self.prefix = f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label}"
+        self.traces = []
+        self.files: Dict[str, Path] = {}
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_Sampler] = None
+        self._ipc = IPCCounter()
+        self._collect = None
+        self._collector = None
+        self._started = 0.0
+        self.elapsed = 0.0
+
+    def trace_path(self, op: str) -> Path:
+        """为一个浏览器上下文分配 trace 文件路径"""
+        path = self.output_dir / f"{self.prefix}-{op}-{len(self.traces) + 1}.trace.zip"
+        self.traces.append(path)
+        return path
+
+    def __enter__(self) -> "Profiler":
+        global _active
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._ipc.install()
+        # 已在收集中（如 MCP 调用的 _meta）时复用外层 Collector
+        self._collector = current_collector()
+        if self._collector is None:
+            self._collect = collect()
+            self._collector = self._collect.__enter__()
+        _active = self
+        self._started = time.perf_counter()
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = _Sampler(self.interval)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        global _active
+        if self._profile:
+            self._profile.disable()
+        if self._sampler:
+            self._sampler.stop()
+        self.elapsed = time.perf_counter() - self._started
+        _active = None
+        self._ipc.uninstall()
+        if self._collect is not None:
+            self._collect.__exit__(exc_type, exc_val, exc_tb)
+            self._collect = None
+        self._write()
+        return False
+
+    def _write(self):
+        if self._profile:
+            path = self.output_dir / f"{self.prefix}.prof"
+            self._profile.dump_stats(str(path))
+            self.files["profile"] = path
+        if self._sampler:
+            path = self.output_dir / f"{self.prefix}.folded"
+            self._sampler.dump(path)
+            self.files["flamegraph"] = path
+
+        summary = self.summary()
+        path = self.output_dir / f"{self.prefix}.summary.txt"
+        path.write_text(summary, encoding="utf-8")
+        self.files["summary"] = path
+        logger.info("剖析结果已写入: %s", path)
+
+    def summary(self) -> str:
+        """热点函数 + IPC 往返次数汇总表"""
+        out = io.StringIO()
+        out.write(f"# agent-reach profile: {self.prefix}\n")
+        out.write(f"耗时: {self.elapsed * 1000:.1f} ms  模式: {self.mode}\n\n")
+
+        out.write(f"## 热点函数 (top {self.top})\n")
+        if self._profile:
+            stats = pstats.Stats(self._profile, stream=out)
+            stats.sort_stats("cumulative").print_stats(self.top)
+        elif self._sampler:
+            total = sum(self._sampler.stacks.values()) or 1
+            out.write(f"{'样本':>8} {'占比':>7}  函数\n")
+            for func, count in self._sampler.top_functions(self.top):
+                out.write(f"{count:>8} {count * 100 / total:>6.1f}%  {func}\n")
+
+        ipc = self._ipc.counts
+        out.write(f"\n## Playwright IPC 往返: {sum(ipc.values())}\n")
+        for method, count in ipc.most_common():
+            out.write(f"{count:>8}  {method}\n")
+
+        stages = self._collector.stages if self._collector else {}
+        if stages:
+            out.write("\n## 阶段耗时\n")
+            for stage, (seconds, count) in sorted(stages.items()):
+                out.write(f"{stage:<12} {seconds * 1000:>10.1f} ms  x{int(count)}\n")
+        subprocesses = self._collector.stage_count("subprocess") if self._collector else 0
+        out.write(f"\n子进程调用: {subprocesses}\n")
+
+        if self.traces:
+            out.write("\n## Playwright trace\n")
+            for trace in self.traces:
+                out.write(f"{trace}\n")
+        return out.getvalue()
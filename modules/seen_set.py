@@ -0,0 +1,195 @@
+"""
+已见 ID 集合 - 基于内存映射位数组的可扩展 Bloom filter
+长时间抓取要记住上千万条推文 / 笔记 ID，Python set 存字符串要占几 GB；
+这里每条约 2–4 字节（误判率 0.1%，随扩层增加），位数组落在磁盘文件上，进程重启后继续使用。
+
+只会误判“已见过”（按误判率漏掉少量新条目），不会把见过的条目当成新的。
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from base import CACHE_DIR, get_logger
+
+logger = get_logger(__name__)
+
+SEEN_DIR = CACHE_DIR / "seen"
+
+MAGIC = b"ARBLOOM1"
+# magic, k, m（位数）, capacity, count, error_rate
+HEADER = struct.Struct("<8sIQQQd")
+HEADER_SIZE = 64
+COUNT_OFFSET = 8 + 4 + 8 + 8
+
+# 每层写满后新层容量翻倍、误判率减半，总误判率收敛到 error_rate
+GROWTH = 2
+TIGHTENING = 0.5
+
+
+def default_path(name: str) -> Path:
+    """按名称（如 twitter-关键词）返回持久化目录"""
+    slug = re.sub(r"[^\w.-]+", "_", name)[:60]
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:8]
+    return SEEN_DIR / f"{slug}-{digest}"
+
+
+def _hashes(key: str) -> tuple:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    # 双重哈希：第 i 个位置为 h1 + i * h2
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class _Layer:
+    """一层定长 Bloom filter；path 为 None 时使用匿名内存映射"""
+
+    def __init__(self, path: Optional[Path], capacity: int = 0, error_rate: float = 0.0):
+        self.path = path
+        self._file = None
+        if path is not None and path.exists():
+            self._file = open(path, "r+b")
+            self._mm = mmap.mmap(self._file.fileno(), 0)
+            magic, self.k, self.m, self.capacity, self.count, self.error_rate = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f"不是 seen-set 文件: {path}")
+            return
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.m = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.count = 0
+        size = HEADER_SIZE + (self.m + 7) // 8
+        if path is None:
+            self._mm = mmap.mmap(-1, size)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, "w+b")
+            # 稀疏文件，未写入的页不占磁盘
+            self._file.truncate(size)
+            self._mm = mmap.mmap(self._file.fileno(), size)
+        HEADER.pack_into(self._mm, 0, MAGIC, self.k, self.m, self.capacity, 0, self.error_rate)
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    @property
+    def nbytes(self) -> int:
+        return HEADER_SIZE + (self.m + 7) // 8
+
+    def _positions(self, h1: int, h2: int):
+        m = self.m
+        return [(h1 + i * h2) % m for i in range(self.k)]
+
+    def contains(self, h1: int, h2: int) -> bool:
+        mm = self._mm
+        for pos in self._positions(h1, h2):
+            if not mm[HEADER_SIZE + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, h1: int, h2: int):
+        mm = self._mm
+        for pos in self._positions(h1, h2):
+            offset = HEADER_SIZE + (pos >> 3)
+            mm[offset] |= 1 << (pos & 7)
+        self.count += 1
+        struct.pack_into("<Q", mm, COUNT_OFFSET, self.count)
+
+    def flush(self):
+        if self._file is not None:
+            self._mm.flush()
+
+    def close(self):
+        self.flush()
+        self._mm.close()
+        if self._file is not None:
+            self._file.close()
+
+
+class SeenSet:
+    """可扩展 Bloom filter（Almeida 等，2007）
+
+    add(key) 检查并记录，返回此前是否已见过。path 为目录，每层一个 layer-NNN.bloom 文件；
+    为 None 时只在内存里（仍是紧凑位数组）。再次打开已有目录时沿用文件里的参数。
+    """
+
+    def __init__(self, path: Optional[Path] = None, capacity: Optional[int] = None,
+                 error_rate: Optional[float] = None):
+        self.path = Path(path) if path else None
+        self.capacity = capacity if capacity is not None else int(os.getenv("AGENT_REACH_SEEN_CAPACITY", "1000000"))
+        self.error_rate = error_rate if error_rate is not None else float(os.getenv("AGENT_REACH_SEEN_ERROR", "0.001"))
+        if self.capacity <= 0 or not 0 < self.error_rate < 1:
+            raise ValueError("capacity 须为正数，error_rate 须在 (0, 1) 之间")
+        self._lock = threading.Lock()
+        self._layers: List[_Layer] = []
+        if self.path is not None:
+            for file in sorted(self.path.glob("layer-*.bloom")):
+                self._layers.append(_Layer(file))
+            if self._layers:
+                first = self._layers[0]
+                self.capacity = first.capacity
+                self.error_rate = first.error_rate / (1 - TIGHTENING)
+                logger.debug("载入 seen-set %s：%s 层，%s 条", self.path, len(self._layers), len(self))
+
+    def _grow(self) -> _Layer:
+        i = len(self._layers)
+        capacity = self.capacity * GROWTH ** i
+        error_rate = self.error_rate * (1 - TIGHTENING) * TIGHTENING ** i
+        path = self.path / f"layer-{i:03d}.bloom" if self.path is not None else None
+        layer = _Layer(path, capacity, error_rate)
+        self._layers.append(layer)
+        return layer
+
+    def __contains__(self, key: str) -> bool:
+        h1, h2 = _hashes(key)
+        with self._lock:
+            return any(layer.contains(h1, h2) for layer in self._layers)
+
+    def add(self, key: str) -> bool:
+        """记录 key；已见过（或误判为见过）时返回 True"""
+        h1, h2 = _hashes(key)
+        with self._lock:
+            if any(layer.contains(h1, h2) for layer in self._layers):
+                return True
+            layer = self._layers[-1] if self._layers and not self._layers[-1].full else self._grow()
+            layer.add(h1, h2)
+            return False
+
+    def __len__(self) -> int:
+        return sum(layer.count for layer in self._layers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path) if self.path else None,
+            "count": len(self),
+            "layers": len(self._layers),
+            "capacity": sum(layer.capacity for layer in self._layers),
+            "bytes": sum(layer.nbytes for layer in self._layers),
+            "error_rate": self.error_rate,
+        }
+
+    def flush(self):
+        with self._lock:
+            for layer in self._layers:
+                layer.flush()
+
+    def close(self):
+        with self._lock:
+            for layer in self._layers:
+                layer.close()
+            self._layers = []
+
+    def __enter__(self) -> "SeenSet":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
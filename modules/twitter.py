@@ -5,41 +5,61 @@ Twitter/X 模块 - 基于 Playwright 浏览器自动化
 """
 
 import json
+import os
 import re
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional
 
-from base import BaseClient, logger
-from stealth import get_stealth_script
-from content_generator import ContentGenerator
+from base import get_logger, metrics, span
+from browser import BrowserClient, BrowserPool, DEFAULT_USER_AGENT
 
+logger = get_logger(__name__)
 
-class TwitterClient(BaseClient):
+STATUS_RE = re.compile(r"/([^/]+)/status/(\d+)")
+
+
+class TwitterClient(BrowserClient):
     """Twitter/X 客户端 - 使用 Playwright 浏览器自动化"""
     
-    def __init__(self, cookie_file: Path, account: str = "default", stealth: bool = True):
-        super().__init__(cookie_file)
-        self.base_url = "https://x.com"
+    def __init__(self, cookie_file: Path, account: str = "default", stealth: bool = True,
+                 base_url: Optional[str] = None,
+                 record_har: Optional[Path] = None, replay_har: Optional[Path] = None,
+                 pool: Optional[BrowserPool] = None, persistent_profile: Optional[bool] = None,
+                 disk_cache_mb: Optional[int] = None, fast_path: Optional[bool] = None,
+                 launch_profile: Optional[str] = None, op_profiles: Optional[Dict[str, str]] = None):
+        super().__init__(cookie_file, record_har=record_har, replay_har=replay_har, pool=pool,
+                         persistent_profile=persistent_profile, disk_cache_mb=disk_cache_mb,
+                         launch_profile=launch_profile, op_profiles=op_profiles)
+        # 可指向本地 fixture 站点做离线基准
+        self.base_url = (base_url or os.getenv("TWITTER_BASE_URL", "https://x.com")).rstrip("/")
         self.account = account
         self.stealth = stealth
-        self.cookies_loaded = bool(self.cookies)
-        self.content_generator = ContentGenerator()
+        # 回放 HAR 时不需要 Cookie
+        self.cookies_loaded = bool(self.cookies) or bool(self.replay_har)
+        # 读操作可先走 Web 端 GraphQL 接口（需要 auth_token + ct0），失败再用浏览器；HAR 录制 / 回放时只走浏览器
+        if fast_path is None:
+            fast_path = os.getenv("TWITTER_FAST_PATH", "0") not in ("", "0")
+        has_tokens = bool(self.cookies.get("auth_token") and self.cookies.get("ct0"))
+        self.fast_path = fast_path and has_tokens and not (self.record_har or self.replay_har)
+        self._web_api = None
+        self._content_generator = None
         
         if not self.cookies_loaded:
-            logger.warning(f"Twitter 账号 [{account}] Cookie 未配置")
+            logger.warning("Twitter 账号 [%s] Cookie 未配置", account)
     
-    def _get_playwright(self):
-        """延迟导入 playwright"""
-        try:
-            from playwright.sync_api import sync_playwright
-            return sync_playwright
-        except ImportError:
-            logger.error("Playwright 未安装，运行: pip install playwright && playwright install chromium")
-            raise
+    @property
+    def content_generator(self):
+        """按需创建内容生成器，只读命令不导入 LLM 相关模块"""
+        if self._content_generator is None:
+            from content_generator import ContentGenerator
+            self._content_generator = ContentGenerator()
+        return self._content_generator
     
     def _build_cookies_for_playwright(self) -> List[Dict]:
         """构建 Playwright 格式的 cookies"""
         cookies = []
+        domain = self._cookie_domain()
         
         # 从 cookie 文件读取
         auth_token = self.cookies.get("auth_token", "")
@@ -50,86 +70,142 @@ class TwitterClient(BaseClient):
             cookies.append({
                 "name": "auth_token",
                 "value": auth_token,
-                "domain": ".x.com",
+                "domain": domain,
                 "path": "/"
             })
         if ct0:
             cookies.append({
                 "name": "ct0",
                 "value": ct0,
-                "domain": ".x.com",
+                "domain": domain,
                 "path": "/"
             })
         if twid:
             cookies.append({
                 "name": "twid",
                 "value": twid,
-                "domain": ".x.com",
+                "domain": domain,
                 "path": "/"
             })
         
         return cookies
     
+    def _try_fast_path(self, method: str, *args):
+        """通过 GraphQL 接口执行读操作；未启用或失败时返回 None，由调用方回退到浏览器"""
+        if not self.fast_path:
+            return None
+        from twitter_api import TwitterAPIError, TwitterWebAPI
+
+        if self._web_api is None:
+            # 复用 BaseClient 的 httpx 连接池
+            self._web_api = TwitterWebAPI(self.client, self.base_url, self.cookies["auth_token"], self.cookies["ct0"])
+        try:
+            result = getattr(self._web_api, method)(*args)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            # 接口返回结构变化时同样改用浏览器，不让命令直接崩溃
+            metrics.incr("twitter.fast_path.fallback")
+            logger.warning("GraphQL 接口返回结构变化，改用浏览器: %r", e)
+            return None
+        except TwitterAPIError as e:
+            metrics.incr("twitter.fast_path.fallback")
+            logger.warning("GraphQL 接口失败，改用浏览器: %s", e)
+            if e.auth:
+                # Cookie 失效时后续请求不再尝试
+                self.fast_path = False
+            return None
+        metrics.incr("twitter.fast_path.hit")
+        return result
+    
     def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """搜索推文 - 使用 Playwright"""
-        logger.info(f"搜索 Twitter: {query}")
+        """搜索推文 - 优先 GraphQL 接口，失败时使用 Playwright"""
+        logger.info("搜索 Twitter: %s", query)
         
         if not self.cookies_loaded:
             logger.error("Twitter 未配置，请先运行: python agent-reach.py twitter config")
             return []
         
+        tweets = self._try_fast_path("search", query, limit)
+        if tweets is not None:
+            logger.info("找到 %s 条推文", len(tweets))
+            return tweets
+        
         try:
-            sync_playwright = self._get_playwright()
             tweets = []
             
-            with sync_playwright() as p:
-                # 启动浏览器
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context(
-                    viewport={"width": 1920, "height": 1080},
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                )
-                
-                # 添加 cookies
-                cookies = self._build_cookies_for_playwright()
-                if cookies:
-                    context.add_cookies(cookies)
-                
-                page = context.new_page()
-                
-                # 注入 stealth 脚本
-                if self.stealth:
-                    page.add_init_script(get_stealth_script())
-                    logger.debug("Stealth 模式已启用")
-                
+            op = "twitter.search"
+            with self._open_page(op, user_agent=DEFAULT_USER_AGENT, stealth=self.stealth) as page:
                 # 访问搜索页面
-                search_url = f"https://x.com/search?q={query}&src=typed_query&f=live"
-                logger.info(f"访问: {search_url}")
+                search_url = f"{self.base_url}/search?q={query}&src=typed_query&f=live"
+                logger.info("访问: %s", search_url)
                 
-                page.goto(search_url, wait_until="domcontentloaded", timeout=30000)
-                page.wait_for_timeout(3000)  # 等待内容加载
+                with span("navigate", op):
+                    page.goto(search_url, wait_until="domcontentloaded", timeout=30000)
+                with span("wait", op):
+                    self._settle(page, 3000)  # 等待内容加载
                 
                 # 提取推文数据
-                tweet_elements = page.query_selector_all('article[data-testid="tweet"]')
-                
-                for i, tweet_el in enumerate(tweet_elements[:limit], 1):
-                    try:
-                        tweet_data = self._extract_tweet_data(page, tweet_el)
-                        if tweet_data:
-                            tweets.append(tweet_data)
-                    except Exception as e:
-                        logger.debug(f"提取推文 {i} 失败: {e}")
-                        continue
-                
-                browser.close()
+                with span("extract", op):
+                    tweets = self._extract_tweets(page, limit)
             
-            logger.info(f"找到 {len(tweets)} 条推文")
+            logger.info("找到 %s 条推文", len(tweets))
             return tweets
             
         except Exception as e:
-            logger.error(f"搜索失败: {e}")
+            logger.error("搜索失败: %s", e)
             return []
     
+    def _extract_tweets(self, page, limit: int) -> List[Dict[str, Any]]:
+        """提取页面上前 limit 条推文"""
+        tweets = []
+        tweet_elements = page.query_selector_all('article[data-testid="tweet"]')
+        for i, tweet_el in enumerate(tweet_elements[:limit], 1):
+            try:
+                tweet_data = self._extract_tweet_data(page, tweet_el)
+                if tweet_data:
+                    tweets.append(tweet_data)
+            except Exception as e:
+                logger.debug("提取推文 %s 失败: %s", i, e)
+                continue
+        return tweets
+    
+    def watch(self, query: str, limit: int = 20, watcher=None, max_polls: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """持续搜索推文，只产出新出现的推文
+
+        GraphQL 快速路径可用时直接轮询接口；否则保持同一个搜索页打开，每轮刷新后重新提取
+        """
+        from watch import Watcher
+
+        watcher = watcher or Watcher()
+        if not self.cookies_loaded:
+            logger.error("Twitter 未配置，请先运行: python agent-reach.py twitter config")
+            return
+        
+        op = "twitter.watch"
+        search_url = f"{self.base_url}/search?q={query}&src=typed_query&f=live"
+        with ExitStack() as stack:
+            page = None
+            
+            def poll() -> List[Dict[str, Any]]:
+                nonlocal page
+                tweets = self._try_fast_path("search", query, limit)
+                if tweets is not None:
+                    return tweets
+                if page is None:
+                    page = stack.enter_context(
+                        self._open_page(op, user_agent=DEFAULT_USER_AGENT, stealth=self.stealth)
+                    )
+                    with span("navigate", op):
+                        page.goto(search_url, wait_until="domcontentloaded", timeout=30000)
+                else:
+                    with span("navigate", op):
+                        page.reload(wait_until="domcontentloaded", timeout=30000)
+                with span("wait", op):
+                    self._settle(page, 3000)
+                with span("extract", op):
+                    return self._extract_tweets(page, limit)
+            
+            yield from watcher.run(poll, max_polls)
+    
     def _extract_tweet_data(self, page, tweet_el) -> Optional[Dict[str, Any]]:
         """从推文元素提取数据"""
         try:
@@ -139,6 +215,16 @@ class TwitterClient(BaseClient):
             if user_el:
                 user = user_el.inner_text().replace("@", "")
             
+            # 推文 ID（时间戳外层的 /<用户>/status/<ID> 链接）
+            tweet_id = ""
+            url = ""
+            status_el = tweet_el.query_selector('a[href*="/status/"]:has(time)') or tweet_el.query_selector('a[href*="/status/"]')
+            if status_el:
+                match = STATUS_RE.search(status_el.get_attribute("href") or "")
+                if match:
+                    tweet_id = match.group(2)
+                    url = f"{self.base_url}/{match.group(1)}/status/{tweet_id}"
+            
             # 推文内容
             text_el = tweet_el.query_selector('[data-testid="tweetText"]')
             text = ""
@@ -173,6 +259,8 @@ class TwitterClient(BaseClient):
                 replies = self._parse_count(reply_text)
             
             return {
+                "id": tweet_id,
+                "url": url,
                 "user": user,
                 "text": text,
                 "time": time_str,
@@ -181,7 +269,7 @@ class TwitterClient(BaseClient):
                 "replies": replies
             }
         except Exception as e:
-            logger.debug(f"提取推文数据失败: {e}")
+            logger.debug("提取推文数据失败: %s", e)
             return None
     
     def _parse_count(self, text: str) -> int:
@@ -206,52 +294,42 @@ class TwitterClient(BaseClient):
     def get_timeline(self, user: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
         """获取时间线"""
         if user:
-            logger.info(f"获取用户 @{user} 的时间线")
-            url = f"https://x.com/{user}"
+            logger.info("获取用户 @%s 的时间线", user)
+            url = f"{self.base_url}/{user}"
         else:
             logger.info("获取首页时间线")
-            url = "https://x.com/home"
+            url = f"{self.base_url}/home"
+        
+        tweets = self._try_fast_path("get_timeline", user, limit)
+        if tweets is not None:
+            return tweets
         
         try:
-            sync_playwright = self._get_playwright()
             tweets = []
             
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context(
-                    viewport={"width": 1920, "height": 1080},
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-                )
-                
-                cookies = self._build_cookies_for_playwright()
-                if cookies:
-                    context.add_cookies(cookies)
-                
-                page = context.new_page()
-                page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                page.wait_for_timeout(3000)
-                
-                tweet_elements = page.query_selector_all('article[data-testid="tweet"]')
-                
-                for tweet_el in tweet_elements[:limit]:
-                    tweet_data = self._extract_tweet_data(page, tweet_el)
-                    if tweet_data:
-                        tweets.append(tweet_data)
+            op = "twitter.timeline"
+            with self._open_page(op, user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36") as page:
+                with span("navigate", op):
+                    page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                with span("wait", op):
+                    self._settle(page, 3000)
                 
-                browser.close()
+                with span("extract", op):
+                    tweets = self._extract_tweets(page, limit)
             
             return tweets
             
         except Exception as e:
-            logger.error(f"获取时间线失败: {e}")
+            logger.error("获取时间线失败: %s", e)
             return []
     
     def post_tweet(self, text: str = None, topic: str = None, use_ai: bool = False) -> Dict[str, Any]:
         """发布推文，支持 AI 生成"""
         # AI 生成内容
         if use_ai or (not text and topic):
+            # llm 耗时由 ContentGenerator 记录
             text = self.content_generator.generate_tweet(topic or "日常分享")
-            logger.info(f"AI 生成推文: {text[:50]}...")
+            logger.info("AI 生成推文: %s...", text[:50])
         
         if not text:
             return {"success": False, "error": "请提供推文内容或主题"}
@@ -260,21 +338,13 @@ class TwitterClient(BaseClient):
             return {"success": False, "error": "Cookie 未配置"}
         
         try:
-            sync_playwright = self._get_playwright()
-            
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=False)  # 发布用有头模式更稳定
-                context = browser.new_context(
-                    viewport={"width": 1920, "height": 1080}
-                )
-                
-                cookies = self._build_cookies_for_playwright()
-                if cookies:
-                    context.add_cookies(cookies)
-                
-                page = context.new_page()
-                page.goto("https://x.com/compose/tweet", timeout=30000)
-                page.wait_for_timeout(2000)
+            op = "twitter.post"
+            # 发布用有头模式更稳定
+            with self._open_page(op, headless=False) as page:
+                with span("navigate", op):
+                    page.goto(f"{self.base_url}/compose/tweet", timeout=30000)
+                with span("wait", op):
+                    self._settle(page, 2000)
                 
                 # 找到文本框并输入
                 textbox = page.query_selector('[data-testid="tweetTextarea_0"]')
@@ -291,10 +361,8 @@ class TwitterClient(BaseClient):
                         post_btn.click()
                         page.wait_for_timeout(2000)
                         
-                        browser.close()
                         return {"success": True, "message": "推文已发布"}
                 
-                browser.close()
                 return {"success": False, "error": "未找到发布按钮"}
                 
         except Exception as e:
@@ -302,49 +370,45 @@ class TwitterClient(BaseClient):
     
     def get_user_info(self, username: str) -> Dict[str, Any]:
         """获取用户信息"""
-        logger.info(f"获取用户信息: @{username}")
+        logger.info("获取用户信息: @%s", username)
+        
+        info = self._try_fast_path("get_user_info", username)
+        if info is not None:
+            return info
         
         try:
-            sync_playwright = self._get_playwright()
-            
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context(viewport={"width": 1920, "height": 1080})
-                
-                cookies = self._build_cookies_for_playwright()
-                if cookies:
-                    context.add_cookies(cookies)
-                
-                page = context.new_page()
-                page.goto(f"https://x.com/{username}", timeout=30000)
-                page.wait_for_timeout(2000)
+            op = "twitter.user_info"
+            with self._open_page(op) as page:
+                with span("navigate", op):
+                    page.goto(f"{self.base_url}/{username}", timeout=30000)
+                with span("wait", op):
+                    self._settle(page, 2000)
                 
                 # 提取用户信息
-                name_el = page.query_selector('[data-testid="UserName"]')
-                name = ""
-                if name_el:
-                    name = name_el.inner_text().split("\n")[0]
-                
-                bio_el = page.query_selector('[data-testid="UserDescription"]')
-                bio = ""
-                if bio_el:
-                    bio = bio_el.inner_text()
-                
-                # 统计信息
-                stats = page.query_selector_all('[role="group"] a')
-                followers = 0
-                following = 0
-                
-                for stat in stats:
-                    href = stat.get_attribute("href") or ""
-                    if "followers" in href:
-                        text = stat.inner_text()
-                        followers = self._parse_count(text.split(" ")[0])
-                    elif "following" in href:
-                        text = stat.inner_text()
-                        following = self._parse_count(text.split(" ")[0])
-                
-                browser.close()
+                with span("extract", op):
+                    name_el = page.query_selector('[data-testid="UserName"]')
+                    name = ""
+                    if name_el:
+                        name = name_el.inner_text().split("\n")[0]
+                    
+                    bio_el = page.query_selector('[data-testid="UserDescription"]')
+                    bio = ""
+                    if bio_el:
+                        bio = bio_el.inner_text()
+                    
+                    # 统计信息
+                    stats = page.query_selector_all('[role="group"] a')
+                    followers = 0
+                    following = 0
+                    
+                    for stat in stats:
+                        href = stat.get_attribute("href") or ""
+                        if "followers" in href:
+                            text = stat.inner_text()
+                            followers = self._parse_count(text.split(" ")[0])
+                        elif "following" in href:
+                            text = stat.inner_text()
+                            following = self._parse_count(text.split(" ")[0])
                 
                 return {
                     "name": name,
@@ -355,40 +419,32 @@ class TwitterClient(BaseClient):
                 }
                 
         except Exception as e:
-            logger.error(f"获取用户信息失败: {e}")
+            logger.error("获取用户信息失败: %s", e)
             return {}
 
     def reply_to_tweet(self, tweet_url: str, text: str = None, use_ai: bool = False) -> Dict[str, Any]:
         """回复推文"""
-        logger.info(f"回复推文: {tweet_url}")
+        logger.info("回复推文: %s", tweet_url)
 
         if not self.cookies_loaded:
             return {"success": False, "error": "Cookie 未配置"}
 
         try:
-            sync_playwright = self._get_playwright()
-
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=False)
-                context = browser.new_context(viewport={"width": 1920, "height": 1080})
-
-                cookies = self._build_cookies_for_playwright()
-                if cookies:
-                    context.add_cookies(cookies)
-
-                page = context.new_page()
-                if self.stealth:
-                    page.add_init_script(get_stealth_script())
-
-                page.goto(tweet_url, timeout=30000)
-                page.wait_for_timeout(2000)
+            op = "twitter.reply"
+            with self._open_page(op, headless=False, stealth=self.stealth) as page:
+                with span("navigate", op):
+                    page.goto(tweet_url, timeout=30000)
+                with span("wait", op):
+                    self._settle(page, 2000)
 
                 # 提取原文内容用于 AI 生成
                 if use_ai or not text:
                     original_text = ""
-                    tweet_text_el = page.query_selector('[data-testid="tweetText"]')
-                    if tweet_text_el:
-                        original_text = tweet_text_el.inner_text()
+                    with span("extract", op):
+                        tweet_text_el = page.query_selector('[data-testid="tweetText"]')
+                        if tweet_text_el:
+                            original_text = tweet_text_el.inner_text()
+                    # llm 耗时由 ContentGenerator 记录
                     text = self.content_generator.generate_reply(original_text)
 
                 # 找到回复框
@@ -407,10 +463,8 @@ class TwitterClient(BaseClient):
                             post_btn.click()
                             page.wait_for_timeout(2000)
 
-                            browser.close()
                             return {"success": True, "text": text}
 
-                browser.close()
                 return {"success": False, "error": "未找到回复按钮"}
 
         except Exception as e:
@@ -0,0 +1,248 @@
+"""
+Twitter/X Web 端 GraphQL 接口 - 用 Cookie 里的 auth_token + ct0 直接请求 JSON，不启动浏览器
+只负责请求和解析，认证失败或返回结构变化时抛出 TwitterAPIError，由 TwitterClient 回退到 Playwright
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from base import get_logger, span
+
+logger = get_logger(__name__)
+
+# Web 端内置的公开 Bearer Token（与 x.com 前端 JS 中的一致，不是账号凭证）
+WEB_BEARER_TOKEN = (
+    "AAAAAAAAAAAAAAAAAAAAANRILgAAAAAAnNwIzUejRCOuH5E6I8xnZz4puTs%3D"
+    "1Zv7ttfk8LF81IUq16cHjhLTvJu4FA33AGWWjCpTnA"
+)
+
+# GraphQL 操作的 queryId 随前端发版变化，可用 TWITTER_GRAPHQL_IDS="SearchTimeline=xxx,UserTweets=yyy" 覆盖
+QUERY_IDS = {
+    "SearchTimeline": "nK1dw4oV3k4w5TdtcAdSww",
+    "UserByScreenName": "G3KGOASz96M-Qu0nwmGXNg",
+    "UserTweets": "E3opETHurmVJflFsUBVuUQ",
+    "HomeLatestTimeline": "HJFjzBgCs16TqxewQOeLNg",
+}
+
+# 前端请求时附带的特性开关，缺少时部分字段不会返回
+FEATURES = {
+    "rweb_lists_timeline_redesign_enabled": True,
+    "responsive_web_graphql_exclude_directive_enabled": True,
+    "verified_phone_label_enabled": False,
+    "creator_subscriptions_tweet_preview_api_enabled": True,
+    "responsive_web_graphql_timeline_navigation_enabled": True,
+    "responsive_web_graphql_skip_user_profile_image_extensions_enabled": False,
+    "tweetypie_unmention_optimization_enabled": True,
+    "responsive_web_edit_tweet_api_enabled": True,
+    "graphql_is_translatable_rweb_tweet_is_translatable_enabled": True,
+    "view_counts_everywhere_api_enabled": True,
+    "longform_notetweets_consumption_enabled": True,
+    "tweet_awards_web_tipping_enabled": False,
+    "freedom_of_speech_not_reach_fetch_enabled": True,
+    "standardized_nudges_misinfo": True,
+    "longform_notetweets_rich_text_read_enabled": True,
+    "longform_notetweets_inline_media_enabled": True,
+    "responsive_web_enhance_cards_enabled": False,
+    "hidden_profile_likes_enabled": True,
+    "highlights_tweets_tab_ui_enabled": True,
+    "subscriptions_verification_info_verified_since_enabled": True,
+}
+
+# 这些错误码表示 Cookie 失效 / 账号受限，继续请求没有意义
+AUTH_ERROR_CODES = {32, 64, 89, 99, 135, 215, 226, 326, 353}
+
+
+class TwitterAPIError(Exception):
+    """GraphQL 请求失败；auth=True 表示认证问题，本客户端后续请求应直接走浏览器"""
+
+    def __init__(self, message: str, auth: bool = False):
+        super().__init__(message)
+        self.auth = auth
+
+
+def _query_ids() -> Dict[str, str]:
+    ids = dict(QUERY_IDS)
+    for item in os.getenv("TWITTER_GRAPHQL_IDS", "").split(","):
+        name, _, query_id = item.strip().partition("=")
+        if name and query_id:
+            ids[name] = query_id
+    return ids
+
+
+def _format_time(created_at: str) -> str:
+    """Wed Oct 10 20:19:24 +0000 2018 -> 2018-10-10T20:19:24.000Z，与页面 <time datetime> 一致"""
+    if not created_at:
+        return ""
+    try:
+        return datetime.strptime(created_at, "%a %b %d %H:%M:%S %z %Y").strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    except ValueError:
+        return created_at
+
+
+class TwitterWebAPI:
+    """x.com/i/api/graphql 的最小封装，复用调用方的 httpx.Client 连接池"""
+
+    def __init__(self, client, base_url: str, auth_token: str, ct0: str):
+        self.client = client
+        self.base_url = base_url.rstrip("/")
+        self.api_url = f"{self.base_url}/i/api/graphql"
+        self.query_ids = _query_ids()
+        self.headers = {
+            "Authorization": f"Bearer {WEB_BEARER_TOKEN}",
+            "X-Csrf-Token": ct0,
+            "Cookie": f"auth_token={auth_token}; ct0={ct0}",
+            "X-Twitter-Auth-Type": "OAuth2Session",
+            "X-Twitter-Active-User": "yes",
+            "X-Twitter-Client-Language": "en",
+            "Accept": "*/*",
+            # 默认请求头声明了 br，但没装 brotli 时 httpx 不会解码，x.com 的 br 响应会被当成非 JSON
+            "Accept-Encoding": "gzip, deflate",
+            "Content-Type": "application/json",
+            "Referer": f"{base_url.rstrip('/')}/",
+        }
+        # screen_name -> rest_id
+        self._user_ids: Dict[str, str] = {}
+
+    def _get(self, operation: str, variables: Dict[str, Any], op: str) -> Dict[str, Any]:
+        url = f"{self.api_url}/{self.query_ids[operation]}/{operation}"
+        params = {
+            "variables": json.dumps(variables, separators=(",", ":")),
+            "features": json.dumps(FEATURES, separators=(",", ":")),
+        }
+        with span("navigate", op):
+            try:
+                resp = self.client.get(url, params=params, headers=self.headers)
+            except Exception as e:
+                raise TwitterAPIError(f"{operation} 请求失败: {e}")
+
+        if resp.status_code in (401, 403):
+            raise TwitterAPIError(f"{operation} 认证失败: HTTP {resp.status_code}", auth=True)
+        if resp.status_code != 200:
+            raise TwitterAPIError(f"{operation} 返回 HTTP {resp.status_code}")
+        try:
+            data = resp.json()
+        except ValueError:
+            raise TwitterAPIError(f"{operation} 返回的不是 JSON")
+        if not isinstance(data, dict):
+            raise TwitterAPIError(f"{operation} 返回结构变化: {type(data).__name__}")
+
+        errors = data.get("errors") or []
+        if errors and not data.get("data"):
+            codes = {error.get("code") for error in errors}
+            message = "; ".join(str(error.get("message", "")) for error in errors)
+            raise TwitterAPIError(f"{operation} 出错: {message}", auth=bool(codes & AUTH_ERROR_CODES))
+        return data
+
+    @staticmethod
+    def _entries(timeline: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        for instruction in timeline.get("instructions", []):
+            if instruction.get("type") == "TimelineAddEntries":
+                yield from instruction.get("entries", [])
+            elif instruction.get("type") == "TimelinePinEntry" and instruction.get("entry"):
+                yield instruction["entry"]
+
+    def _tweet_record(self, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """tweet_results.result -> 与页面提取相同的推文记录"""
+        if result.get("__typename") == "TweetWithVisibilityResults":
+            result = result.get("tweet") or {}
+        legacy = result.get("legacy")
+        if not legacy:
+            return None
+        user = (result.get("core") or {}).get("user_results", {}).get("result", {})
+        screen_name = (user.get("core") or {}).get("screen_name") or (user.get("legacy") or {}).get("screen_name", "")
+        text = legacy.get("full_text", "")
+        note = (result.get("note_tweet") or {}).get("note_tweet_results", {}).get("result", {})
+        if note.get("text"):
+            text = note["text"]
+        tweet_id = result.get("rest_id") or legacy.get("id_str", "")
+        return {
+            "id": tweet_id,
+            "url": f"{self.base_url}/{screen_name}/status/{tweet_id}" if tweet_id else "",
+            "user": screen_name,
+            "text": text,
+            "time": _format_time(legacy.get("created_at", "")),
+            "likes": int(legacy.get("favorite_count", 0)),
+            "retweets": int(legacy.get("retweet_count", 0)),
+            "replies": int(legacy.get("reply_count", 0)),
+        }
+
+    def _tweets(self, timeline: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+        tweets = []
+        for entry in self._entries(timeline):
+            if not entry.get("entryId", "").startswith("tweet-"):
+                continue
+            result = entry["content"]["itemContent"]["tweet_results"].get("result")
+            record = self._tweet_record(result or {})
+            if record:
+                tweets.append(record)
+            if len(tweets) >= limit:
+                break
+        return tweets
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        op = "twitter.search"
+        data = self._get("SearchTimeline", {
+            "rawQuery": query, "count": max(limit, 20), "querySource": "typed_query", "product": "Latest",
+        }, op)
+        try:
+            with span("extract", op):
+                timeline = data["data"]["search_by_raw_query"]["search_timeline"]["timeline"]
+                return self._tweets(timeline, limit)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise TwitterAPIError(f"SearchTimeline 返回结构变化: {e!r}")
+
+    def _user(self, username: str, op: str) -> Dict[str, Any]:
+        data = self._get("UserByScreenName", {"screen_name": username, "withSafetyModeUserFields": True}, op)
+        try:
+            user = data["data"]["user"]["result"]
+            unavailable = user.get("__typename") == "UserUnavailable"
+            if not unavailable:
+                self._user_ids[username.lower()] = user["rest_id"]
+        except (KeyError, TypeError, AttributeError) as e:
+            raise TwitterAPIError(f"UserByScreenName 返回结构变化: {e!r}")
+        if unavailable:
+            raise TwitterAPIError(f"用户不可见: {username}")
+        return user
+
+    def get_user_info(self, username: str) -> Dict[str, Any]:
+        op = "twitter.user_info"
+        user = self._user(username, op)
+        try:
+            with span("extract", op):
+                legacy = user["legacy"]
+                core = user.get("core") or {}
+                return {
+                    "name": core.get("name") or legacy.get("name", ""),
+                    "screen_name": username,
+                    "description": legacy.get("description", ""),
+                    "followers": int(legacy.get("followers_count", 0)),
+                    "following": int(legacy.get("friends_count", 0)),
+                }
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise TwitterAPIError(f"UserByScreenName 返回结构变化: {e!r}")
+
+    def get_timeline(self, user: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        op = "twitter.timeline"
+        count = max(limit, 20)
+        if user:
+            user_id = self._user_ids.get(user.lower()) or self._user(user, op)["rest_id"]
+            data = self._get("UserTweets", {
+                "userId": user_id, "count": count, "includePromotedContent": False,
+                "withQuickPromoteEligibilityTweetFields": False, "withVoice": True, "withV2Timeline": True,
+            }, op)
+        else:
+            data = self._get("HomeLatestTimeline", {
+                "count": count, "includePromotedContent": False, "latestControlAvailable": True,
+            }, op)
+        try:
+            with span("extract", op):
+                if user:
+                    result = data["data"]["user"]["result"]
+                    timeline = (result.get("timeline_v2") or result["timeline"])["timeline"]
+                else:
+                    timeline = data["data"]["home"]["home_timeline_urt"]
+                return self._tweets(timeline, limit)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise TwitterAPIError(f"时间线返回结构变化: {e!r}")
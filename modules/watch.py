@@ -0,0 +1,174 @@
+"""
+Watch 模式 - 反复轮询同一个列表（搜索结果等），只产出没见过的条目
+有新条目时回到最短间隔，连续没有新条目时按倍数拉长间隔，直到最长间隔
+"""
+
+import json
+import os
+import random
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from base import get_logger, metrics
+
+logger = get_logger(__name__)
+
+
+def item_key(item: Dict[str, Any]) -> str:
+    """条目的去重键：优先 id / url，都没有时用整条内容"""
+    return str(item.get("id") or item.get("url") or json.dumps(item, sort_keys=True, ensure_ascii=False))
+
+
+class Watcher:
+    """自适应间隔的轮询器
+
+    poll() 返回当前的条目列表，run() 产出其中没见过的条目。
+    默认已见集合按插入顺序保留最近 max_seen 个键；传入 seen_set（SeenSet）时改用持久化的
+    Bloom filter，进程重启后不会重复输出。传入 near_dup（NearDuplicateIndex）时，
+    与已产出条目文本近似重复的新条目也不产出。
+    """
+
+    def __init__(self, min_interval: Optional[float] = None, max_interval: Optional[float] = None,
+                 backoff: float = 2.0, jitter: float = 0.1, max_seen: int = 10000,
+                 skip_existing: bool = False, key: Callable[[Dict[str, Any]], str] = item_key,
+                 seen_set=None, near_dup=None):
+        self.min_interval = (min_interval if min_interval is not None
+                             else float(os.getenv("AGENT_REACH_WATCH_MIN_INTERVAL", "30")))
+        self.max_interval = max(self.min_interval, max_interval if max_interval is not None
+                                else float(os.getenv("AGENT_REACH_WATCH_MAX_INTERVAL", "600")))
+        self.backoff = backoff
+        self.jitter = jitter
+        self.max_seen = max_seen
+        # 第一次轮询只记录已有条目，不产出
+        self.skip_existing = skip_existing
+        self.key = key
+        self.seen_set = seen_set
+        self.near_dup = near_dup
+        self.interval = self.min_interval
+        self.polls = 0
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._stop = threading.Event()
+
+    def seen(self, item: Dict[str, Any]) -> bool:
+        """检查并记录条目，已见过返回 True"""
+        key = self.key(item)
+        if self.seen_set is not None:
+            return self.seen_set.add(key)
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            return True
+        self._seen[key] = None
+        if len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        return False
+
+    def next_interval(self, new_count: int) -> float:
+        """根据本轮新条目数调整间隔，返回带抖动的等待秒数"""
+        if new_count:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        if self.seen_set is not None:
+            self.seen_set.close()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def run(self, poll: Callable[[], List[Dict[str, Any]]], max_polls: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """循环调用 poll()，产出新条目；stop() 或达到 max_polls 后结束"""
+        while not self._stop.is_set():
+            try:
+                items = poll() or []
+            except Exception as e:
+                # 单次失败按无新条目处理，间隔照常拉长
+                logger.warning("watch 轮询失败: %s", e)
+                items = []
+            self.polls += 1
+            metrics.incr("watch.poll")
+
+            fresh = [item for item in items if not self.seen(item)]
+            if self.near_dup is not None:
+                fresh = [item for item in fresh if self.near_dup.add(item)[1]]
+            if self.polls == 1 and self.skip_existing:
+                fresh = []
+            if fresh:
+                metrics.incr("watch.new", len(fresh))
+            for item in fresh:
+                yield item
+            if max_polls is not None and self.polls >= max_polls:
+                break
+
+            if self.seen_set is not None and fresh:
+                self.seen_set.flush()
+
+            delay = self.next_interval(len(fresh))
+            logger.debug("watch: 本轮 %s 条新条目，%.1f 秒后再次轮询", len(fresh), delay)
+            self._stop.wait(delay)
+
+
+class Subscription:
+    """在后台线程里运行一个 watch：新条目交给 on_item 回调，同时缓存起来供 drain() 取走
+
+    source(watcher) 返回条目迭代器，一般是客户端的 watch() 方法；
+    sync Playwright 绑定创建它的线程，客户端要在 source 里（即后台线程中）创建
+    """
+
+    def __init__(self, sub_id: str, source: Callable[[Watcher], Iterator[Dict[str, Any]]], watcher: Watcher,
+                 on_item: Optional[Callable[[str, Dict[str, Any]], None]] = None, buffer_size: int = 500):
+        self.id = sub_id
+        self.watcher = watcher
+        self.error: Optional[str] = None
+        self._source = source
+        self._on_item = on_item
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"agent-reach-watch-{sub_id}")
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for item in self._source(self.watcher):
+                with self._lock:
+                    self._buffer.append(item)
+                if self._on_item is not None:
+                    self._on_item(self.id, item)
+        except Exception as e:
+            logger.error("watch %s 异常退出: %s", self.id, e)
+            self.error = str(e)
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """取走缓存的新条目"""
+        with self._lock:
+            items = list(self._buffer)
+            self._buffer.clear()
+        return items
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "alive": self.alive,
+            "polls": self.watcher.polls,
+            "interval": round(self.watcher.interval, 1),
+            "buffered": len(self._buffer),
+            "seen": len(self.watcher.seen_set) if self.watcher.seen_set is not None else None,
+            "clusters": len(self.watcher.near_dup.clusters) if self.watcher.near_dup is not None else None,
+            "error": self.error,
+        }
+
+    def stop(self, timeout: float = 10.0):
+        self.watcher.stop()
+        self._thread.join(timeout)
+        if not self.alive:
+            self.watcher.close()
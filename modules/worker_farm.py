@@ -0,0 +1,263 @@
+"""
+浏览器 worker 进程池
+sync Playwright 在单进程里只能用一个核，worker 模式由 supervisor 启动 N 个进程，
+每个进程持有自己的浏览器池，读任务经本地管道分发、结果经同一管道返回
+"""
+
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional, Tuple
+
+from base import configure_logging, current_collector, get_logger, metrics
+
+logger = get_logger(__name__)
+
+# 允许分发到 worker 的只读方法；发布 / 点赞等写操作需要有头浏览器，留在主进程
+READ_METHODS = {
+    "twitter": {"search", "get_timeline", "get_user_info"},
+    "xiaohongshu": {"search", "get_note_detail", "get_user_profile"},
+}
+
+CLIENT_CLASSES = {
+    "twitter": ("twitter", "TwitterClient"),
+    "xiaohongshu": ("xiaohongshu", "XiaoHongShuClient"),
+}
+
+
+def _worker_main(conn, log_mode: str, metrics_enabled: bool):
+    """worker 进程入口：串行执行任务，客户端和浏览器池在进程内常驻"""
+    import importlib
+
+    from base import collect
+    from browser import BrowserPool
+
+    configure_logging(log_mode)
+    metrics.enabled = metrics_enabled
+    pool = BrowserPool()
+    clients: Dict[Tuple, Any] = {}
+
+    try:
+        while True:
+            try:
+                job = conn.recv()
+            except EOFError:
+                break
+            if job is None:
+                break
+            job_id, platform, client_kwargs, method, args, kwargs = job
+
+            key = (platform, tuple(sorted(client_kwargs.items())))
+            with collect() as collector:
+                try:
+                    client = clients.get(key)
+                    if client is None:
+                        module_name, class_name = CLIENT_CLASSES[platform]
+                        cls = getattr(importlib.import_module(module_name), class_name)
+                        client = clients[key] = cls(pool=pool, **client_kwargs)
+                    result, error = getattr(client, method)(*args, **kwargs), None
+                except Exception as e:
+                    result, error = None, f"{type(e).__name__}: {e}"
+
+            # 指标增量随结果带回，由 supervisor 合并
+            delta = None
+            if metrics.enabled:
+                delta = metrics.to_json()
+                metrics.reset()
+            conn.send((job_id, result, error, collector.stages, collector.events, delta))
+    finally:
+        pool.close()
+        conn.close()
+
+
+class _Worker:
+    """supervisor 侧的 worker 句柄"""
+
+    def __init__(self, index: int, ctx, log_mode: str):
+        self.index = index
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, log_mode, metrics.enabled),
+            name=f"agent-reach-worker-{index}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.pending: Dict[int, Tuple[Future, Any]] = {}
+        self.lock = threading.Lock()
+
+
+class WorkerFarm:
+    """多进程浏览器 worker 池
+
+    routing:
+      sticky       同一平台 + 账号固定落到同一个 worker，浏览器上下文（Cookie、缓存）保持在一处
+      least_loaded 分发给在途任务最少的 worker，单账号也能用满多核
+
+    call() 等待超过 timeout 秒时认为 worker 卡死：终止该进程（在途任务一并失败）并补一个新 worker
+    """
+
+    def __init__(self, workers: Optional[int] = None, routing: str = "sticky",
+                 log_mode: Optional[str] = None, timeout: Optional[float] = None):
+        if routing not in ("sticky", "least_loaded"):
+            raise ValueError(f"未知路由方式: {routing}")
+        self.size = workers or os.cpu_count() or 1
+        self.routing = routing
+        self.log_mode = log_mode or os.getenv("AGENT_REACH_LOG", "plain")
+        self.timeout = (timeout if timeout is not None
+                        else float(os.getenv("AGENT_REACH_WORKER_TIMEOUT", "120")))
+        # spawn：不继承父进程的线程和 Playwright 状态
+        self._ctx = multiprocessing.get_context("spawn")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._workers: List[_Worker] = [self._spawn(i) for i in range(self.size)]
+
+    def _spawn(self, index: int) -> _Worker:
+        worker = _Worker(index, self._ctx, self.log_mode)
+        threading.Thread(target=self._read, args=(worker,), daemon=True,
+                         name=f"agent-reach-farm-reader-{index}").start()
+        return worker
+
+    def _read(self, worker: _Worker):
+        """接收一个 worker 的结果；进程退出时让在途任务失败并补一个新 worker"""
+        while True:
+            try:
+                job_id, result, error, stages, events, delta = worker.conn.recv()
+            except (EOFError, OSError):
+                break
+            with worker.lock:
+                future, collector = worker.pending.pop(job_id, (None, None))
+            if delta:
+                metrics.merge(delta)
+            if collector is not None:
+                collector.merge(stages, events)
+            if future is None:
+                continue
+            if error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(result)
+
+        with worker.lock:
+            pending, worker.pending = worker.pending, {}
+        for future, _ in pending.values():
+            future.set_exception(RuntimeError(f"worker {worker.index} 已退出"))
+        worker.process.join(1)
+        if self._closed:
+            return
+        logger.warning("worker %s 退出 (exitcode=%s)，重新启动", worker.index, worker.process.exitcode)
+        # 启动即崩溃时避免空转重启
+        time.sleep(1)
+        with self._lock:
+            if not self._closed:
+                self._workers[worker.index] = self._spawn(worker.index)
+
+    def _route(self, platform: str, account: str) -> _Worker:
+        with self._lock:
+            if self.routing == "sticky":
+                index = zlib.crc32(f"{platform}:{account}".encode("utf-8")) % self.size
+                return self._workers[index]
+            return min(self._workers, key=lambda w: len(w.pending))
+
+    def submit(self, platform: str, method: str, *args,
+               client_kwargs: Optional[Dict[str, Any]] = None, **kwargs) -> Future:
+        """提交一个只读任务，返回 Future"""
+        return self._submit(platform, method, args, kwargs, client_kwargs)[1]
+
+    def _submit(self, platform: str, method: str, args: tuple, kwargs: Dict[str, Any],
+                client_kwargs: Optional[Dict[str, Any]]) -> Tuple[_Worker, Future]:
+        if method not in READ_METHODS.get(platform, ()):
+            raise ValueError(f"{platform}.{method} 不支持在 worker 中执行")
+        if self._closed:
+            raise RuntimeError("WorkerFarm 已关闭")
+        client_kwargs = client_kwargs or {}
+        account = str(client_kwargs.get("account") or client_kwargs.get("cookie_file") or "default")
+
+        worker = self._route(platform, account)
+        job_id = next(self._ids)
+        future: Future = Future()
+        with worker.lock:
+            # 在提交线程里取当前 Collector，结果回来时把 worker 的阶段耗时并进去
+            worker.pending[job_id] = (future, current_collector())
+            worker.conn.send((job_id, platform, client_kwargs, method, args, kwargs))
+        return worker, future
+
+    def call(self, platform: str, method: str, *args,
+             client_kwargs: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None, **kwargs):
+        """同步执行一个只读任务，timeout 默认取 self.timeout（0 表示不限制）"""
+        timeout = timeout if timeout is not None else self.timeout
+        worker, future = self._submit(platform, method, args, kwargs, client_kwargs)
+        try:
+            return future.result(timeout or None)
+        except FutureTimeout:
+            if future.done():
+                return future.result()
+        # worker 串行执行任务，卡住的任务会堵住后面所有任务：终止进程，由 _read 让在途任务失败并重启
+        logger.warning("worker %s 执行 %s.%s 超过 %s 秒，终止并重启", worker.index, platform, method, timeout)
+        metrics.incr("worker.timeout")
+        worker.process.terminate()
+        raise TimeoutError(f"{platform}.{method} 在 worker {worker.index} 中超过 {timeout} 秒未返回")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"worker": w.index, "pid": w.process.pid, "alive": w.process.is_alive(), "pending": len(w.pending)}
+                for w in self._workers
+            ]
+
+    def close(self, timeout: float = 10.0):
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+        for worker in workers:
+            try:
+                with worker.lock:
+                    worker.conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+    def __enter__(self) -> "WorkerFarm":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class FarmClient:
+    """TwitterClient / XiaoHongShuClient 的代理：只读方法转发到 WorkerFarm，其余方法在本进程执行
+
+    client_kwargs 与客户端构造参数一致（cookie_file、account、replay_har 等），需可 pickle
+    """
+
+    def __init__(self, farm: WorkerFarm, platform: str, **client_kwargs):
+        self._farm = farm
+        self._platform = platform
+        self._client_kwargs = client_kwargs
+        self._local = None
+
+    def __getattr__(self, method: str):
+        if method.startswith("_"):
+            raise AttributeError(method)
+        if method not in READ_METHODS.get(self._platform, ()):
+            # 写操作（发布、点赞等）留在主进程
+            if self._local is None:
+                import importlib
+
+                module_name, class_name = CLIENT_CLASSES[self._platform]
+                cls = getattr(importlib.import_module(module_name), class_name)
+                self._local = cls(**self._client_kwargs)
+            return getattr(self._local, method)
+
+        def call(*args, **kwargs):
+            return self._farm.call(self._platform, method, *args, client_kwargs=self._client_kwargs, **kwargs)
+
+        return call
@@ -5,39 +5,56 @@
 """
 
 import json
+import os
 import re
 import time
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-from urllib.parse import quote
+from typing import Dict, Iterator, List, Any, Optional
+from urllib.parse import quote, urlparse
 
-from base import BaseClient, logger
-from stealth import get_stealth_script
-from content_generator import ContentGenerator
+from base import get_logger, metrics, span
+from browser import BrowserClient, BrowserPool, DEFAULT_USER_AGENT
 
+logger = get_logger(__name__)
 
-class XiaoHongShuClient(BaseClient):
+# 服务端渲染页面里内嵌的初始状态
+INITIAL_STATE_RE = re.compile(r"window\.__INITIAL_STATE__\s*=\s*(\{.*?\})\s*;?\s*</script>", re.S)
+# 初始状态是 JS 字面量，值可能是 undefined
+UNDEFINED_RE = re.compile(r"(?<=[:\[,])\s*undefined(?=\s*[,\]}])")
+# 跳转到这些路径说明遇到验证码 / 登录墙 / 笔记不可见
+BLOCKED_PATHS = ("captcha", "website-login", "/login", "/404")
+
+
+class XiaoHongShuClient(BrowserClient):
     """小红书客户端 - 使用 Playwright 浏览器自动化"""
 
-    def __init__(self, cookie_file: Path, account: str = "default", stealth: bool = True):
-        super().__init__(cookie_file)
-        self.base_url = "https://www.xiaohongshu.com"
+    # 详情和主页是服务端渲染的，lean 配置下不执行 JS
+    NO_JS_OPS = frozenset({"xiaohongshu.note_detail", "xiaohongshu.user_profile"})
+
+    def __init__(self, cookie_file: Path, account: str = "default", stealth: bool = True,
+                 base_url: Optional[str] = None,
+                 record_har: Optional[Path] = None, replay_har: Optional[Path] = None,
+                 pool: Optional[BrowserPool] = None, persistent_profile: Optional[bool] = None,
+                 disk_cache_mb: Optional[int] = None, fast_path: Optional[bool] = None,
+                 launch_profile: Optional[str] = None, op_profiles: Optional[Dict[str, str]] = None):
+        super().__init__(cookie_file, record_har=record_har, replay_har=replay_har, pool=pool,
+                         persistent_profile=persistent_profile, disk_cache_mb=disk_cache_mb,
+                         launch_profile=launch_profile, op_profiles=op_profiles)
+        # 可指向本地 fixture 站点做离线基准
+        self.base_url = (base_url or os.getenv("XHS_BASE_URL", "https://www.xiaohongshu.com")).rstrip("/")
         self.account = account
         self.stealth = stealth
-        self.cookies_loaded = bool(self.cookies)
-        self.content_generator = ContentGenerator()
+        # 回放 HAR 时不需要 Cookie
+        self.cookies_loaded = bool(self.cookies) or bool(self.replay_har)
+        # 详情 / 主页先用 HTTP 直接取服务端渲染的初始状态，失败再启动浏览器；HAR 录制 / 回放时只走浏览器
+        if fast_path is None:
+            fast_path = os.getenv("XHS_FAST_PATH", "1") != "0"
+        self.fast_path = fast_path and not (self.record_har or self.replay_har)
+        self._content_generator = None
 
         if not self.cookies_loaded:
-            logger.warning(f"小红书账号 [{account}] Cookie 未配置")
-
-    def _get_playwright(self):
-        """延迟导入 playwright"""
-        try:
-            from playwright.sync_api import sync_playwright
-            return sync_playwright
-        except ImportError:
-            logger.error("Playwright 未安装")
-            raise
+            logger.warning("小红书账号 [%s] Cookie 未配置", account)
 
     def _parse_cookie_string(self, cookie_str: str) -> Dict[str, str]:
         """解析 Cookie 字符串为字典"""
@@ -49,6 +66,14 @@ class XiaoHongShuClient(BaseClient):
                 cookies[key.strip()] = value.strip()
         return cookies
 
+    @property
+    def content_generator(self):
+        """按需创建内容生成器，只读命令不导入 LLM 相关模块"""
+        if self._content_generator is None:
+            from content_generator import ContentGenerator
+            self._content_generator = ContentGenerator()
+        return self._content_generator
+
     def _build_cookies_for_playwright(self) -> List[Dict]:
         """构建 Playwright 格式的 cookies"""
         cookies = []
@@ -58,6 +83,7 @@ class XiaoHongShuClient(BaseClient):
             return cookies
 
         parsed = self._parse_cookie_string(cookie_str)
+        domain = self._cookie_domain()
 
         # 关键 cookie 字段
         important_keys = [
@@ -70,7 +96,7 @@ class XiaoHongShuClient(BaseClient):
                 cookies.append({
                     "name": key,
                     "value": parsed[key],
-                    "domain": ".xiaohongshu.com",
+                    "domain": domain,
                     "path": "/"
                 })
 
@@ -78,79 +104,101 @@ class XiaoHongShuClient(BaseClient):
 
     def search(self, keyword: str, limit: int = 10) -> List[Dict[str, Any]]:
         """搜索笔记 - 使用 Playwright"""
-        logger.info(f"搜索小红书: {keyword}")
+        logger.info("搜索小红书: %s", keyword)
 
         if not self.cookies_loaded:
             logger.error("小红书未配置，请先运行: python agent-reach.py xiaohongshu config")
             return []
 
         try:
-            sync_playwright = self._get_playwright()
             notes = []
 
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context(
-                    viewport={"width": 1920, "height": 1080},
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                )
-
-                # 添加 cookies
-                cookies = self._build_cookies_for_playwright()
-                if cookies:
-                    context.add_cookies(cookies)
-
-                page = context.new_page()
-
-                # 注入 stealth 脚本
-                if self.stealth:
-                    page.add_init_script(get_stealth_script())
-                    logger.debug("Stealth 模式已启用")
-
+            op = "xiaohongshu.search"
+            with self._open_page(op, user_agent=DEFAULT_USER_AGENT, stealth=self.stealth) as page:
                 # 访问搜索页面
-                search_url = f"https://www.xiaohongshu.com/search_result?keyword={quote(keyword)}&type=51"
-                logger.info(f"访问: {search_url}")
+                search_url = f"{self.base_url}/search_result?keyword={quote(keyword)}&type=51"
+                logger.info("访问: %s", search_url)
 
-                page.goto(search_url, wait_until="networkidle", timeout=30000)
-                page.wait_for_timeout(3000)  # 等待内容加载
+                with span("navigate", op):
+                    page.goto(search_url, wait_until="networkidle", timeout=30000)
+                with span("wait", op):
+                    self._settle(page, 3000)  # 等待内容加载
 
-                # 等待笔记卡片出现
-                page.wait_for_selector('section.note-item, div.feed-card, a.cover', timeout=10000)
+                    # 等待笔记卡片出现
+                    page.wait_for_selector('section.note-item, div.feed-card, a.cover', timeout=10000)
 
                 # 提取笔记数据
-                # 小红书的 DOM 结构多变，尝试多种选择器
-                note_selectors = [
-                    'section.note-item',
-                    'div.feed-card',
-                    'div.card-container',
-                    'a[href*="/explore/"]'
-                ]
-
-                note_elements = []
-                for selector in note_selectors:
-                    note_elements = page.query_selector_all(selector)
-                    if note_elements:
-                        logger.debug(f"使用选择器: {selector}, 找到 {len(note_elements)} 个")
-                        break
+                with span("extract", op):
+                    notes = self._extract_notes(page, limit)
 
-                for i, note_el in enumerate(note_elements[:limit], 1):
-                    try:
-                        note_data = self._extract_note_data(page, note_el)
-                        if note_data:
-                            notes.append(note_data)
-                    except Exception as e:
-                        logger.debug(f"提取笔记 {i} 失败: {e}")
-                        continue
-
-                browser.close()
-
-            logger.info(f"找到 {len(notes)} 条笔记")
+            logger.info("找到 %s 条笔记", len(notes))
             return notes
 
         except Exception as e:
-            logger.error(f"搜索失败: {e}")
+            logger.error("搜索失败: %s", e)
             return []
 
+    def _extract_notes(self, page, limit: int) -> List[Dict[str, Any]]:
+        """提取页面上前 limit 条笔记卡片"""
+        # 小红书的 DOM 结构多变，尝试多种选择器
+        note_selectors = [
+            'section.note-item',
+            'div.feed-card',
+            'div.card-container',
+            'a[href*="/explore/"]'
+        ]
+
+        note_elements = []
+        for selector in note_selectors:
+            note_elements = page.query_selector_all(selector)
+            if note_elements:
+                logger.debug("使用选择器: %s, 找到 %s 个", selector, len(note_elements))
+                break
+
+        notes = []
+        for i, note_el in enumerate(note_elements[:limit], 1):
+            try:
+                note_data = self._extract_note_data(page, note_el)
+                if note_data:
+                    notes.append(note_data)
+            except Exception as e:
+                logger.debug("提取笔记 %s 失败: %s", i, e)
+                continue
+        return notes
+
+    def watch(self, keyword: str, limit: int = 20, watcher=None,
+              max_polls: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """持续搜索笔记，只产出新出现的笔记；搜索页保持打开，每轮刷新后重新提取"""
+        from watch import Watcher
+
+        watcher = watcher or Watcher()
+        if not self.cookies_loaded:
+            logger.error("小红书未配置，请先运行: python agent-reach.py xiaohongshu config")
+            return
+
+        op = "xiaohongshu.watch"
+        search_url = f"{self.base_url}/search_result?keyword={quote(keyword)}&type=51"
+        with ExitStack() as stack:
+            page = None
+
+            def poll() -> List[Dict[str, Any]]:
+                nonlocal page
+                if page is None:
+                    page = stack.enter_context(
+                        self._open_page(op, user_agent=DEFAULT_USER_AGENT, stealth=self.stealth)
+                    )
+                    with span("navigate", op):
+                        page.goto(search_url, wait_until="networkidle", timeout=30000)
+                else:
+                    with span("navigate", op):
+                        page.reload(wait_until="networkidle", timeout=30000)
+                with span("wait", op):
+                    self._settle(page, 3000)
+                with span("extract", op):
+                    return self._extract_notes(page, limit)
+
+            yield from watcher.run(poll, max_polls)
+
     def _extract_note_data(self, page, note_el) -> Optional[Dict[str, Any]]:
         """从笔记元素提取数据"""
         try:
@@ -161,7 +209,7 @@ class XiaoHongShuClient(BaseClient):
             link_el = note_el.query_selector('a[href*="/explore/"]')
             if link_el:
                 href = link_el.get_attribute("href") or ""
-                link = href if href.startswith("http") else f"https://www.xiaohongshu.com{href}"
+                link = href if href.startswith("http") else f"{self.base_url}{href}"
 
             # 提取笔记ID
             note_id = ""
@@ -228,12 +276,12 @@ class XiaoHongShuClient(BaseClient):
                 "title": title or "无标题",
                 "user": author or "未知作者",
                 "likes": likes,
-                "url": link or f"https://www.xiaohongshu.com/explore/{note_id}",
+                "url": link or f"{self.base_url}/explore/{note_id}",
                 "images": images
             }
 
         except Exception as e:
-            logger.debug(f"提取笔记数据失败: {e}")
+            logger.debug("提取笔记数据失败: %s", e)
             return None
 
     def _parse_count(self, text: str) -> int:
@@ -257,42 +305,103 @@ class XiaoHongShuClient(BaseClient):
         except ValueError:
             return 0
 
-    def get_note_detail(self, note_id: str) -> Dict[str, Any]:
-        """获取笔记详情"""
-        logger.info(f"获取笔记详情: {note_id}")
+    def _fetch_initial_state(self, url: str, op: str) -> Optional[Dict[str, Any]]:
+        """HTTP 直接获取页面内嵌的 __INITIAL_STATE__，遇到验证码、跳转或解析失败时返回 None"""
+        headers = {
+            "Accept": "text/html,application/xhtml+xml,*/*;q=0.8",
+            # 默认请求头声明了 br，没装 brotli 时 httpx 不解码，__INITIAL_STATE__ 永远匹配不到
+            "Accept-Encoding": "gzip, deflate",
+            "Referer": f"{self.base_url}/",
+        }
+        cookie_str = self.cookies.get("cookie", "")
+        if cookie_str:
+            headers["Cookie"] = self._build_cookie_string(self._parse_cookie_string(cookie_str))
 
         try:
-            sync_playwright = self._get_playwright()
+            with span("navigate", op):
+                resp = self.client.get(url, headers=headers)
+        except Exception as e:
+            logger.debug("HTTP 请求失败: %s", e)
+            return None
 
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context(
-                    viewport={"width": 1920, "height": 1080}
-                )
+        final_path = urlparse(str(resp.url)).path
+        if resp.status_code != 200 or any(marker in final_path for marker in BLOCKED_PATHS):
+            logger.debug("HTTP 快速路径被拦截: %s %s", resp.status_code, resp.url)
+            return None
+
+        with span("extract", op):
+            match = INITIAL_STATE_RE.search(resp.text)
+            if not match:
+                logger.debug("页面中没有 __INITIAL_STATE__: %s", url)
+                return None
+            try:
+                return json.loads(UNDEFINED_RE.sub("null", match.group(1)))
+            except ValueError as e:
+                logger.debug("解析 __INITIAL_STATE__ 失败: %s", e)
+                return None
+
+    def _fast_note_detail(self, note_id: str, url: str) -> Optional[Dict[str, Any]]:
+        state = self._fetch_initial_state(url, "xiaohongshu.note_detail")
+        note_state = (state or {}).get("note") or {}
+        detail_map = note_state.get("noteDetailMap") or {}
+        entry = detail_map.get(note_id) or detail_map.get(note_state.get("firstNoteId")) or {}
+        # 缺少 xsec_token 等情况下服务端会返回空笔记
+        note = entry.get("note") or {}
+        if not note.get("title") and not note.get("desc"):
+            return None
+        return {
+            "id": note_id,
+            "title": note.get("title") or "",
+            "content": note.get("desc") or "",
+            "author": (note.get("user") or {}).get("nickname") or "",
+            "url": url
+        }
+
+    def _fast_user_profile(self, url: str) -> Optional[Dict[str, Any]]:
+        state = self._fetch_initial_state(url, "xiaohongshu.user_profile")
+        user_state = (state or {}).get("user") or {}
+        basic = (user_state.get("userPageData") or {}).get("basicInfo") or user_state.get("userInfo") or {}
+        if not basic.get("nickname"):
+            return None
+        return {"nickname": basic["nickname"]}
 
-                cookies = self._build_cookies_for_playwright()
-                if cookies:
-                    context.add_cookies(cookies)
+    def _try_fast_path(self, func, *args) -> Optional[Dict[str, Any]]:
+        """执行快速路径并记录命中 / 回退"""
+        if not self.fast_path:
+            return None
+        result = func(*args)
+        metrics.incr("xhs.fast_path.hit" if result else "xhs.fast_path.fallback")
+        if not result:
+            logger.debug("HTTP 快速路径未命中，改用浏览器")
+        return result
 
-                page = context.new_page()
-                if self.stealth:
-                    page.add_init_script(get_stealth_script())
+    def get_note_detail(self, note_id: str) -> Dict[str, Any]:
+        """获取笔记详情"""
+        logger.info("获取笔记详情: %s", note_id)
 
-                url = f"https://www.xiaohongshu.com/explore/{note_id}"
-                page.goto(url, wait_until="networkidle", timeout=30000)
-                page.wait_for_timeout(2000)
+        result = self._try_fast_path(self._fast_note_detail, note_id, f"{self.base_url}/explore/{note_id}")
+        if result:
+            return result
 
-                # 提取详情
-                title_el = page.query_selector('h1.title, div.title')
-                title = title_el.inner_text() if title_el else ""
+        try:
+            op = "xiaohongshu.note_detail"
+            with self._open_page(op, stealth=self.stealth) as page:
+                url = f"{self.base_url}/explore/{note_id}"
+                with span("navigate", op):
+                    page.goto(url, wait_until="networkidle", timeout=30000)
+                with span("wait", op):
+                    self._settle(page, 2000)
 
-                content_el = page.query_selector('div.content, div.desc')
-                content = content_el.inner_text() if content_el else ""
+                # 提取详情
+                with span("extract", op):
+                    title_el = page.query_selector('h1.title, div.title')
+                    title = title_el.inner_text() if title_el else ""
 
-                author_el = page.query_selector('a.author div.info div.nickname, .author-name')
-                author = author_el.inner_text() if author_el else ""
+                    content_el = page.query_selector('div.content, div.desc')
+                    content = content_el.inner_text() if content_el else ""
 
-                browser.close()
+                    author_el = page.query_selector('a.author div.info div.nickname, .author-name')
+                    author = author_el.inner_text() if author_el else ""
 
                 return {
                     "id": note_id,
@@ -303,34 +412,25 @@ class XiaoHongShuClient(BaseClient):
                 }
 
         except Exception as e:
-            logger.error(f"获取笔记详情失败: {e}")
+            logger.error("获取笔记详情失败: %s", e)
             return {"error": str(e)}
 
     def like_note(self, note_id: str) -> Dict[str, Any]:
         """点赞笔记"""
-        logger.info(f"点赞笔记: {note_id}")
+        logger.info("点赞笔记: %s", note_id)
 
         if not self.cookies_loaded:
             return {"success": False, "error": "Cookie 未配置"}
 
         try:
-            sync_playwright = self._get_playwright()
-
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=False)  # 点赞用有头更稳定
-                context = browser.new_context(viewport={"width": 1920, "height": 1080})
-
-                cookies = self._build_cookies_for_playwright()
-                if cookies:
-                    context.add_cookies(cookies)
-
-                page = context.new_page()
-                if self.stealth:
-                    page.add_init_script(get_stealth_script())
-
-                url = f"https://www.xiaohongshu.com/explore/{note_id}"
-                page.goto(url, timeout=30000)
-                page.wait_for_timeout(2000)
+            op = "xiaohongshu.like"
+            # 点赞用有头更稳定
+            with self._open_page(op, headless=False, stealth=self.stealth) as page:
+                url = f"{self.base_url}/explore/{note_id}"
+                with span("navigate", op):
+                    page.goto(url, timeout=30000)
+                with span("wait", op):
+                    self._settle(page, 2000)
 
                 # 找点赞按钮
                 like_btn = page.query_selector('span.like-icon, .like-btn, button[class*="like"]')
@@ -338,10 +438,8 @@ class XiaoHongShuClient(BaseClient):
                     like_btn.click()
                     page.wait_for_timeout(1000)
 
-                    browser.close()
                     return {"success": True}
 
-                browser.close()
                 return {"success": False, "error": "未找到点赞按钮"}
 
         except Exception as e:
@@ -349,7 +447,7 @@ class XiaoHongShuClient(BaseClient):
 
     def post_note(self, title: str, content: str, images: List[str] = None) -> Dict[str, Any]:
         """发布笔记"""
-        logger.info(f"发布笔记: {title}")
+        logger.info("发布笔记: %s", title)
 
         if not self.cookies_loaded:
             return {"success": False, "error": "Cookie 未配置"}
@@ -366,34 +464,27 @@ class XiaoHongShuClient(BaseClient):
         """获取用户资料"""
         logger.info("获取用户信息")
 
-        try:
-            sync_playwright = self._get_playwright()
-
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context(viewport={"width": 1920, "height": 1080})
-
-                cookies = self._build_cookies_for_playwright()
-                if cookies:
-                    context.add_cookies(cookies)
-
-                page = context.new_page()
+        path = f"/user/profile/{user_id}" if user_id else "/user/me"
+        result = self._try_fast_path(self._fast_user_profile, f"{self.base_url}{path}")
+        if result:
+            return result
 
-                if user_id:
-                    page.goto(f"https://www.xiaohongshu.com/user/profile/{user_id}", timeout=30000)
-                else:
-                    page.goto("https://www.xiaohongshu.com/user/me", timeout=30000)
+        try:
+            op = "xiaohongshu.user_profile"
+            with self._open_page(op) as page:
+                with span("navigate", op):
+                    page.goto(f"{self.base_url}{path}", timeout=30000)
 
-                page.wait_for_timeout(2000)
+                with span("wait", op):
+                    self._settle(page, 2000)
 
                 # 提取用户信息
-                name_el = page.query_selector('.user-nickname, .nickname')
-                name = name_el.inner_text() if name_el else ""
-
-                browser.close()
+                with span("extract", op):
+                    name_el = page.query_selector('.user-nickname, .nickname')
+                    name = name_el.inner_text() if name_el else ""
 
                 return {"nickname": name}
 
         except Exception as e:
-            logger.error(f"获取用户信息失败: {e}")
+            logger.error("获取用户信息失败: %s", e)
             return {"error": str(e)}